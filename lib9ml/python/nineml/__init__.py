@@ -16,6 +16,8 @@ class BaseNineMLObject(object):
     """
     Base class for user layer classes
     """
+    __slots__ = ()
+
     children = []
 
     def __init__(self):
@@ -42,6 +44,8 @@ class BaseNineMLObject(object):
 
 class TopLevelObject(object):
 
+    __slots__ = ()
+
     @property
     def attributes_with_dimension(self):
         return []  # To be overridden in derived classes
@@ -68,5 +72,5 @@ class TopLevelObject(object):
 import abstraction_layer
 import user_layer
 import exceptions
-from abstraction_layer import Unit, Dimension
-from document import read, write, load, Document
+from abstraction_layer import Unit, Dimension, deferred_validation
+from document import read, write, load, Document, document_cache
@@ -13,7 +13,7 @@ class BaseALObject(BaseNineMLObject):
     """
     Base class for abstraction layer classes
     """
-    pass
+    __slots__ = ()
 
 
 import dynamics
@@ -37,6 +37,7 @@ from .connectionrule import ConnectionRuleClass
 from .distribution import (DistributionClass,
                            DistributionClass as RandomDistributionClass)
 from .units import Unit, Dimension
+from .componentclass.validators.deferred import deferred_validation
 from .dynamics import DynamicsClassXMLLoader, DynamicsClassXMLWriter
 from .distribution import (
     DistributionClassXMLLoader, DistributionClassXMLWriter,
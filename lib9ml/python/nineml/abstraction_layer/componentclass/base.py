@@ -10,9 +10,8 @@ This module provides the base class for these.
 from abc import ABCMeta
 from .. import BaseALObject
 import nineml
-from nineml.annotations import read_annotations, annotate_xml
 from nineml.utils import filter_discrete_types, ensure_valid_identifier
-from ..units import dimensionless, Dimension
+from ..units import dimensionless, Dimension, UnitRegistry
 from nineml import TopLevelObject
 
 
@@ -88,22 +87,20 @@ class ComponentClass(BaseALObject, TopLevelObject):
         """
         if reference_set is None:
             reference_set = self.dimensions
+        registry = UnitRegistry(reference_set)
         for a in self.attributes_with_dimension:
-            try:
-                std_dim = next(d for d in reference_set if d == a.dimension)
-            except StopIteration:
-                continue
-            a.set_dimension(std_dim)
+            std_dim = registry.canonical(a.dimension)
+            if std_dim is not None:
+                a.set_dimension(std_dim)
 
-    @annotate_xml
     def to_xml(self):
+        # Annotations are written and read by the XMLWriter and XMLLoader
         self.standardize_unit_dimensions()
         XMLWriter = getattr(nineml.abstraction_layer,
                             self.__class__.__name__ + 'XMLWriter')
         return XMLWriter().visit(self)
 
     @classmethod
-    @read_annotations
     def from_xml(cls, element, document):  # @UnusedVariable
         XMLLoader = getattr(nineml.abstraction_layer,
                             ComponentClassXMLLoader.read_class_type(element) +
@@ -4,6 +4,7 @@ Definitions for the ComponentQuery Class
 :copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
 :license: BSD-3, see LICENSE for details.
 """
+from nineml.exceptions import NineMLRuntimeError
 
 __all__ = ['ComponentQueryer']
 
@@ -30,6 +31,48 @@ class ComponentQueryer(object):
         """Returns a map of names to |Parameter| objects"""
         return dict([(p.name, p) for p in self.componentclass.parameters])
 
+    @property
+    def alias_dependencies(self):
+        """Returns a map of the names of the |Aliases| to the names of the
+        other |Aliases| used on their RHS"""
+        aliases = set(a.lhs for a in self.componentclass.aliases)
+        return dict((a.lhs, aliases.intersection(a.rhs_names))
+                    for a in self.componentclass.aliases)
+
+    @property
+    def aliases_in_dependency_order(self):
+        """Returns a list of the |Aliases| in which each alias comes after the
+        aliases it is defined in terms of. Raises a NineMLRuntimeError if
+        the alias definitions are circular"""
+        dependencies = self.alias_dependencies
+        aliases = dict((a.lhs, a) for a in self.componentclass.aliases)
+        ordered = []
+        done = set()
+        for name in sorted(dependencies):
+            if name in done:
+                continue
+            # Depth-first search, with the path to the current alias on the
+            # stack so cycles can be reported
+            path = [name]
+            stack = [iter(sorted(dependencies[name]))]
+            while stack:
+                for dep in stack[-1]:
+                    if dep in path:
+                        raise NineMLRuntimeError(
+                            "Circular alias definitions: {}".format(
+                                ' -> '.join(path[path.index(dep):] + [dep])))
+                    if dep not in done:
+                        path.append(dep)
+                        stack.append(iter(sorted(dependencies[dep])))
+                        break
+                else:
+                    stack.pop()
+                    alias_name = path.pop()
+                    if alias_name not in done:
+                        done.add(alias_name)
+                        ordered.append(aliases[alias_name])
+        return ordered
+
     # Used by the flattening code:
     def get_fully_qualified_port_connections(self):
         """Used by the flattening code.
@@ -1,4 +1,4 @@
-from .base import PerNamespaceComponentValidator
+from .base import PerNamespaceComponentValidator, FusedComponentValidator
 from .general import (
     AliasesAreNotRecursiveComponentValidator,
     NoUnresolvedSymbolsComponentValidator,
@@ -4,7 +4,7 @@ docstring needed
 :copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
 :license: BSD-3, see LICENSE for details.
 """
-
+import sys
 from ..utils.visitors import ComponentActionVisitor
 
 
@@ -13,6 +13,18 @@ class BaseValidator(object):
     def get_warnings(self):
         raise NotImplementedError()
 
+    def validate(self, componentclass):
+        """Visits the componentclass and then checks what was collected"""
+        self.visit(componentclass)
+        self.check()
+
+    def check(self):
+        """
+        Run after the componentclass has been visited, to be overridden by
+        validators that check the symbols collected by their actions
+        """
+        pass
+
 
 class PerNamespaceComponentValidator(BaseValidator,
                                      ComponentActionVisitor):
@@ -28,3 +40,58 @@ class PerNamespaceComponentValidator(BaseValidator,
         namespace = component.get_node_addr()
         super(PerNamespaceComponentValidator, self).visit_componentclass(
             component, namespace=namespace)
+
+
+class FusedComponentValidator(ComponentActionVisitor):
+
+    """
+    Runs a list of validators from a single traversal of the componentclass.
+
+    Each action is dispatched to each of the validators in turn, which keep
+    their own symbol tables. If the action of a validator raises an exception
+    the validator is dropped from the rest of the traversal and the exception
+    is re-raised when the validator is reached in the list, after the checks
+    of the validators before it, so the error raised is the one that running
+    the validators one after the other would raise.
+    """
+
+    validator_classes = []  # To be overridden
+
+    def __init__(self, componentclass):
+        ComponentActionVisitor.__init__(self, require_explicit_overrides=True)
+        self.validators = [cls() for cls in self.validator_classes]
+        self._active = list(self.validators)
+        self._errors = {}
+        self.visit(componentclass)
+        for validator in self.validators:
+            try:
+                exc_type, exc_value, traceback = self._errors[validator]
+            except KeyError:
+                validator.check()
+            else:
+                raise exc_type, exc_value, traceback
+
+    def visit_componentclass(self, component, **kwargs):  # @UnusedVariable
+        namespace = component.get_node_addr()
+        super(FusedComponentValidator, self).visit_componentclass(
+            component, namespace=namespace)
+
+    def dispatch(self, action_name, obj, **kwargs):
+        failed = False
+        for validator in self._active:
+            try:
+                getattr(validator, action_name)(obj, **kwargs)
+            except Exception:
+                self._errors[validator] = sys.exc_info()
+                failed = True
+        if failed:
+            self._active = [v for v in self._active if v not in self._errors]
+
+    def action_componentclass(self, componentclass, **kwargs):
+        self.dispatch('action_componentclass', componentclass, **kwargs)
+
+    def action_parameter(self, parameter, **kwargs):
+        self.dispatch('action_parameter', parameter, **kwargs)
+
+    def action_alias(self, alias, **kwargs):
+        self.dispatch('action_alias', alias, **kwargs)
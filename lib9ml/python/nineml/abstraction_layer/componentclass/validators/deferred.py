@@ -0,0 +1,80 @@
+"""
+Deferred validation of componentclasses.
+
+Within a `deferred_validation()` block, componentclasses aren't validated
+when they are constructed or modified but are recorded instead, and are
+validated together when the block exits, e.g.
+
+    with nineml.deferred_validation(processes=4):
+        classes = [make_componentclass(i) for i in xrange(1000)]
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+import threading
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+# The componentclasses recorded by the deferred_validation block that is
+# active in the current thread (validation isn't deferred in other threads)
+_deferred = threading.local()
+
+
+def validation_deferred(componentclass):
+    """
+    Records the componentclass to be validated at the end of the active
+    deferred_validation block, returning False if there isn't one (in which
+    case the componentclass should be validated straight away)
+    """
+    recorded = getattr(_deferred, 'componentclasses', None)
+    if recorded is None:
+        return False
+    recorded.append(componentclass)
+    return True
+
+
+def _validate(componentclass):
+    componentclass._validate_self()
+
+
+@contextmanager
+def deferred_validation(processes=None):
+    """
+    Defers the validation of the componentclasses constructed or modified
+    within the block until it exits, when each of them is validated once (in
+    its final state). If an exception is raised within the block the
+    recorded componentclasses aren't validated. Nested blocks are part of the
+    outermost one. Only the componentclasses constructed in the thread that
+    entered the block are deferred. Only their validation is deferred, the
+    interfaces of DynamicsClasses are still inferred when they are
+    constructed.
+
+    `processes` -- the number of worker processes to validate the
+                   componentclasses in. By default they are validated in the
+                   current process
+    """
+    if getattr(_deferred, 'componentclasses', None) is not None:
+        yield
+        return
+    _deferred.componentclasses = []
+    try:
+        yield
+    finally:
+        recorded = _deferred.componentclasses
+        _deferred.componentclasses = None
+    componentclasses = []
+    seen = set()
+    for componentclass in recorded:
+        if id(componentclass) not in seen:
+            seen.add(id(componentclass))
+            componentclasses.append(componentclass)
+    if processes is not None and processes > 1 and len(componentclasses) > 1:
+        pool = Pool(processes)
+        try:
+            pool.map(_validate, componentclasses)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        for componentclass in componentclasses:
+            _validate(componentclass)
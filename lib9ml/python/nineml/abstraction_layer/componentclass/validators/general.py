@@ -16,10 +16,11 @@ class AliasesAreNotRecursiveComponentValidator(PerNamespaceComponentValidator):
 
     """Check that aliases are not self-referential"""
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def action_componentclass(self, componentclass, namespace):
 
@@ -55,7 +56,7 @@ class NoUnresolvedSymbolsComponentValidator(PerNamespaceComponentValidator):
     parameters, aliases, statevariables and ports
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
 
@@ -64,8 +65,10 @@ class NoUnresolvedSymbolsComponentValidator(PerNamespaceComponentValidator):
         self.time_derivatives = defaultdict(list)
         self.state_assignments = defaultdict(list)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         excludes = get_reserved_and_builtin_symbols()
 
         # Check Aliases:
@@ -116,11 +119,14 @@ class NoUnresolvedSymbolsComponentValidator(PerNamespaceComponentValidator):
 
 class NoDuplicatedObjectsComponentValidator(PerNamespaceComponentValidator):
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=True)
         self.all_objects = list()
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
+
+    def check(self):
         assert_no_duplicates(self.all_objects)
 
     def action_componentclass(self, componentclass, **kwargs):  # @UnusedVariable @IgnorePep8
@@ -141,11 +147,12 @@ class CheckNoLHSAssignmentsToMathsNamespaceComponentValidator(
     on the left-hand-side of an equation
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def check_lhssymbol_is_valid(self, symbol):
         assert isinstance(symbol, basestring)
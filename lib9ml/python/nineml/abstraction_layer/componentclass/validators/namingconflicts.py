@@ -22,11 +22,12 @@ class LocalNameConflictsComponentValidator(PerNamespaceComponentValidator):
     will use names.
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
         self.symbols = defaultdict(list)
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def check_conflicting_symbol(self, namespace, symbol):
         if symbol in self.symbols[namespace]:
@@ -44,11 +45,12 @@ class LocalNameConflictsComponentValidator(PerNamespaceComponentValidator):
 
 class DimensionNameConflictsComponentValidator(PerNamespaceComponentValidator):
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
         self.dimensions = {}
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def check_conflicting_dimension(self, dimension):
         try:
@@ -16,15 +16,17 @@ class PortConnectionsComponentValidator(PerNamespaceComponentValidator):
     each send & recv port only has a single connection.
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceComponentValidator.__init__(
             self, require_explicit_overrides=False)
 
         self.ports = defaultdict(list)
         self.portconnections = list()
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         connected_recv_ports = set()
 
         # Check for duplicate connections in the
@@ -6,20 +6,23 @@ docstring needed
 """
 
 from ..utils import ComponentActionVisitor
+from .base import BaseValidator
 from ..base import ComponentClass, Parameter
 from ...expressions import Alias
 
 
-class TypesComponentValidator(ComponentActionVisitor):
+class TypesComponentValidator(BaseValidator, ComponentActionVisitor):
 
-    def __init__(self, componentclass):
-        super(TypesComponentValidator, self).__init__()
-        self.visit(componentclass)
+    def __init__(self, componentclass=None):
+        BaseValidator.__init__(self)
+        ComponentActionVisitor.__init__(self)
+        if componentclass is not None:
+            self.validate(componentclass)
 
-    def action_componentclass(self, component):
+    def action_componentclass(self, component, **kwargs):  # @UnusedVariable
         assert isinstance(component, ComponentClass)
 
-    def action_parameter(self, parameter):
+    def action_parameter(self, parameter, **kwargs):  # @UnusedVariable
         assert isinstance(parameter, Parameter), \
             "{} != {}".format(type(parameter), Parameter)
 
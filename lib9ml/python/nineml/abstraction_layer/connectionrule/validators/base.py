@@ -17,6 +17,28 @@ from .ports import (
     PortConnectionsConnectionRuleValidator)
 from .types import (
     TypesConnectionRuleValidator)
+from ...componentclass.validators.base import FusedComponentValidator
+from ..utils.visitors import ConnectionRuleActionVisitor
+
+
+class FusedConnectionRuleValidator(FusedComponentValidator,
+                                   ConnectionRuleActionVisitor):
+
+    """Runs all the connection-rule validators from a single traversal"""
+
+    validator_classes = [
+        TypesConnectionRuleValidator,
+        NoDuplicatedObjectsConnectionRuleValidator,
+        LocalNameConflictsConnectionRuleValidator,
+        DimensionNameConflictsConnectionRuleValidator,
+        AliasesAreNotRecursiveConnectionRuleValidator,
+        NoUnresolvedSymbolsConnectionRuleValidator,
+        PortConnectionsConnectionRuleValidator,
+        CheckNoLHSAssignmentsToMathsNamespaceConnectionRuleValidator]
+
+    def action_connectionruleblock(self, connectionruleblock, **kwargs):
+        self.dispatch('action_connectionruleblock', connectionruleblock,
+                      **kwargs)
 
 
 class ConnectionRuleValidator(object):
@@ -29,13 +51,13 @@ class ConnectionRuleValidator(object):
         Tests a componentclassclass against a variety of tests, to verify its
         internal structure
         """
-        # Check class structure:
-        TypesConnectionRuleValidator(componentclass)
-        NoDuplicatedObjectsConnectionRuleValidator(componentclass)
-        LocalNameConflictsConnectionRuleValidator(componentclass)
-        DimensionNameConflictsConnectionRuleValidator(componentclass)
-        AliasesAreNotRecursiveConnectionRuleValidator(componentclass)
-        NoUnresolvedSymbolsConnectionRuleValidator(componentclass)
-        PortConnectionsConnectionRuleValidator(componentclass)
-        CheckNoLHSAssignmentsToMathsNamespaceConnectionRuleValidator(
-            componentclass)
+        FusedConnectionRuleValidator(componentclass)
+
+    @classmethod
+    def validate_componentclass_separately(cls, componentclass):
+        """
+        Runs each of the validators in turn with its own traversal of the
+        componentclass (equivalent to `validate_componentclass`)
+        """
+        for validator_class in FusedConnectionRuleValidator.validator_classes:
+            validator_class(componentclass)
@@ -13,5 +13,5 @@ from ..utils.visitors import ConnectionRuleActionVisitor
 class TypesConnectionRuleValidator(ConnectionRuleActionVisitor,
                                    TypesComponentValidator):
 
-    def action_connectionruleblock(self, connectionruleblock):
+    def action_connectionruleblock(self, connectionruleblock, **kwargs):  # @UnusedVariable @IgnorePep8
         assert isinstance(connectionruleblock, ConnectionRuleBlock)
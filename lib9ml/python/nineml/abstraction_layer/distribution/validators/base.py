@@ -17,6 +17,27 @@ from .ports import (
     PortConnectionsDistributionValidator)
 from .types import (
     TypesDistributionValidator)
+from ...componentclass.validators.base import FusedComponentValidator
+from ..utils.visitors import DistributionActionVisitor
+
+
+class FusedDistributionValidator(FusedComponentValidator,
+                                 DistributionActionVisitor):
+
+    """Runs all the distribution validators from a single traversal"""
+
+    validator_classes = [
+        TypesDistributionValidator,
+        NoDuplicatedObjectsDistributionValidator,
+        LocalNameConflictsDistributionValidator,
+        DimensionNameConflictsDistributionValidator,
+        AliasesAreNotRecursiveDistributionValidator,
+        NoUnresolvedSymbolsDistributionValidator,
+        PortConnectionsDistributionValidator,
+        CheckNoLHSAssignmentsToMathsNamespaceDistributionValidator]
+
+    def action_distributionblock(self, distributionblock, **kwargs):
+        self.dispatch('action_distributionblock', distributionblock, **kwargs)
 
 
 class DistributionValidator(object):
@@ -29,13 +50,13 @@ class DistributionValidator(object):
         Tests a componentclassclass against a variety of tests, to verify its
         internal structure
         """
-        # Check class structure:
-        TypesDistributionValidator(componentclass)
-        NoDuplicatedObjectsDistributionValidator(componentclass)
-        LocalNameConflictsDistributionValidator(componentclass)
-        DimensionNameConflictsDistributionValidator(componentclass)
-        AliasesAreNotRecursiveDistributionValidator(componentclass)
-        NoUnresolvedSymbolsDistributionValidator(componentclass)
-        PortConnectionsDistributionValidator(componentclass)
-        CheckNoLHSAssignmentsToMathsNamespaceDistributionValidator(
-            componentclass)
+        FusedDistributionValidator(componentclass)
+
+    @classmethod
+    def validate_componentclass_separately(cls, componentclass):
+        """
+        Runs each of the validators in turn with its own traversal of the
+        componentclass (equivalent to `validate_componentclass`)
+        """
+        for validator_class in FusedDistributionValidator.validator_classes:
+            validator_class(componentclass)
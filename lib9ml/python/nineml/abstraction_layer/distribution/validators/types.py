@@ -13,5 +13,5 @@ from ..utils.visitors import DistributionActionVisitor
 class TypesDistributionValidator(DistributionActionVisitor,
                                  TypesComponentValidator):
 
-    def action_distributionblock(self, distributionblock):
+    def action_distributionblock(self, distributionblock, **kwargs):  # @UnusedVariable @IgnorePep8
         assert isinstance(distributionblock, DistributionBlock)
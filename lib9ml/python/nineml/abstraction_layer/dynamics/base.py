@@ -19,8 +19,8 @@ from ..ports import (AnalogReceivePort, AnalogSendPort,
 from nineml.utils import (check_list_contain_same_items, invert_dictionary,
                             assert_no_duplicates)
 from .utils import DynamicsQueryer
-from .utils.cloner import (
-    DynamicsExpandAliasDefinition, DynamicsClonerVisitor)
+from .utils.cloner import DynamicsClonerVisitor
+from ..componentclass.validators.deferred import validation_deferred
 from .. import BaseALObject
 
 
@@ -251,7 +251,7 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
                  event_ports=[],
                  dynamicsblock=None, subnodes=None,
                  portconnections=None, regimes=None,
-                 aliases=None, state_variables=None):
+                 aliases=None, state_variables=None, unused_interface=None):
         """Constructs a DynamicsClass
 
         :param name: The name of the componentclass.
@@ -277,6 +277,10 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
             this componentclass; |Parameters|, |AnalogPorts| and |EventPorts|.
             ``interface`` takes a list of these objects, and automatically
             resolves them by type into the correct types.
+        :param unused_interface: The names of declared |Parameters| and
+            |EventPorts| that aren't used by the dynamics (e.g. as the regimes
+            that used them were pruned when the componentclass was
+            flattened), which don't have to match the inferred interface.
 
         Examples:
 
@@ -328,11 +332,20 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
         # EventPort, StateVariable and Parameter Inference:
         inferred_struct = DynamicsClassInterfaceInferer(self)
 
+        self._unused_interface = frozenset(unused_interface or ())
+        undeclared = self._unused_interface.difference(
+            p if isinstance(p, basestring) else p.name
+            for p in chain(parameters if parameters else [], event_ports))
+        if undeclared:
+            raise NineMLRuntimeError(
+                "Unused interface names '{}' aren't declared parameters or "
+                "event ports".format("', '".join(sorted(undeclared))))
+
         # Check any supplied parameters match:
         if parameters is not None:
             inf_check(self._parameters.keys(),
                       inferred_struct.parameter_names,
-                      'Parameters')
+                      'Parameters', ignore=self._unused_interface)
         else:
             self._parameters = dict((n, Parameter(n))
                                     for n in inferred_struct.parameter_names)
@@ -360,7 +373,7 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
             # list is identical to the inferred one.
             inf_check(self._event_receive_ports.keys(),
                       inferred_struct.input_event_port_names,
-                      'Event Ports In')
+                      'Event Ports In', ignore=self._unused_interface)
         else:
             # FIXME: TGC don't like this shorthand
             # Event ports not supplied, so lets use the inferred ones.
@@ -373,7 +386,7 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
         if len(self._event_send_ports):
             inf_check(self._event_send_ports.keys(),
                       inferred_struct.event_out_port_names,
-                      'Event Ports Out')
+                      'Event Ports Out', ignore=self._unused_interface)
         else:
             # Event ports not supplied, so lets use the inferred ones.
             for pname in inferred_struct.event_out_port_names:
@@ -397,6 +410,12 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
     def __repr__(self):
         return "<dynamics.DynamicsClass %s>" % self.name
 
+    @property
+    def unused_interface(self):
+        """The names of the declared |Parameters| and |EventPorts| that
+        aren't used by the dynamics"""
+        return self._unused_interface
+
     @property
     def flattener(self):
         """
@@ -420,7 +439,8 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
         return self.flattener is not None
 
     def _validate_self(self):
-        DynamicsValidator.validate_componentclass(self)
+        if not validation_deferred(self):
+            DynamicsValidator.validate_componentclass(self)
 
     @property
     def query(self):
@@ -591,15 +611,45 @@ class DynamicsClass(ComponentClass, _NamespaceMixin):
 
         """
 
-        for alias in self.aliases:
-            alias_expander = DynamicsExpandAliasDefinition(
-                originalname=alias.lhs, targetname=("(%s)" % alias.rhs))
-            alias_expander.visit(self)
+        # Each alias is expanded once, after the aliases it depends on, and
+        # the expanded syntax trees are substituted into all the expressions
+        # in a single pass
+        expanded = {}
+        for alias in self.query.aliases_in_dependency_order:
+            if alias.rhs_tree is not None:
+                expanded[alias.lhs] = alias.rhs_tree.substitute(expanded)
+        for expr in self.query.expressions:
+            if expr.rhs_tree is not None and \
+                    any(n in expanded for n in expr.rhs_names):
+                expr.rhs = str(expr.rhs_tree.substitute(expanded))
+
+    def eliminate_common_subexpressions(self, prefix='cse', min_uses=2):
+        """Returns a copy of the componentclass in which the sub-expressions
+        that are used ``min_uses`` times or more in its |Aliases|,
+        |TimeDerivatives|, |StateAssignments| and |Conditions| are replaced
+        by temporary |Aliases| named ``prefix`` + index (see
+        :class:`DynamicsCSE`)
+        """
+        return DynamicsCSE(self, prefix=prefix,
+                           min_uses=min_uses).eliminate()
+
+    def specialise(self, properties, si_units=False, name=None):
+        """Returns a copy of the componentclass in which the |Parameters|
+        bound to single values in ``properties`` (a |PropertySet|) are
+        substituted by their values, constant sub-expressions are folded and
+        |Aliases| that become constants are substituted into the expressions
+        that use them (see :class:`DynamicsSpecialiser`)
+        """
+        return DynamicsSpecialiser(self, properties,
+                                   si_units=si_units).specialised(name=name)
 
 
-def inf_check(l1, l2, desc):
+def inf_check(l1, l2, desc, ignore=()):
     check_list_contain_same_items(l1, l2, desc1='Declared',
-                                  desc2='Inferred', ignore=['t'], desc=desc)
+                                  desc2='Inferred',
+                                  ignore=['t'] + list(ignore), desc=desc)
 
 from .validators import DynamicsValidator
 from .utils import DynamicsClassInterfaceInferer
+from .utils.cse import DynamicsCSE
+from .utils.specialiser import DynamicsSpecialiser
@@ -8,7 +8,6 @@ This file contains the definitions for the Events
 from nineml.utils import ensure_valid_identifier, filter_discrete_types
 from nineml.abstraction_layer.componentclass import BaseALObject
 from ..expressions import Expression, ExpressionWithSimpleLHS
-from ..expressions.utils import MathUtil, str_to_npfunc_map
 from ...exceptions import NineMLRuntimeError
 from .utils.cloner import DynamicsClonerVisitor
 from ..expressions import parse
@@ -296,6 +295,9 @@ class Trigger(Expression):
 
         return parse.cond(rhs)
 
+    def _parse_rhs_tree(self, rhs):
+        return parse.cond_tree(rhs)
+
     # def is_bool(self):
     #    """ Checks if conditions is pure bool: True, False"""
     #    if self.names==set() and self.funcs==set():
@@ -313,26 +315,6 @@ class Trigger(Expression):
     #                str_to_npfunc_map, namespace)
     # math_namespace.namespace, namespace)
 
-    def rhs_as_python_func(self, namespace={}):
-        """ Returns a python callable which evaluates the expression in
-        namespace and returns the result """
-        rhs = self.rhs
-
-        rhs = rhs.replace('!', ' not ')
-        rhs = rhs.replace('&', ' and ')
-        rhs = rhs.replace('|', ' or ')
-
-        name_map = {
-            'true': 'True',
-            'false': 'False'
-        }
-
-        for frm, to in name_map.iteritems():
-            rhs = MathUtil.str_expr_replacement(frm, to, rhs)
-
-        lmda_str = "lambda %s: %s" % (','.join(self.rhs_names), rhs)
-        return eval(lmda_str, str_to_npfunc_map, namespace)
-
     def __repr__(self):
         return "Trigger('%s')" % (self.rhs)
 
@@ -123,7 +123,8 @@ class DynamicsClonerVisitor(ComponentClonerVisitor):
                       if componentclass.dynamicsblock else None),
             subnodes=dict([(k, v.accept_visitor(self, **kwargs))
                            for (k, v) in componentclass.subnodes.iteritems()]),
-            portconnections=componentclass.portconnections[:])
+            portconnections=componentclass.portconnections[:],
+            unused_interface=componentclass.unused_interface)
         return ccn
 
     def visit_dynamicsblock(self, dynamicsblock, **kwargs):
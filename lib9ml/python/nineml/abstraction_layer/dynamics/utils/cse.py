@@ -0,0 +1,166 @@
+"""
+Common-subexpression elimination over the expressions of a DynamicsClass.
+
+The sub-expressions that are used more than once across the aliases, time
+derivatives, state assignments and triggers of a component are found by
+counting the uses of the nodes of their (hash-consed) syntax trees, and are
+replaced by temporaries, which are defined as aliases so that they can be
+evaluated once per step by code generators.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from collections import OrderedDict
+from itertools import chain
+from nineml.exceptions import NineMLRuntimeError
+from ...expressions import Alias
+from ...expressions.tree import Name, Call, UnaryOp, BinOp
+from ...expressions.utils import random_functions
+from .cloner import DynamicsClonerVisitor
+
+
+_arithmetic_ops = set(['+', '-', '*', '/', '**'])
+
+
+class DynamicsCSE(object):
+
+    """
+    Finds the sub-expressions that are shared between the expressions of a
+    flat DynamicsClass.
+
+    `temporaries`  -- an ordered dictionary of the names of the temporaries
+                      introduced for the shared sub-expressions and their
+                      (rewritten) trees, in the order they need to be
+                      evaluated in
+    `aliases`      -- the shared sub-expressions that are already the RHS of
+                      an alias, mapped to the name of the alias
+    """
+
+    def __init__(self, componentclass, prefix='cse', min_uses=2):
+        if not componentclass.is_flat():
+            raise NineMLRuntimeError('Common-subexpression elimination on '
+                                     'non-flat componentclass')
+        self.componentclass = componentclass
+        self.prefix = prefix
+        self.min_uses = min_uses
+        self.aliases = {}
+        for alias in componentclass.aliases:
+            self.aliases.setdefault(alias.rhs_tree, alias.lhs)
+        self._names = set(chain(
+            (p.name for p in componentclass.parameters),
+            (p.name for p in componentclass.analog_ports),
+            (sv.name for sv in componentclass.state_variables),
+            (a.lhs for a in componentclass.aliases)))
+        self._replacements = {}
+        self.temporaries = OrderedDict()
+        self._find_shared()
+
+    def _find_shared(self):
+        # Count the uses of each node as if each distinct node was evaluated
+        # once, i.e. the children of a node are only counted the first time
+        # it is used
+        uses = {}
+        for expr in self.componentclass.query.expressions:
+            tree = expr.rhs_tree
+            if tree is None:
+                continue
+            stack = [tree]
+            while stack:
+                node = stack.pop()
+                uses[node] = uses.get(node, 0) + 1
+                if uses[node] == 1:
+                    stack.extend(node.children)
+        # Go through the nodes children first so the temporaries of
+        # sub-expressions are defined before the temporaries that use them
+        visited = set()
+        for expr in self.componentclass.query.expressions:
+            tree = expr.rhs_tree
+            if tree is None or tree in visited:
+                continue
+            for node in tree.iter_nodes():
+                if node in visited:
+                    continue
+                visited.add(node)
+                if uses[node] >= self.min_uses and self._is_candidate(node):
+                    try:
+                        name = self.aliases[node]
+                    except KeyError:
+                        name = self._new_name()
+                        self.temporaries[name] = self.rewrite(node)
+                    self._replacements[node] = Name(name)
+
+    def _is_candidate(self, node):
+        """
+        Whether a node is worth replacing with a temporary, i.e. it is a
+        deterministic arithmetic expression that isn't just the negation of a
+        name or a number
+        """
+        if isinstance(node, BinOp):
+            candidate = node.op in _arithmetic_ops
+        elif isinstance(node, UnaryOp):
+            candidate = node.op == '-' and bool(node.operand.children)
+        else:
+            candidate = isinstance(node, Call)
+        return candidate and not (node.funcs & random_functions)
+
+    def _new_name(self):
+        i = len(self.temporaries)
+        while '{}{}'.format(self.prefix, i) in self._names:
+            i += 1
+        name = '{}{}'.format(self.prefix, i)
+        self._names.add(name)
+        return name
+
+    def rewrite(self, tree, keep_root=True):
+        """
+        Returns the tree with its shared sub-expressions replaced by the names
+        of their temporaries (or aliases). The root of the tree itself is
+        only replaced if `keep_root` is False.
+        """
+        memo = {}
+        for node in tree.iter_nodes():
+            if node is not tree or not keep_root:
+                try:
+                    memo[node] = self._replacements[node]
+                    continue
+                except KeyError:
+                    pass
+            children = tuple(memo[c] for c in node.children)
+            if any(n is not c for n, c in zip(children, node.children)):
+                memo[node] = node._with_children(children)
+            else:
+                memo[node] = node
+        return memo[tree]
+
+    def eliminate(self):
+        """
+        Returns a copy of the componentclass with the shared sub-expressions
+        of its expressions replaced by temporary aliases
+        """
+        componentclass = DynamicsClonerVisitor().visit(self.componentclass)
+        for expr in componentclass.query.expressions:
+            tree = expr.rhs_tree
+            if tree is None:
+                continue
+            # The RHS of an alias isn't replaced by the alias itself
+            keep_root = (isinstance(expr, Alias) and
+                         self.aliases.get(tree) == expr.lhs)
+            rewritten = self.rewrite(tree, keep_root=keep_root)
+            if rewritten is not tree:
+                expr.rhs = str(rewritten)
+        # The rewritten class is constructed (and so validated) with the
+        # temporaries added to its aliases
+        return DynamicsClass(
+            name=componentclass.name,
+            parameters=list(componentclass.parameters),
+            analog_ports=list(componentclass.analog_ports),
+            event_ports=list(componentclass.event_ports),
+            regimes=list(componentclass.regimes),
+            aliases=list(chain(
+                componentclass.aliases,
+                (Alias(name, str(tree))
+                 for name, tree in self.temporaries.iteritems()))),
+            state_variables=list(componentclass.state_variables),
+            unused_interface=componentclass.unused_interface)
+
+from ..base import DynamicsClass
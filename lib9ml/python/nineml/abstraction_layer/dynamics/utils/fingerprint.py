@@ -0,0 +1,123 @@
+"""
+Structural fingerprints of DynamicsClass objects.
+
+The fingerprint of a componentclass is a hashable, nested tuple of everything
+that its validation depends on, i.e. the names and dimensions of its
+parameters, ports and state variables, its expressions, its regime graph and
+the fingerprints of its subnodes and its port connections. It doesn't depend
+on the name of the componentclass (or the order its elements were added in),
+so clones and renamed copies of a componentclass have the same fingerprint.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from ...componentclass.utils import ComponentVisitor
+
+
+def _dimension(dimension):
+    if dimension is None:
+        return None
+    return (dimension.name, dimension.powers)
+
+
+class DynamicsFingerprinter(ComponentVisitor):
+
+    """
+    Returns the structural fingerprint of a componentclass from `visit`.
+
+    Whether any of the objects of the componentclass are shared between two
+    places in it (which the validation rejects) is included in the
+    fingerprint too, as that can't be told from the structure alone.
+    """
+
+    def __init__(self):
+        self.objects = []
+
+    def visit(self, obj, **kwargs):
+        self.objects.append(obj)
+        return obj.accept_visitor(self, **kwargs)
+
+    def visit_all(self, objs):
+        return tuple(sorted(self.visit(o) for o in objs))
+
+    def fingerprint(self, componentclass):
+        fingerprint = self.visit(componentclass)
+        shares_objects = len(set(id(o) for o in self.objects)) != len(
+            self.objects)
+        return (fingerprint, shares_objects)
+
+    def visit_componentclass(self, componentclass, **kwargs):  # @UnusedVariable @IgnorePep8
+        if componentclass.dynamicsblock is not None:
+            dynamicsblock = self.visit(componentclass.dynamicsblock)
+        else:
+            dynamicsblock = None
+        return (
+            type(componentclass).__name__,
+            self.visit_all(componentclass.parameters),
+            self.visit_all(componentclass.ports),
+            dynamicsblock,
+            tuple(sorted((ns, self.visit(s))
+                         for ns, s in componentclass.subnodes.iteritems())),
+            tuple((str(src), str(sink))
+                  for src, sink in componentclass.portconnections))
+
+    def visit_dynamicsblock(self, dynamicsblock, **kwargs):  # @UnusedVariable
+        return (self.visit_all(dynamicsblock.regimes),
+                self.visit_all(dynamicsblock.aliases),
+                self.visit_all(dynamicsblock.state_variables))
+
+    def visit_regime(self, regime, **kwargs):  # @UnusedVariable
+        return (regime.name,
+                self.visit_all(regime.time_derivatives),
+                tuple(self.visit(t) for t in regime.on_events),
+                tuple(self.visit(t) for t in regime.on_conditions))
+
+    def _visit_transition(self, transition):
+        target = transition.target_regime
+        return (None if target is None else target.name,
+                self.visit_all(transition.state_assignments),
+                tuple(self.visit(e) for e in transition.event_outputs))
+
+    def visit_oncondition(self, on_condition, **kwargs):  # @UnusedVariable
+        return (self.visit(on_condition.trigger),
+                self._visit_transition(on_condition))
+
+    def visit_onevent(self, on_event, **kwargs):  # @UnusedVariable
+        return (on_event.src_port_name, self._visit_transition(on_event))
+
+    def visit_parameter(self, parameter, **kwargs):  # @UnusedVariable
+        return (parameter.name, _dimension(parameter.dimension))
+
+    def visit_statevariable(self, state_variable, **kwargs):  # @UnusedVariable @IgnorePep8
+        return (state_variable.name, _dimension(state_variable.dimension))
+
+    def visit_alias(self, alias, **kwargs):  # @UnusedVariable
+        return (alias.lhs, alias.rhs)
+
+    def visit_timederivative(self, time_derivative, **kwargs):  # @UnusedVariable @IgnorePep8
+        return (time_derivative.dependent_variable, time_derivative.rhs)
+
+    def visit_assignment(self, assignment, **kwargs):  # @UnusedVariable
+        return (assignment.lhs, assignment.rhs)
+
+    def visit_trigger(self, trigger, **kwargs):  # @UnusedVariable
+        return trigger.rhs
+
+    def visit_outputevent(self, event_out, **kwargs):  # @UnusedVariable
+        return event_out.port_name
+
+    def visit_analogsendport(self, port, **kwargs):  # @UnusedVariable
+        return ('AnalogSendPort', port.name, _dimension(port.dimension))
+
+    def visit_analogreceiveport(self, port, **kwargs):  # @UnusedVariable
+        return ('AnalogReceivePort', port.name, _dimension(port.dimension))
+
+    def visit_analogreduceport(self, port, **kwargs):  # @UnusedVariable
+        return ('AnalogReducePort', port.name, _dimension(port.dimension),
+                port.reduce_op)
+
+    def visit_eventsendport(self, port, **kwargs):  # @UnusedVariable
+        return ('EventSendPort', port.name)
+
+    def visit_eventreceiveport(self, port, **kwargs):  # @UnusedVariable
+        return ('EventReceivePort', port.name)
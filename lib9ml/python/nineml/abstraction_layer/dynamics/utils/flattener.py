@@ -6,14 +6,15 @@ docstring needed
 """
 
 import itertools
-from collections import defaultdict
+from operator import mul
+from collections import defaultdict, deque
 from nineml.utils import flatten_first_level
 from .cloner import (
     DynamicsClonerVisitor, DynamicsClonerVisitorPrefixNamespace,
     DynamicsExpandPortDefinition)
 from nineml.abstraction_layer.componentclass.namespace import NamespaceAddress
 from nineml.exceptions import NineMLRuntimeError
-from nineml.abstraction_layer.dynamics.regimes import Regime
+from nineml.abstraction_layer.dynamics.regimes import Regime, TimeDerivative
 from ..transitions import OnCondition, OnEvent
 
 
@@ -59,9 +60,10 @@ class TransitionResolver(object):
         # Recursively solve the transitions:
         self.resolve_transitions()
 
-        # Find the new target regime:
-        self.target_regime = flattener.old_regime_tuple_to_new_regime_map[
-            tuple(self.dst_regime_tuple)]
+        # Find the name of the new target regime (adding it to the regimes
+        # to build if it hasn't been reached yet):
+        self.target_regime_name = flattener.get_compound_regime_name(
+            tuple(self.dst_regime_tuple))
 
     def resolve_transitions(self):
         while self.unresolved_transitions:
@@ -147,12 +149,30 @@ class ComponentFlattener(object):
     # ------------------------------------- #
     def get_new_regime(self, old_regime_string):
         """
+        Returns the regime of the flattened component that corresponds to the
+        regimes of the subcomponents given in the string,
+
         for example:
         old_regime_string = ('iaf:subthresholdregime '
                              'cobaInhib:cobadefaultregime '
                              'cobaExcit:cobadefaultregime')
         """
 
+        target_regime_tuple = self.get_regime_tuple(old_regime_string)
+        try:
+            return self.old_regime_tuple_to_new_regime_map[
+                target_regime_tuple]
+        except KeyError:
+            raise NineMLRuntimeError(
+                "Regime '{}' was pruned as it is unreachable from the initial "
+                "regimes".format(old_regime_string))
+
+    def get_regime_tuple(self, old_regime_string):
+        """
+        Returns the tuple of the regimes of the componentswithregimes given in
+        the string (in the format used by `get_new_regime`). Components with
+        a single regime can be left out of the string.
+        """
         # Lets create a dictionary that maps 'NamespaceAddress' to regime name
         # from the input string:
         # old_regime_string = 'iaf:subthresholdregime'
@@ -167,6 +187,10 @@ class ComponentFlattener(object):
         target_regime_tuple = []
         for c in self.componentswithregimes:
             comp_ns = c.get_node_addr()
+            regimes = list(c.regimes)
+            if comp_ns not in ns_regimename and len(regimes) == 1:
+                target_regime_tuple.append(regimes[0])
+                continue
             if comp_ns not in ns_regimename:
                 err = ('Looking for a regime in namespace: {}, but not found.'
                        .format(comp_ns))
@@ -185,17 +209,29 @@ class ComponentFlattener(object):
 
             target_regime_tuple.append(regime_map[target_regime_name])
 
-        target_regime_tuple = tuple(target_regime_tuple)
-
-        new_regime = self.old_regime_tuple_to_new_regime_map[
-            target_regime_tuple]
-        return new_regime
+        return tuple(target_regime_tuple)
 
     # Flattening Functions:
     # --------------------- #
-    def __init__(self, componentclass, componentname=None):
+    def __init__(self, componentclass, componentname=None,
+                 initial_regimes=None, max_regimes=None):
+        """
+        `initial_regimes` -- the regimes of the subcomponents the flattened
+                             component can start in, as a string in the
+                             format used by `get_new_regime` (or a list of
+                             them). Only the compound regimes that are
+                             reachable from them are built. They can only
+                             be left out if each subcomponent has a single
+                             regime
+        `max_regimes`     -- the maximum number of compound regimes to build,
+                             above which a NineMLRuntimeError is raised
+        """
         assert isinstance(componentclass, DynamicsClass)
 
+        # The number of combinations of the subcomponents' regimes that were
+        # left out of the flattened component as they are unreachable:
+        self.pruned_regimes = 0
+
         # Is our componentclass already flat??
         if componentclass.is_flat():
             self.reducedcomponent = DynamicsClonerVisitor().visit(componentclass)
@@ -215,67 +251,165 @@ class ComponentFlattener(object):
         self.componentswithregimes = [
             m for m in self.all_components if list(m.regimes)]
 
-        # This will get filled in build_new_regime_space(): (It maps {
+        # This will get filled once build_new_regime_space() has found the
+        # reachable regimes: (It maps {
         # (Regime,Regime,...,Regime) : Regime, (Regime,Regime,...,Regime) :
         # Regime,} Where the key tuple represents the regimes in the
         # hierachical componentclass, corresponding to self.componentswithregimes.
         # And the values are the regimes in the new componentclass.
         self.old_regime_tuple_to_new_regime_map = None
 
+        if initial_regimes is None:
+            several = [str(c.get_node_addr())
+                       for c in self.componentswithregimes
+                       if len(list(c.regimes)) > 1]
+            if several:
+                raise NineMLRuntimeError(
+                    "The initial regimes of '{}' need to be given to flatten "
+                    "'{}' as they have more than one regime"
+                    .format("', '".join(several), self.componentname))
+            initial_regimes = ''
+        if isinstance(initial_regimes, basestring):
+            initial_regimes = [initial_regimes]
+        self.initial_regime_tuples = [self.get_regime_tuple(r)
+                                      for r in initial_regimes]
+        self.max_regimes = max_regimes
+
         # OK, Heavy-lifting Code:
         # ===================== #
         self.build_new_regime_space()
 
+        aliases = flatten_first_level(
+            [m.aliases for m in self.all_components])
+        state_variables = flatten_first_level(
+            [m.state_variables for m in self.all_components])
+        event_ports = flatten_first_level(
+            [comp.event_ports for comp in self.all_components])
+        parameters = flatten_first_level([m.parameters
+                                          for m in self.all_components])
+        constant_state_variables = []
+        unused_interface = []
+        if self.pruned_regimes:
+            constant_state_variables, unused_interface = self.find_unused(
+                aliases, state_variables, event_ports, parameters)
+        self.old_regime_tuple_to_new_regime_map = dict(
+            (regimetuple, ComponentFlattener.create_compound_regime(
+                regimetuple, name, self._compound_transitions[regimetuple],
+                constant_state_variables))
+            for regimetuple, name in self._compound_regime_names.iteritems())
+
         # Build Our New Component
         self.reducedcomponent = DynamicsClass(
             name=self.componentname,
-            aliases=flatten_first_level(
-                [m.aliases for m in self.all_components]),
-            state_variables=flatten_first_level(
-                [m.state_variables for m in self.all_components]),
+            aliases=aliases,
+            state_variables=state_variables,
             regimes=self.old_regime_tuple_to_new_regime_map.values(),
             analog_ports=flatten_first_level(
                 [comp.analog_ports for comp in self.all_components]),
-            event_ports=flatten_first_level(
-                [comp.event_ports for comp in self.all_components]),
-            parameters=flatten_first_level([m.parameters
-                                            for m in self.all_components]))
+            event_ports=event_ports,
+            parameters=parameters,
+            unused_interface=unused_interface)
 
         self.remap_analog_ports()
 
         # Attach this flattening information to the componentclass:
         self.reducedcomponent.set_flattener(self)
 
+    def find_unused(self, aliases, state_variables, event_ports,
+                    parameters):
+        """
+        Returns the names of the state variables that no longer change in
+        the new regimes, which are held constant by zero time derivatives,
+        and of the parameters and event ports that were only used in the
+        pruned regimes, which are kept in the interface of the flattened
+        component but aren't used by its dynamics.
+        """
+        atoms = set(itertools.chain(*[a.rhs_atoms for a in aliases]))
+        assigned = set()
+        ports_in = set()
+        ports_out = set()
+        for regimetuple, transitions in self._compound_transitions.iteritems():
+            for td in itertools.chain(*[r.time_derivatives
+                                        for r in regimetuple]):
+                assigned.add(td.dependent_variable)
+                atoms.update(td.rhs_atoms)
+            for transition in transitions:
+                if isinstance(transition, OnCondition):
+                    atoms.update(transition.trigger.rhs_atoms)
+                else:
+                    ports_in.add(transition.src_port_name)
+                for state_assignment in transition.state_assignments:
+                    assigned.add(state_assignment.lhs)
+                    atoms.update(state_assignment.rhs_atoms)
+                ports_out.update(e.port_name
+                                 for e in transition.event_outputs)
+        constant_state_variables = [sv.name for sv in state_variables
+                                    if sv.name not in assigned]
+        unused_interface = [p.name for p in event_ports
+                            if p.name not in (ports_out if p.mode == 'send'
+                                              else ports_in)]
+        unused_interface.extend(p.name for p in parameters
+                                if p.name not in atoms)
+        return constant_state_variables, unused_interface
+
     @classmethod
-    def create_compound_regime(cls, regimetuple, name):
+    def create_compound_regime(cls, regimetuple, name, transitions=(),
+                               constant_state_variables=()):
 
         # Copy accross all the odes from each regime.
-        # We don't worry about transitions yet, we deal with them later.
-
         # We need to clone the time_derivatives:
         time_derivs = flatten_first_level(
             [r.time_derivatives for r in regimetuple])
         time_derivs = [DynamicsClonerVisitor().visit(td) for td in time_derivs]
+        # State variables that no longer change are held constant
+        time_derivs.extend(TimeDerivative(dependent_variable=sv, rhs='0')
+                           for sv in constant_state_variables)
 
-        return Regime(name=name, time_derivatives=time_derivs)
+        return Regime(name=name, time_derivatives=time_derivs,
+                      transitions=transitions)
+
+    def get_compound_regime_name(self, regimetuple):
+        """
+        Returns the name of the new Regime for a tuple of old regimes, adding
+        it to the worklist of build_new_regime_space if it hasn't been
+        reached before
+        """
+        try:
+            return self._compound_regime_names[regimetuple]
+        except KeyError:
+            pass
+        if (self.max_regimes is not None and
+                len(self._compound_regime_names) >= self.max_regimes):
+            raise NineMLRuntimeError(
+                "Flattening '{}' requires more than the maximum of {} "
+                "compound regimes".format(self.componentname,
+                                          self.max_regimes))
+        name = '_and_'.join(r.name for r in regimetuple)
+        self._compound_regime_names[regimetuple] = name
+        self._compound_transitions[regimetuple] = []
+        self._unresolved_regime_tuples.append(regimetuple)
+        return name
 
     def build_new_regime_space(self):
 
-        # Build the new Regime Space, by taking the cross-product of
-        # the old regimes. We create a map linking the old regimes tuples
-        # to the new Regime.
-        # At this point, there are no transitions:
-        self.old_regime_tuple_to_new_regime_map = {}
-        regimes = [comp.regimes for comp in self.componentswithregimes]
-        for regimetuple in itertools.product(*regimes):
-            name = '_and_'.join(r.name for r in regimetuple)
-            new_regime = ComponentFlattener.create_compound_regime(regimetuple,
-                                                                   name)
-            self.old_regime_tuple_to_new_regime_map[regimetuple] = new_regime
-
-        # Create New Events for the Regime-Map
-        for regimetuple, regime_new in (self.old_regime_tuple_to_new_regime_map
-                                        .iteritems()):
+        # Build the new Regime Space by a breadth-first search of the
+        # cross-product of the old regimes from the initial regimes,
+        # following the resolved transitions. We record the names and
+        # transitions of the new regimes for the reachable old regime
+        # tuples, from which the new Regimes are created once the state
+        # variables that no longer change are known.
+        self._compound_regime_names = {}
+        self._compound_transitions = {}
+        self._unresolved_regime_tuples = deque()
+        regimes = [list(comp.regimes) for comp in self.componentswithregimes]
+        for regimetuple in self.initial_regime_tuples:
+            self.get_compound_regime_name(regimetuple)
+
+        # Create New Events for each new Regime, which adds the regimes they
+        # lead to to the worklist
+        while self._unresolved_regime_tuples:
+            regimetuple = self._unresolved_regime_tuples.popleft()
+            transitions = self._compound_transitions[regimetuple]
             for regime_index, regime in enumerate(regimetuple):
 
                 for oldtransition in regime.on_conditions:
@@ -290,9 +424,9 @@ class ComponentFlattener(object):
                         oldtransition.trigger,
                         state_assignments=tr.state_assignments,
                         event_outputs=tr.event_outputs,
-                        target_regime_name=tr.target_regime.name)
+                        target_regime_name=tr.target_regime_name)
 
-                    regime_new.add_on_condition(new_oncondition)
+                    transitions.append(new_oncondition)
 
                 for oldtransition in regime.on_events:
                     tr = TransitionResolver(
@@ -305,8 +439,12 @@ class ComponentFlattener(object):
                         oldtransition.src_port_name,
                         state_assignments=tr.state_assignments,
                         event_outputs=tr.event_outputs,
-                        target_regime_name=tr.target_regime.name)
-                    regime_new.add_on_event(new_onevent)
+                        target_regime_name=tr.target_regime_name)
+                    transitions.append(new_onevent)
+
+        self.pruned_regimes = (
+            reduce(mul, (len(r) for r in regimes), 1) -
+            len(self._compound_regime_names))
 
     def remap_analog_ports(self):
         new_analog_ports = flatten_first_level(
@@ -365,8 +503,11 @@ class ComponentFlattener(object):
                     self.reducedcomponent)
 
 
-def flatten(model, componentname=None):
-    reducer = ComponentFlattener(model, componentname)
+def flatten(model, componentname=None, initial_regimes=None,
+            max_regimes=None):
+    reducer = ComponentFlattener(model, componentname,
+                                 initial_regimes=initial_regimes,
+                                 max_regimes=max_regimes)
     return reducer.reducedcomponent
 
 from ..base import DynamicsClass
@@ -29,6 +29,21 @@ class DynamicsQueryer(ComponentQueryer):
                      self.componentclass.analog_ports,
                      self.componentclass.event_ports)
 
+    @property
+    def expressions(self):
+        """Return an iterator over the expressions of the componentclass;
+        its |Aliases|, |TimeDerivatives|, |StateAssignments| and the
+        |Triggers| of its |OnConditions|"""
+        componentclass = self.componentclass
+        return chain(
+            componentclass.aliases,
+            chain.from_iterable(r.time_derivatives
+                                for r in componentclass.regimes),
+            chain.from_iterable(t.state_assignments
+                                for t in componentclass.transitions),
+            (oc.trigger for r in componentclass.regimes
+             for oc in r.on_conditions))
+
     # Find basic properties by name
     def regime(self, name=None,):
         """Find a regime in the componentclass by name"""
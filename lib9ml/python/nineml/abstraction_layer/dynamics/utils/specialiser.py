@@ -0,0 +1,123 @@
+"""
+Partial evaluation of a DynamicsClass for the property values of a
+component.
+
+The parameters that are bound to single values are substituted into the
+expressions of the component class, constant sub-expressions are folded and
+the aliases that become constants (or other names) are substituted into the
+expressions that use them, leaving a smaller class that only depends on the
+parameters that weren't bound.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+from nineml.exceptions import NineMLRuntimeError
+from ...expressions.tree import Number, Name
+from .cloner import DynamicsClonerVisitor
+
+
+class DynamicsSpecialiser(object):
+
+    """
+    Specialises a flat DynamicsClass for a set of property values.
+
+    `values`          -- the values substituted for the bound parameters
+    `substitutions`   -- the trees substituted for the bound parameters and
+                         the aliases that were removed
+    """
+
+    def __init__(self, componentclass, properties, si_units=False):
+        """
+        `componentclass` -- a flat DynamicsClass
+        `properties`     -- a PropertySet (or a dictionary of numbers) with
+                            the values of the parameters to bind. Properties
+                            with array or random values are left as
+                            parameters
+        `si_units`       -- whether the values are scaled from their units
+                            into SI units (e.g. 1 mV is substituted as 0.001)
+        """
+        if not componentclass.is_flat():
+            raise NineMLRuntimeError('Specialisation of non-flat '
+                                     'componentclass')
+        self.componentclass = componentclass
+        self.values = {}
+        for name, prop in properties.iteritems():
+            if name not in componentclass._parameters:
+                continue
+            if isinstance(prop, (int, float)):
+                self.values[name] = float(prop)
+            elif prop.is_single():
+                value = float(prop.value)
+                if si_units and prop.units is not None:
+                    value = value * 10 ** prop.units.power + prop.units.offset
+                self.values[name] = value
+        self.substitutions = dict((n, Number(v))
+                                  for n, v in self.values.iteritems())
+        self._fold_aliases()
+
+    def _fold_aliases(self):
+        """
+        Finds the aliases that fold to a constant or a single name, which
+        are substituted into the other expressions (unless they are sent
+        from an analog port)
+        """
+        sent = set(p.name for p in self.componentclass.analog_send_ports)
+        aliases = dict((a.lhs, a.rhs_tree)
+                       for a in self.componentclass.aliases
+                       if a.lhs not in sent)
+        changed = True
+        while changed:
+            changed = False
+            for name, tree in aliases.items():
+                folded = self.specialise(tree)
+                if isinstance(folded, (Number, Name)):
+                    self.substitutions[name] = folded
+                    del aliases[name]
+                    changed = True
+
+    def specialise(self, tree):
+        """
+        Returns the tree with the substitutions made and its constant
+        sub-expressions folded
+        """
+        # Each pass substitutes a level of the aliases that were removed, so
+        # unless they are cyclic the substitutions are complete after at
+        # most as many passes as there are substitutions
+        for _ in xrange(len(self.substitutions) + 1):
+            substituted = tree.substitute(self.substitutions)
+            if substituted is tree:
+                return tree.fold()
+            tree = substituted
+        raise NineMLRuntimeError(
+            "Substitutions into '{}' don't terminate (are the aliases "
+            "cyclic?)".format(tree))
+
+    def specialised(self, name=None):
+        """
+        Returns a copy of the componentclass with the substitutions made, the
+        bound parameters and the substituted aliases removed
+        """
+        componentclass = DynamicsClonerVisitor().visit(self.componentclass)
+        for expr in componentclass.query.expressions:
+            tree = expr.rhs_tree
+            if tree is None:
+                continue
+            specialised = self.specialise(tree)
+            if specialised is not tree:
+                expr.rhs = str(specialised)
+        # The specialised class is constructed (and so validated) from the
+        # specialised parts
+        return DynamicsClass(
+            name=name if name is not None else componentclass.name,
+            parameters=[p for p in componentclass.parameters
+                        if p.name not in self.values],
+            analog_ports=list(componentclass.analog_ports),
+            event_ports=list(componentclass.event_ports),
+            regimes=list(componentclass.regimes),
+            aliases=[a for a in componentclass.aliases
+                     if a.lhs not in self.substitutions],
+            state_variables=list(componentclass.state_variables),
+            unused_interface=[n for n in componentclass.unused_interface
+                              if n not in self.values])
+
+from ..base import DynamicsClass
@@ -5,9 +5,9 @@ docstring needed
 :license: BSD-3, see LICENSE for details.
 """
 from itertools import chain
-from nineml.annotations import annotate_xml
+from nineml.annotations import annotate_xml, extract_annotations, Annotations
 from nineml.utils import expect_single
-from nineml.xmlns import E
+from nineml.xmlns import E, NINEML
 from ..base import DynamicsClass, DynamicsBlock
 from nineml.annotations import read_annotations
 from ...ports import (EventSendPort, EventReceivePort, AnalogSendPort,
@@ -28,9 +28,16 @@ class DynamicsClassXMLLoader(ComponentClassXMLLoader):
 
     """
 
-    @read_annotations
     def load_componentclass(self, element):
 
+        annotations, element = extract_annotations(element)
+        unused_interface = None
+        if annotations is not None:
+            unused_elem = annotations.pop(NINEML + 'UnusedInterface', None)
+            if unused_elem is not None:
+                unused_interface = (unused_elem.text or '').split()
+            if not annotations:
+                annotations = None
         blocks = ('Parameter', 'AnalogSendPort', 'AnalogReceivePort',
                   'EventSendPort', 'EventReceivePort', 'AnalogReducePort',
                   'Dynamics', 'Subnode', 'ConnectPorts', 'Component')
@@ -38,7 +45,7 @@ class DynamicsClassXMLLoader(ComponentClassXMLLoader):
         subnodes = self._load_blocks(element, blocks=blocks)
 
         dynamicsblock = expect_single(subnodes["Dynamics"])
-        return DynamicsClass(
+        componentclass = DynamicsClass(
             name=element.get('name'),
             parameters=subnodes["Parameter"],
             analog_ports=chain(subnodes["AnalogSendPort"],
@@ -48,7 +55,10 @@ class DynamicsClassXMLLoader(ComponentClassXMLLoader):
                               subnodes["EventReceivePort"]),
             dynamicsblock=dynamicsblock,
             subnodes=dict(subnodes['Subnode']),
-            portconnections=subnodes["ConnectPorts"])
+            portconnections=subnodes["ConnectPorts"],
+            unused_interface=unused_interface)
+        componentclass.annotations = annotations
+        return componentclass
 
     @read_annotations
     def load_eventsendport(self, element):
@@ -168,7 +178,6 @@ class DynamicsClassXMLLoader(ComponentClassXMLLoader):
 
 class DynamicsClassXMLWriter(ComponentClassXMLWriter):
 
-    @annotate_xml
     def visit_componentclass(self, componentclass):
         elements = ([p.accept_visitor(self)
                      for p in componentclass.analog_ports] +
@@ -177,6 +186,16 @@ class DynamicsClassXMLWriter(ComponentClassXMLWriter):
                     [p.accept_visitor(self)
                      for p in componentclass.parameters] +
                     [componentclass.dynamicsblock.accept_visitor(self)])
+        # The unused interface is stored in the annotations so that pruned
+        # flattened classes validate when they are read back in
+        annotations = Annotations(getattr(componentclass, 'annotations',
+                                          None) or {})
+        if componentclass.unused_interface:
+            annotations[NINEML + 'UnusedInterface'] = E(
+                'UnusedInterface',
+                ' '.join(sorted(componentclass.unused_interface)))
+        if annotations:
+            elements.append(annotations.to_xml())
         return E('ComponentClass', *elements, name=componentclass.name)
 
     @annotate_xml
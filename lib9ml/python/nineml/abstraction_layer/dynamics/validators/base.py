@@ -4,7 +4,7 @@ This file contains the DynamicsValidator class for validating component
 :copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
 :license: BSD-3, see LICENSE for details.
 """
-
+from nineml.utils import LRUCache, Settings
 from .general import (
     TimeDerivativesAreDeclaredDynamicsValidator,
     StateAssignmentsAreOnStateVariablesDynamicsValidator,
@@ -22,6 +22,77 @@ from .ports import (
     PortConnectionsDynamicsValidator)
 from .types import (
     TypesDynamicsValidator)
+from ...componentclass.validators.base import FusedComponentValidator
+from ..utils.visitors import DynamicsActionVisitor
+from ..utils.fingerprint import DynamicsFingerprinter
+
+
+class FusedDynamicsValidator(FusedComponentValidator, DynamicsActionVisitor):
+
+    """Runs all the dynamics validators from a single traversal"""
+
+    validator_classes = [
+        TypesDynamicsValidator,
+        NoDuplicatedObjectsDynamicsValidator,
+        DuplicateRegimeNamesDynamicsValidator,
+        LocalNameConflictsDynamicsValidator,
+        DimensionNameConflictsDynamicsValidator,
+        EventPortsDynamicsValidator,
+        OutputAnalogPortsDynamicsValidator,
+        TimeDerivativesAreDeclaredDynamicsValidator,
+        StateAssignmentsAreOnStateVariablesDynamicsValidator,
+        AliasesAreNotRecursiveDynamicsValidator,
+        NoUnresolvedSymbolsDynamicsValidator,
+        PortConnectionsDynamicsValidator,
+        RegimeGraphDynamicsValidator,
+        RegimeOnlyHasOneHandlerPerEventDynamicsValidator,
+        CheckNoLHSAssignmentsToMathsNamespaceDynamicsValidator]
+
+    def action_dynamicsblock(self, dynamicsblock, **kwargs):
+        self.dispatch('action_dynamicsblock', dynamicsblock, **kwargs)
+
+    def action_regime(self, regime, **kwargs):
+        self.dispatch('action_regime', regime, **kwargs)
+
+    def action_statevariable(self, state_variable, **kwargs):
+        self.dispatch('action_statevariable', state_variable, **kwargs)
+
+    def action_analogsendport(self, port, **kwargs):
+        self.dispatch('action_analogsendport', port, **kwargs)
+
+    def action_analogreceiveport(self, port, **kwargs):
+        self.dispatch('action_analogreceiveport', port, **kwargs)
+
+    def action_analogreduceport(self, port, **kwargs):
+        self.dispatch('action_analogreduceport', port, **kwargs)
+
+    def action_eventsendport(self, port, **kwargs):
+        self.dispatch('action_eventsendport', port, **kwargs)
+
+    def action_eventreceiveport(self, port, **kwargs):
+        self.dispatch('action_eventreceiveport', port, **kwargs)
+
+    def action_outputevent(self, event_out, **kwargs):
+        self.dispatch('action_outputevent', event_out, **kwargs)
+
+    def action_assignment(self, assignment, **kwargs):
+        self.dispatch('action_assignment', assignment, **kwargs)
+
+    def action_timederivative(self, time_derivative, **kwargs):
+        self.dispatch('action_timederivative', time_derivative, **kwargs)
+
+    def action_trigger(self, trigger, **kwargs):
+        self.dispatch('action_trigger', trigger, **kwargs)
+
+    def action_oncondition(self, on_condition, **kwargs):
+        self.dispatch('action_oncondition', on_condition, **kwargs)
+
+    def action_onevent(self, on_event, **kwargs):
+        self.dispatch('action_onevent', on_event, **kwargs)
+
+
+# The fingerprints of the components that have passed validation
+validation_cache = LRUCache(1024)
 
 
 class DynamicsValidator(object):
@@ -33,20 +104,26 @@ class DynamicsValidator(object):
         """
         Tests a componentclassclass against a variety of tests, to verify its
         internal structure
+
+        If `Settings.cache_component_validation` is set, the tests are skipped
+        for componentclasses with the same structural fingerprint as one that
+        has already passed them (only successful validations are cached, so
+        invalid componentclasses raise the errors from the validators each
+        time).
+        """
+        if not Settings.cache_component_validation:
+            FusedDynamicsValidator(componentclass)
+            return
+        fingerprint = DynamicsFingerprinter().fingerprint(componentclass)
+        if validation_cache.get(fingerprint) is None:
+            FusedDynamicsValidator(componentclass)
+            validation_cache.add(fingerprint, True)
+
+    @classmethod
+    def validate_componentclass_separately(cls, componentclass):
+        """
+        Runs each of the validators in turn with its own traversal of the
+        componentclass (equivalent to `validate_componentclass`)
         """
-        # Check class structure:
-        TypesDynamicsValidator(componentclass)
-        NoDuplicatedObjectsDynamicsValidator(componentclass)
-        DuplicateRegimeNamesDynamicsValidator(componentclass)
-        LocalNameConflictsDynamicsValidator(componentclass)
-        DimensionNameConflictsDynamicsValidator(componentclass)
-        EventPortsDynamicsValidator(componentclass)
-        OutputAnalogPortsDynamicsValidator(componentclass)
-        TimeDerivativesAreDeclaredDynamicsValidator(componentclass)
-        StateAssignmentsAreOnStateVariablesDynamicsValidator(componentclass)
-        AliasesAreNotRecursiveDynamicsValidator(componentclass)
-        NoUnresolvedSymbolsDynamicsValidator(componentclass)
-        PortConnectionsDynamicsValidator(componentclass)
-        RegimeGraphDynamicsValidator(componentclass)
-        RegimeOnlyHasOneHandlerPerEventDynamicsValidator(componentclass)
-        CheckNoLHSAssignmentsToMathsNamespaceDynamicsValidator(componentclass)
+        for validator_class in FusedDynamicsValidator.validator_classes:
+            validator_class(componentclass)
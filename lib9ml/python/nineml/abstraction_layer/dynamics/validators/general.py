@@ -22,14 +22,16 @@ class TimeDerivativesAreDeclaredDynamicsValidator(
         as  StateVariables.
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceDynamicsValidator.__init__(
             self, require_explicit_overrides=False)
         self.sv_declared = defaultdict(list)
         self.time_derivatives_used = defaultdict(list)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         for namespace, time_derivatives in self.time_derivatives_used.\
                                                                    iteritems():
             for td in time_derivatives:
@@ -51,14 +53,16 @@ class StateAssignmentsAreOnStateVariablesDynamicsValidator(
     """ Check that we only attempt to make StateAssignments to state-variables.
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceDynamicsValidator.__init__(
             self, require_explicit_overrides=False)
         self.sv_declared = defaultdict(list)
         self.state_assignments_lhses = defaultdict(list)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         for namespace, state_assignments_lhs in self.state_assignments_lhses.\
                                                                    iteritems():
             for td in state_assignments_lhs:
@@ -109,15 +113,17 @@ class NoUnresolvedSymbolsDynamicsValidator(
 
 class RegimeGraphDynamicsValidator(PerNamespaceDynamicsValidator):
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceDynamicsValidator.__init__(
             self, require_explicit_overrides=False)
 
         self.connected_regimes_from_regime = defaultdict(set)
         self.regimes_in_namespace = defaultdict(set)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         def add_connected_regimes_recursive(regime, connected):
             connected.add(regime)
             for r in self.connected_regimes_from_regime[regime]:
@@ -197,10 +203,11 @@ class NoDuplicatedObjectsDynamicsValidator(
 class RegimeOnlyHasOneHandlerPerEventDynamicsValidator(
         PerNamespaceDynamicsValidator):
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         PerNamespaceDynamicsValidator.__init__(
             self, require_explicit_overrides=False)
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def action_regime(self, regime, namespace, **kwargs):  # @UnusedVariable
         event_triggers = [on_event.src_port_name
@@ -59,10 +59,11 @@ class DimensionNameConflictsDynamicsValidator(
 
 class DuplicateRegimeNamesDynamicsValidator(PerNamespaceDynamicsValidator):
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         super(DuplicateRegimeNamesDynamicsValidator, self).__init__(
             require_explicit_overrides=False)
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
     def action_componentclass(self, componentclass, namespace):  # @UnusedVariable @IgnorePep8
         regime_names = [r.name for r in componentclass.regimes]
@@ -20,7 +20,7 @@ class EventPortsDynamicsValidator(PerNamespaceDynamicsValidator):
     defined, and that the EventPort has the right direction.
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         super(EventPortsDynamicsValidator, self).__init__(
             require_explicit_overrides=False)
 
@@ -31,8 +31,10 @@ class EventPortsDynamicsValidator(PerNamespaceDynamicsValidator):
         self.event_outs = defaultdict(list)
         self.input_events = defaultdict(list)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         # Check that each output event has a corresponding event_port with a
         # send mode:
         for ns, event_outs in self.event_outs.iteritems():
@@ -88,15 +90,17 @@ class OutputAnalogPortsDynamicsValidator(PerNamespaceDynamicsValidator):
     or a state variable
     """
 
-    def __init__(self, componentclass):
+    def __init__(self, componentclass=None):
         super(OutputAnalogPortsDynamicsValidator, self).__init__(
             require_explicit_overrides=False)
 
         self.output_analogports = defaultdict(list)
         self.available_symbols = defaultdict(list)
 
-        self.visit(componentclass)
+        if componentclass is not None:
+            self.validate(componentclass)
 
+    def check(self):
         for namespace, analogports in self.output_analogports.iteritems():
             for ap in analogports:
                 if ap not in self.available_symbols[namespace]:
@@ -11,10 +11,10 @@ import quantities as pq
 
 # import math_namespace
 from nineml.exceptions import NineMLRuntimeError
-from .utils import (MathUtil, str_to_npfunc_map, func_namespace_split,
-                    is_valid_lhs_target)
+from .utils import MathUtil, func_namespace_split, is_valid_lhs_target
 from .. import BaseALObject
 from . import parse
+from . import kernels
 
 
 class Expression(object):
@@ -29,6 +29,7 @@ class Expression(object):
         self._rhs = None
         self._rhs_names = None
         self._rhs_funcs = None
+        self._rhs_tree = None
 
         self._set_rhs(rhs)
 
@@ -46,11 +47,16 @@ class Expression(object):
             raise NotImplementedError
         return parsed
 
+    # Subclasses that override _parse_rhs should override this too
+    def _parse_rhs_tree(self, rhs):
+        return parse.expr_tree(rhs)
+
     # If we assign to rhs, then we need to update the
     # cached names and funcs:
     def _set_rhs(self, rhs):
         rhs = rhs.strip()
         self._rhs = rhs
+        self._rhs_tree = None
         if isinstance(rhs, str):
             self._rhs_names, self._rhs_funcs = self._parse_rhs(rhs)
             for name in self._rhs_names:
@@ -67,6 +73,16 @@ class Expression(object):
         return self._rhs
     rhs = property(_get_rhs, _set_rhs)
 
+    @property
+    def rhs_tree(self):
+        """The syntax tree of the RHS (see `tree`), which is shared with all
+        other expressions with the same RHS and is immutable, so it can be
+        renamed, substituted into and printed (e.g. ``to_c()``) without
+        reparsing the RHS"""
+        if self._rhs_tree is None and isinstance(self._rhs, str):
+            self._rhs_tree = self._parse_rhs_tree(self._rhs)
+        return self._rhs_tree
+
     @property
     def rhs_names(self):
         return self._rhs_names
@@ -86,19 +102,19 @@ class Expression(object):
 
     def rhs_as_python_func(self, namespace=None):
         """ Returns a python callable which evaluates the expression in
-        namespace and returns the result """
-        namespace = namespace or {}
-
-        return eval("lambda %s: %s" % (','.join(self.rhs_names), self.rhs),
-                    str_to_npfunc_map, namespace)
+        namespace and returns the result. The callable is a compiled kernel
+        (see `kernels`), which is shared between expressions with the same
+        RHS and can be evaluated over NumPy arrays """
+        return kernels.compile_kernel(self, arguments=sorted(self.rhs_names),
+                                      namespace=namespace)
 
     def rhs_name_transform_inplace(self, name_map):
         """Replace atoms on the RHS with values in the name_map"""
-
-        for name in name_map:
-            replacment = name_map[name]
-            self.rhs = MathUtil.str_expr_replacement(name, replacment,
-                                                     self.rhs)
+        # The names are replaced in a single pass so the RHS is only reparsed
+        # once (and not at all if none of the names are in it)
+        rhs = MathUtil.str_expr_batch_replacement(name_map, self.rhs)
+        if rhs != self.rhs:
+            self.rhs = rhs
 
     def rhs_atoms_in_namespace(self, namespace):
         atoms = set()
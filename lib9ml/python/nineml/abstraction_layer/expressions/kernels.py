@@ -0,0 +1,206 @@
+"""
+Compiles expressions into Python functions ("kernels") that evaluate them
+with NumPy, so that a set of expressions (e.g. all the time derivatives of a
+regime) can be evaluated over arrays of state variables and parameters in a
+single call.
+
+The source of each kernel is generated from the syntax trees of the
+expressions (see `tree`) and compiled once, after which the kernel is reused
+for any set of expressions with the same trees.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+import copy
+import __future__
+import numpy
+from nineml.utils import LRUCache
+from nineml.exceptions import NineMLRuntimeError
+from .tree import Node, Call, UnaryOp, BinOp, PythonPrinter
+from .utils import (str_to_npfunc_map, random_functions,
+                    is_builtin_math_constant, math_namespace_separator)
+from . import parse
+
+
+class NumpyPrinter(PythonPrinter):
+
+    """
+    Prints expression trees as Python that can be evaluated over NumPy arrays
+    """
+
+    # The logical operators are written as (elementwise) function calls
+    logical_functions = {'&': 'logical_and', '|': 'logical_or',
+                         '!': 'logical_not'}
+
+    def _print(self, node):
+        if isinstance(node, Call):
+            args = [self._print(a)[0] for a in node.args]
+            if node.func in random_functions:
+                args.append('size=_size')
+            return '{}({})'.format(kernel_func_name(node.func),
+                                   ', '.join(args)), self._atom
+        elif (isinstance(node, (UnaryOp, BinOp)) and
+              node.op in self.logical_functions):
+            return '{}({})'.format(
+                self.logical_functions[node.op],
+                ', '.join(self._print(c)[0] for c in node.children)), \
+                self._atom
+        return super(NumpyPrinter, self)._print(node)
+
+
+numpy_printer = NumpyPrinter()
+
+
+def kernel_func_name(func):
+    """
+    The name a function is bound to in the namespace of the kernels (the
+    functions in math namespaces have dotted names, which aren't valid Python
+    identifiers)
+    """
+    return func.replace(math_namespace_separator, '__')
+
+
+def _size(*args):
+    """The shape of the arrays random numbers are drawn for"""
+    if not args:
+        return None
+    shape = numpy.broadcast(*args).shape
+    return shape if shape else None
+
+
+kernel_namespace = dict((kernel_func_name(k), v)
+                        for k, v in str_to_npfunc_map.iteritems())
+kernel_namespace.update({'logical_and': numpy.logical_and,
+                         'logical_or': numpy.logical_or,
+                         'logical_not': numpy.logical_not,
+                         '_size_of': _size})
+
+# Compiled kernels keyed by the trees of the expressions they evaluate and the
+# order of their arguments
+kernel_cache = LRUCache(1024)
+
+
+class Kernel(object):
+
+    """
+    A compiled function that evaluates a list of expressions over the
+    (scalar or array) values of the names in them, returning a tuple of the
+    results (or just the result if it was compiled from a single expression)
+
+    `arguments`  -- the names of the arguments of the kernel, in order
+    `outputs`    -- the LHS of each of the expressions (None if it doesn't
+                    have one)
+    `source`     -- the source code of the kernel
+    """
+
+    def __init__(self, trees, arguments, single=False, namespace=None):
+        self.trees = tuple(trees)
+        self.arguments = tuple(arguments)
+        self.single = single
+        self.outputs = (None,) * len(self.trees)
+        self.source = self._generate_source()
+        kernel_globals = dict(kernel_namespace)
+        if namespace:
+            kernel_globals.update(namespace)
+        # Division is true division, as it is when expressions are folded
+        exec compile(self.source, '<nineml kernel>', 'exec',
+                     __future__.division.compiler_flag,
+                     dont_inherit=True) in kernel_globals
+        self._func = kernel_globals['_kernel']
+
+    def _generate_source(self):
+        reserved = set(['_size', '_size_of'])
+        reserved.update(numpy_printer.logical_functions.itervalues())
+        reserved.update(kernel_func_name(f) for t in self.trees
+                        for f in t.funcs)
+        for arg in self.arguments:
+            if arg in reserved:
+                raise NineMLRuntimeError(
+                    "Argument name '{}' clashes with a name used in the "
+                    "kernel".format(arg))
+        lines = ['def _kernel({}):'.format(', '.join(self.arguments))]
+        if any(f in random_functions for t in self.trees for f in t.funcs):
+            lines.append('    _size = _size_of({})'.format(
+                ', '.join(self.arguments)))
+        results = [numpy_printer(t) for t in self.trees]
+        if self.single:
+            lines.append('    return ' + results[0])
+        else:
+            lines.append('    return ({})'.format(
+                ''.join(r + ', ' for r in results)))
+        return '\n'.join(lines) + '\n'
+
+    def __call__(self, *args, **kwargs):
+        return self._func(*args, **kwargs)
+
+    def _with_outputs(self, outputs):
+        kernel = copy.copy(self)
+        kernel.outputs = outputs
+        return kernel
+
+    def __repr__(self):
+        return "Kernel({})".format(', '.join(self.arguments))
+
+    def evaluate(self, namespace):
+        """
+        Evaluates the kernel with the values of its arguments in `namespace`
+        (e.g. a dictionary of arrays) and returns a dictionary of the results
+        keyed by the outputs of the kernel
+        """
+        results = self._func(*[namespace[a] for a in self.arguments])
+        if self.single:
+            results = (results,)
+        return dict(zip(self.outputs, results))
+
+
+def compile_kernel(expressions, arguments=None, namespace=None):
+    """
+    Returns a `Kernel` that evaluates an expression, or a list of expressions,
+    in a single call.
+
+    `expressions` -- an Expression, a syntax tree, or a list of them
+    `arguments`   -- the names of the arguments of the kernel, in order (by
+                     default all the names in the expressions in alphabetical
+                     order). The kernel can also be called with keyword
+                     arguments.
+    `namespace`   -- definitions of additional functions called in the
+                     expressions. Kernels that use them aren't cached.
+    """
+    single = isinstance(expressions, (Node, basestring)) or \
+        hasattr(expressions, 'rhs_tree')
+    if single:
+        expressions = [expressions]
+    trees = tuple(_as_tree(e) for e in expressions)
+    if arguments is None:
+        arguments = sorted(set(n for t in trees for n in t.names
+                               if not is_builtin_math_constant(n)))
+    arguments = tuple(arguments)
+    if namespace:
+        funcs = set(f for t in trees for f in t.funcs)
+        namespace = dict((k, v) for k, v in namespace.iteritems()
+                         if k in funcs and k not in str_to_npfunc_map)
+    key = (trees, arguments, single)
+    kernel = kernel_cache.get(key) if not namespace else None
+    if kernel is None:
+        kernel = Kernel(trees, arguments, single=single, namespace=namespace)
+        if not namespace:
+            kernel_cache.add(key, kernel)
+    outputs = tuple(getattr(e, 'lhs', None) for e in expressions)
+    if outputs != kernel.outputs:
+        # Kernels are shared between expressions with the same RHS so the
+        # outputs are set on a shallow copy
+        kernel = kernel._with_outputs(outputs)
+    return kernel
+
+
+def _as_tree(expression):
+    if isinstance(expression, Node):
+        return expression
+    elif isinstance(expression, basestring):
+        return parse.expr_tree(expression)
+    tree = expression.rhs_tree
+    if tree is None:
+        raise NineMLRuntimeError(
+            "Cannot compile '{}' as it doesn't have a parsed RHS"
+            .format(expression))
+    return tree
@@ -1,2 +1,4 @@
-from .expressions import expr_parse as expr
-from .conditions import cond_parse as cond
+from .expressions import (expr_parse as expr, expr_parse_tree as expr_tree,
+                          expr_parse_cache)
+from .conditions import (cond_parse as cond, cond_parse_tree as cond_tree,
+                         cond_parse_cache)
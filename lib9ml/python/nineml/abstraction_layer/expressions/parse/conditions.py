@@ -21,67 +21,28 @@ docstring needed
 
 # This is a conditional parser
 
-import re
-import ply.lex as lex
-import ply.yacc as yacc
-import os
-from .expressions import call_expr_func, escape_carets
-from nineml.utils import LocationMgr
+from .expressions import call_expr_func, escape_carets, ExprParser
+from nineml.utils import LRUCache
 from nineml.exceptions import NineMLMathParseError
-from ..utils import is_builtin_math_function, get_builtin_symbols
+from ..utils import is_builtin_math_function
+from ..tree import Number, Name, Bool, UnaryOp, BinOp, make_call
 
 # for now avoid duplication, but maintain distinctness
 call_cond_func = call_expr_func
 
 
-class CondParser(object):
+class CondParser(ExprParser):
 
     """
-    Base class for a lexer/parser that has the rules defined as methods
+    Base class for a lexer/parser that has the rules defined as methods (see
+    ExprParser, which builds the lexer and parser from the packaged tables)
     """
-    tokens = ()
-    precedence = ()
-
-    def __init__(self, **kw):
-        self.debug = kw.get('debug', 0)
-        self.names = {}
-        try:
-            modname = os.path.split(os.path.splitext(__file__)[0])[
-                1] + "_" + self.__class__.__name__
-        except:
-            modname = "parser" + "_" + self.__class__.__name__
-        # self.debugfile = modname + ".dbg"
-        # self.tabmodule = modname + "_" + "parsetab"
-
-        self.debugfile = LocationMgr.getTmpDir() + modname + ".dbg"
-        self.tabmodule = LocationMgr.getTmpDir() + modname + "_" + "parsetab"
-        # print self.debugfile, self.tabmodule
-
-        # Build the lexer and parser
-        lex.lex(module=self, debug=self.debug)
-        yacc.yacc(module=self,
-                  debug=self.debug,
-                  debugfile=self.debugfile,
-                  tabmodule=self.tabmodule)
-
-    def parse(self, expr):
-        self.names = []
-        self.funcs = []
-        try:
-            yacc.parse(expr)
-        except NineMLMathParseError, e:
-            raise NineMLMathParseError(str(e) + " Expression was: '%s'" % expr)
-        # return set(self.names), set(self.funcs)
-
-        self.names = set(self.names)
-        self.names.difference_update(get_builtin_symbols())
-
-        return self.names, set(self.funcs)
-
 
 
 class CalcCond(CondParser):
 
+    tabmodule = 'conditions_parsetab'
+
     tokens = (
         'NAME', 'NUMBER', 'CONDITIONAL', 'NOT', 'LOGICAL',
         'PLUS', 'MINUS', 'EXP', 'TIMES', 'DIVIDE',
@@ -113,7 +74,7 @@ class CalcCond(CondParser):
         return t
 
     def t_NUMBER(self, t):
-        r'(\d*\.\d+)|(\d+\.\d*)|(\d+)'
+        r'((\d*\.\d+)|(\d+\.\d*)|(\d+))([eE][+-]?\d+)?'
         try:
             t.value = float(t.value)
         except ValueError:
@@ -141,27 +102,27 @@ class CalcCond(CondParser):
 
     def p_conditional(self, p):
         'conditional : boolean'
-        pass
+        p[0] = p[1]
 
     def p_boolean_bool(self, p):
         "boolean : BOOL"
-        pass
+        p[0] = Bool(p[1] in ('True', 'true'))
 
     def p_boolean_not(self, p):
         'boolean : NOT boolean %prec UNOT'
-        pass
+        p[0] = UnaryOp('!', p[2])
 
     def p_boolean_logical(self, p):
         'boolean : boolean LOGICAL boolean'
-        pass
+        p[0] = BinOp(p[2], p[1], p[3])
 
     def p_boolean_group(self, p):
         'boolean : LPAREN boolean RPAREN'
-        pass
+        p[0] = p[2]
 
     def p_boolean_conditional(self, p):
         'boolean : expression CONDITIONAL expression'
-        pass
+        p[0] = BinOp(p[2], p[1], p[3])
 
     def p_expression_binop(self, p):
         """
@@ -171,23 +132,24 @@ class CalcCond(CondParser):
                   | expression DIVIDE expression
                   | expression EXP expression
         """
-        pass
+        p[0] = BinOp(p[2], p[1], p[3])
 
     def p_expression_uminus(self, p):
         'expression : MINUS expression %prec UMINUS'
-        pass
+        p[0] = UnaryOp('-', p[2])
 
     def p_expression_group(self, p):
         'expression : LPAREN expression RPAREN'
-        pass
+        p[0] = p[2]
 
     def p_expression_number(self, p):
         'expression : NUMBER'
-        pass
+        p[0] = Number(p[1])
 
     def p_expression_name(self, p):
         'expression : NAME'
         self.names.append(p[1])
+        p[0] = Name(p[1])
 
     def p_func(self, p):
         """expression : LFUNC expression RPAREN\n | LFUNC RPAREN
@@ -200,6 +162,8 @@ class CalcCond(CondParser):
         if not is_builtin_math_function(func_name):
             raise NineMLMathParseError("Undefined function '%s'" % func_name)
         self.funcs.append(func_name)
+        p[0] = make_call(func_name,
+                         [p[i] for i in xrange(2, len(p) - 1, 2)])
 
     def p_error(self, p):
         if p:
@@ -211,18 +175,43 @@ class CalcCond(CondParser):
 
 def cond_parse(conditional):
     """ Parses a conditinal expression
-    and returns var names and func names as sets """
-
-    calc = CalcCond()
-    # Remove endlines
-    conditional = conditional.replace('\n', ' ')
-    conditional = conditional.replace('\r', ' ')
-    # Expand scientific notation, 1e-10 to 1 * pow(10, -10)
-    conditional = re.sub(r'([0-9])e(\-?[0-9\.]+)', r'\1 * pow(10, \2)',
-                         conditional)
-    # Convert '^' to pow()
-    conditional = escape_carets(conditional)
-    return calc.parse(conditional)
+    and returns var names and func names as frozensets
+
+    The results are cached in `cond_parse_cache` by the condition with
+    normalised whitespace, so triggers that are parsed repeatedly (e.g. when
+    regimes are cloned or flattened) are only parsed once """
+    return _cached_parse(conditional)[0]
+
+
+def cond_parse_tree(conditional):
+    """ Returns the syntax tree of a conditional expression (see `tree`),
+    which is cached along with its names and funcs """
+    return _cached_parse(conditional)[1]
+
+
+def _cached_parse(conditional):
+    # Normalise whitespace (including endlines)
+    conditional = ' '.join(conditional.split())
+    parsed = cond_parse_cache.get(conditional)
+    if parsed is None:
+        # Convert '^' to pow()
+        names, funcs, tree = _get_parser().parse(escape_carets(conditional))
+        parsed = ((frozenset(names), frozenset(funcs)), tree)
+        cond_parse_cache.add(conditional, parsed)
+    return parsed
+
+
+def _get_parser():
+    global _parser
+    if _parser is None:
+        _parser = CalcCond()
+    return _parser
+
+
+_parser = None
+
+# Parsed names, funcs and trees of recently parsed conditions
+cond_parse_cache = LRUCache(max_size=4096)
 
 # if __name__ == '__main__':
 #    calc = CalcCond()
@@ -0,0 +1,48 @@
+
+# nineml/abstraction_layer/expressions/parse/conditions_parsetab.py
+# This file is automatically generated. Do not edit.
+_tabversion = '3.2'
+
+_lr_method = 'LALR'
+
+_lr_signature = '"_\xe1 \x8f\x06P\xf5Nff\xc4\x06\x02\n\xfd'
+    
+_lr_action_items = {'DIVIDE':([2,8,10,11,13,16,24,25,26,30,31,32,33,34,35,36,37,38,40,41,],[-14,18,-15,-17,18,18,-12,18,-16,-13,-10,18,-9,18,-11,18,18,-18,18,-19,]),'LFUNC':([0,3,6,7,9,12,14,18,19,20,21,22,23,27,39,],[3,3,3,3,3,3,3,3,3,3,3,3,3,3,3,]),'RPAREN':([2,3,5,10,11,13,15,16,17,24,25,26,28,29,30,31,32,33,34,35,36,37,38,40,41,],[-14,11,-2,-15,-17,26,29,30,-3,-12,30,-16,-4,-5,-13,-10,-6,-9,-7,-11,-8,38,-18,41,-19,]),'NAME':([0,3,6,7,9,12,14,18,19,20,21,22,23,27,39,],[10,10,10,10,10,10,10,10,10,10,10,10,10,10,10,]),'CONDITIONAL':([2,8,10,11,16,24,26,30,31,33,34,35,36,38,41,],[-14,19,-15,-17,19,-12,-16,-13,-10,-9,-7,-11,-8,-18,-19,]),'NUMBER':([0,3,6,7,9,12,14,18,19,20,21,22,23,27,39,],[2,2,2,2,2,2,2,2,2,2,2,2,2,2,2,]),'LOGICAL':([2,4,5,10,11,15,17,24,26,28,29,30,31,32,33,34,35,36,38,41,],[-14,14,-2,-15,-17,14,-3,-12,-16,14,-5,-13,-10,-6,-9,-7,-11,-8,-18,-19,]),'TIMES':([2,8,10,11,13,16,24,25,26,30,31,32,33,34,35,36,37,38,40,41,],[-14,20,-15,-17,20,20,-12,20,-16,-13,-10,20,-9,20,-11,20,20,-18,20,-19,]),'BOOL':([0,6,7,14,],[5,5,5,5,]),'LPAREN':([0,3,6,7,9,12,14,18,19,20,21,22,23,27,39,],[6,12,6,6,12,12,6,12,12,12,12,12,12,12,12,]),'NOT':([0,6,7,14,],[7,7,7,7,]),'PLUS':([2,8,10,11,13,16,24,25,26,30,31,32,33,34,35,36,37,38,40,41,],[-14,21,-15,-17,21,21,-12,21,-16,-13,-10,21,-9,-7,-11,-8,21,-18,21,-19,]),'EXP':([2,8,10,11,13,16,24,25,26,30,31,32,33,34,35,36,37,38,40,41,],[-14,22,-15,-17,22,22,-12,22,-16,-13,22,22,22,22,-11,22,22,-18,22,-19,]),'COMMA':([2,10,11,13,24,26,30,31,33,34,35,36,37,38,41,],[-14,-15,-17,27,-12,-16,-13,-10,-9,-7,-11,-8,39,-18,-19,]),'MINUS':([0,2,3,6,7,8,9,10,11,12,13,14,16,18,19,20,21,22,23,24,25,26,27,30,31,32,33,34,35,36,37,38,39,40,41,],[9,-14,9,9,9,23,9,-15,-17,9,23,9,23,9,9,9,9,9,9,-12,23,-16,9,-13,-10,23,-9,-7,-11,-8,23,-18,9,23,-19,]),'$end':([1,2,4,5,10,11,17,24,26,28,29,30,31,32,33,34,35,36,38,41,],[0,-14,-1,-2,-15,-17,-3,-12,-16,-4,-5,-13,-10,-6,-9,-7,-11,-8,-18,-19,]),}
+
+_lr_action = { }
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = { }
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'conditional':([0,],[1,]),'boolean':([0,6,7,14,],[4,15,17,28,]),'expression':([0,3,6,7,9,12,14,18,19,20,21,22,23,27,39,],[8,13,16,8,24,25,8,31,32,33,34,35,36,37,40,]),}
+
+_lr_goto = { }
+for _k, _v in _lr_goto_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = { }
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> conditional","S'",1,None,None,None),
+  ('conditional -> boolean','conditional',1,'p_conditional','nineml/abstraction_layer/expressions/parse/conditions.py',104),
+  ('boolean -> BOOL','boolean',1,'p_boolean_bool','nineml/abstraction_layer/expressions/parse/conditions.py',108),
+  ('boolean -> NOT boolean','boolean',2,'p_boolean_not','nineml/abstraction_layer/expressions/parse/conditions.py',112),
+  ('boolean -> boolean LOGICAL boolean','boolean',3,'p_boolean_logical','nineml/abstraction_layer/expressions/parse/conditions.py',116),
+  ('boolean -> LPAREN boolean RPAREN','boolean',3,'p_boolean_group','nineml/abstraction_layer/expressions/parse/conditions.py',120),
+  ('boolean -> expression CONDITIONAL expression','boolean',3,'p_boolean_conditional','nineml/abstraction_layer/expressions/parse/conditions.py',124),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/conditions.py',129),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/conditions.py',130),
+  ('expression -> expression TIMES expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/conditions.py',131),
+  ('expression -> expression DIVIDE expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/conditions.py',132),
+  ('expression -> expression EXP expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/conditions.py',133),
+  ('expression -> MINUS expression','expression',2,'p_expression_uminus','nineml/abstraction_layer/expressions/parse/conditions.py',138),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_group','nineml/abstraction_layer/expressions/parse/conditions.py',142),
+  ('expression -> NUMBER','expression',1,'p_expression_number','nineml/abstraction_layer/expressions/parse/conditions.py',146),
+  ('expression -> NAME','expression',1,'p_expression_name','nineml/abstraction_layer/expressions/parse/conditions.py',150),
+  ('expression -> LFUNC expression RPAREN','expression',3,'p_func','nineml/abstraction_layer/expressions/parse/conditions.py',154),
+  ('expression -> LFUNC RPAREN','expression',2,'p_func','nineml/abstraction_layer/expressions/parse/conditions.py',155),
+  ('expression -> LFUNC expression COMMA expression RPAREN','expression',5,'p_func','nineml/abstraction_layer/expressions/parse/conditions.py',156),
+  ('expression -> LFUNC expression COMMA expression COMMA expression RPAREN','expression',7,'p_func','nineml/abstraction_layer/expressions/parse/conditions.py',157),
+]
@@ -19,12 +19,14 @@ docstring needed
 
 import os
 import re
+import threading
 import ply.lex as lex
 import ply.yacc as yacc
 
-from nineml.utils import LocationMgr
+from nineml.utils import LRUCache
 from nineml.exceptions import NineMLMathParseError
 from ..utils import get_builtin_symbols
+from ..tree import Number, Name, UnaryOp, BinOp, make_call
 
 
 def call_expr_func(expr_func, ns):
@@ -42,48 +44,54 @@ class ExprParser(object):
 
     """
     Base class for a lexer/parser that has the rules defined as methods
+
+    The parser tables are read from the module named by `tabmodule` in this
+    package, which is shipped with it (and only rewritten if the grammar
+    changes), so the lexer and parser are only built once per instance and
+    the instance can be reused for any number of expressions.
     """
     tokens = ()
     precedence = ()
+    tabmodule = None
 
     def __init__(self, **kw):
         self.debug = kw.get('debug', 0)
-        self.names = {}
-        try:
-            modname = os.path.split(os.path.splitext(__file__)[0])[
-                1] + "_" + self.__class__.__name__
-        except:
-            modname = "parser" + "_" + self.__class__.__name__
-
-        self.debugfile = LocationMgr.getTmpDir() + modname + ".dbg"
-        self.tabmodule = LocationMgr.getTmpDir() + modname + "_" + "parsetab"
-
-        # print self.debugfile, self.tabmodule
-
-        # Build the lexer and parser
-        lex.lex(module=self, debug=self.debug)
-        yacc.yacc(module=self,
-                  debug=self.debug,
-                  debugfile=self.debugfile,
-                  tabmodule=self.tabmodule)
-
-    def parse(self, expr):
         self.names = []
         self.funcs = []
-        try:
-            yacc.parse(expr)
-        except NineMLMathParseError, e:
-            raise NineMLMathParseError(str(e) + " Expression was: '%s'" % expr)
-
-        # remove names from the math_namespace
-        self.names = set(self.names)
-        self.names.difference_update(get_builtin_symbols())
+        package = __name__.rsplit('.', 1)[0]
+        # Build the lexer and parser
+        self.lexer = lex.lex(module=self, debug=self.debug)
+        self.parser = yacc.yacc(module=self,
+                                debug=self.debug,
+                                tabmodule=package + '.' + self.tabmodule,
+                                outputdir=os.path.dirname(__file__))
+        # The names and functions are collected in the parser rules so the
+        # instance can only parse one expression at a time
+        self._lock = threading.Lock()
 
-        return self.names, set(self.funcs)
+    def parse(self, expr):
+        """
+        Returns the names and the functions in the expression and its
+        syntax tree
+        """
+        with self._lock:
+            self.names = []
+            self.funcs = []
+            try:
+                tree = self.parser.parse(expr, lexer=self.lexer)
+            except NineMLMathParseError, e:
+                raise NineMLMathParseError(str(e) +
+                                           " Expression was: '%s'" % expr)
+            # remove names from the math_namespace
+            names = set(self.names)
+            names.difference_update(get_builtin_symbols())
+            return names, set(self.funcs), tree
 
 
 class CalcExpr(ExprParser):
 
+    tabmodule = 'expressions_parsetab'
+
     tokens = (
         'NAME', 'NUMBER',
         'PLUS', 'MINUS', 'EXP', 'TIMES', 'DIVIDE',
@@ -104,7 +112,7 @@ class CalcExpr(ExprParser):
     t_COMMA = r','
 
     def t_NUMBER(self, t):
-        r'(\d*\.\d+)|(\d+\.\d*)|(\d+)'
+        r'((\d*\.\d+)|(\d+\.\d*)|(\d+))([eE][+-]?\d+)?'
         try:
             t.value = float(t.value)
         except ValueError:
@@ -127,7 +135,7 @@ class CalcExpr(ExprParser):
 
     def p_statement_expr(self, p):
         'statement : expression'
-        pass
+        p[0] = p[1]
 
     def p_expression_binop(self, p):
         """
@@ -137,11 +145,11 @@ class CalcExpr(ExprParser):
                   | expression DIVIDE expression
                   | expression EXP expression
         """
-        pass
+        p[0] = BinOp(p[2], p[1], p[3])
 
     def p_expression_uminus(self, p):
         'expression : MINUS expression %prec UMINUS'
-        pass
+        p[0] = UnaryOp('-', p[2])
 
     def p_func(self, p):
         """expression : LFUNC expression RPAREN\n | LFUNC RPAREN
@@ -155,18 +163,21 @@ class CalcExpr(ExprParser):
         # if func_name not in math_namespace.namespace:
         #    raise NineMLMathParseError, "Undefined function '%s'" % func_name
         self.funcs.append(func_name)
+        p[0] = make_call(func_name,
+                         [p[i] for i in xrange(2, len(p) - 1, 2)])
 
     def p_expression_group(self, p):
         'expression : LPAREN expression RPAREN'
-        pass
+        p[0] = p[2]
 
     def p_expression_number(self, p):
         'expression : NUMBER'
-        pass
+        p[0] = Number(p[1])
 
     def p_expression_name(self, p):
         'expression : NAME'
         self.names.append(p[1])
+        p[0] = Name(p[1])
 
     def p_error(self, p):
         if p:
@@ -178,17 +189,43 @@ class CalcExpr(ExprParser):
 
 def expr_parse(rhs):
     """ Parses an expression rhs, i.e. no "=, +=, -=, etc." in the expr
-    and returns var names and func names as sets """
+    and returns var names and func names as frozensets
 
-    calc = CalcExpr()
-    # Remove endlines
-    rhs = rhs.replace('\n', ' ')
-    rhs = rhs.replace('\r', ' ')
-    # Expand scientific notation, 1e-10 to 1 * pow(10, -10)
-    rhs = re.sub(r'([0-9])e(\-?[0-9\.]+)', r'\1 * pow(10, \2)', rhs)
-    # Convert '^' to pow()
-    rhs = escape_carets(rhs)
-    return calc.parse(rhs)
+    The results are cached in `expr_parse_cache` by the RHS with normalised
+    whitespace, so expressions that are parsed repeatedly (e.g. when
+    components are cloned or flattened) are only parsed once """
+    return _cached_parse(rhs)[0]
+
+
+def expr_parse_tree(rhs):
+    """ Returns the syntax tree of an expression rhs (see `tree`), which is
+    cached along with its names and funcs """
+    return _cached_parse(rhs)[1]
+
+
+def _cached_parse(rhs):
+    # Normalise whitespace (including endlines)
+    rhs = ' '.join(rhs.split())
+    parsed = expr_parse_cache.get(rhs)
+    if parsed is None:
+        # Convert '^' to pow()
+        names, funcs, tree = _get_parser().parse(escape_carets(rhs))
+        parsed = ((frozenset(names), frozenset(funcs)), tree)
+        expr_parse_cache.add(rhs, parsed)
+    return parsed
+
+
+def _get_parser():
+    global _parser
+    if _parser is None:
+        _parser = CalcExpr()
+    return _parser
+
+
+_parser = None
+
+# Parsed names, funcs and trees of recently parsed expressions
+expr_parse_cache = LRUCache(max_size=4096)
 
 
 def escape_carets(string):
@@ -0,0 +1,43 @@
+
+# nineml/abstraction_layer/expressions/parse/expressions_parsetab.py
+# This file is automatically generated. Do not edit.
+_tabversion = '3.2'
+
+_lr_method = 'LALR'
+
+_lr_signature = '\xdb\xde\xb3\x10\x82=6\xa9\x166\xedi\xed\x12\xa5\x8c'
+    
+_lr_action_items = {'LFUNC':([0,1,4,6,11,12,13,14,15,18,27,],[1,1,1,1,1,1,1,1,1,1,1,]),'RPAREN':([1,2,7,8,9,10,16,17,19,20,21,22,23,24,25,26,28,29,],[8,-13,-14,-9,17,19,-7,-8,-12,-5,-4,-2,-6,-3,26,-10,29,-11,]),'NAME':([0,1,4,6,11,12,13,14,15,18,27,],[7,7,7,7,7,7,7,7,7,7,7,]),'NUMBER':([0,1,4,6,11,12,13,14,15,18,27,],[2,2,2,2,2,2,2,2,2,2,2,]),'TIMES':([2,5,7,8,9,10,16,17,19,20,21,22,23,24,25,26,28,29,],[-13,12,-14,-9,12,12,-7,-8,-12,-5,-4,12,-6,12,12,-10,12,-11,]),'PLUS':([2,5,7,8,9,10,16,17,19,20,21,22,23,24,25,26,28,29,],[-13,13,-14,-9,13,13,-7,-8,-12,-5,-4,-2,-6,-3,13,-10,13,-11,]),'LPAREN':([0,1,4,6,11,12,13,14,15,18,27,],[4,4,4,4,4,4,4,4,4,4,4,]),'COMMA':([2,7,8,9,16,17,19,20,21,22,23,24,25,26,29,],[-13,-14,-9,18,-7,-8,-12,-5,-4,-2,-6,-3,27,-10,-11,]),'EXP':([2,5,7,8,9,10,16,17,19,20,21,22,23,24,25,26,28,29,],[-13,14,-14,-9,14,14,-7,-8,-12,14,14,14,-6,14,14,-10,14,-11,]),'$end':([2,3,5,7,8,16,17,19,20,21,22,23,24,26,29,],[-13,0,-1,-14,-9,-7,-8,-12,-5,-4,-2,-6,-3,-10,-11,]),'MINUS':([0,1,2,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,23,24,25,26,27,28,29,],[6,6,-13,6,15,6,-14,-9,15,15,6,6,6,6,6,-7,-8,6,-12,-5,-4,-2,-6,-3,15,-10,6,15,-11,]),'DIVIDE':([2,5,7,8,9,10,16,17,19,20,21,22,23,24,25,26,28,29,],[-13,11,-14,-9,11,11,-7,-8,-12,-5,-4,11,-6,11,11,-10,11,-11,]),}
+
+_lr_action = { }
+for _k, _v in _lr_action_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+      if not _x in _lr_action:  _lr_action[_x] = { }
+      _lr_action[_x][_k] = _y
+del _lr_action_items
+
+_lr_goto_items = {'expression':([0,1,4,6,11,12,13,14,15,18,27,],[5,9,10,16,20,21,22,23,24,25,28,]),'statement':([0,],[3,]),}
+
+_lr_goto = { }
+for _k, _v in _lr_goto_items.items():
+   for _x,_y in zip(_v[0],_v[1]):
+       if not _x in _lr_goto: _lr_goto[_x] = { }
+       _lr_goto[_x][_k] = _y
+del _lr_goto_items
+_lr_productions = [
+  ("S' -> statement","S'",1,None,None,None),
+  ('statement -> expression','statement',1,'p_statement_expr','nineml/abstraction_layer/expressions/parse/expressions.py',132),
+  ('expression -> expression PLUS expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/expressions.py',137),
+  ('expression -> expression MINUS expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/expressions.py',138),
+  ('expression -> expression TIMES expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/expressions.py',139),
+  ('expression -> expression DIVIDE expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/expressions.py',140),
+  ('expression -> expression EXP expression','expression',3,'p_expression_binop','nineml/abstraction_layer/expressions/parse/expressions.py',141),
+  ('expression -> MINUS expression','expression',2,'p_expression_uminus','nineml/abstraction_layer/expressions/parse/expressions.py',146),
+  ('expression -> LFUNC expression RPAREN','expression',3,'p_func','nineml/abstraction_layer/expressions/parse/expressions.py',150),
+  ('expression -> LFUNC RPAREN','expression',2,'p_func','nineml/abstraction_layer/expressions/parse/expressions.py',151),
+  ('expression -> LFUNC expression COMMA expression RPAREN','expression',5,'p_func','nineml/abstraction_layer/expressions/parse/expressions.py',152),
+  ('expression -> LFUNC expression COMMA expression COMMA expression RPAREN','expression',7,'p_func','nineml/abstraction_layer/expressions/parse/expressions.py',153),
+  ('expression -> LPAREN expression RPAREN','expression',3,'p_expression_group','nineml/abstraction_layer/expressions/parse/expressions.py',163),
+  ('expression -> NUMBER','expression',1,'p_expression_number','nineml/abstraction_layer/expressions/parse/expressions.py',167),
+  ('expression -> NAME','expression',1,'p_expression_name','nineml/abstraction_layer/expressions/parse/expressions.py',171),
+]
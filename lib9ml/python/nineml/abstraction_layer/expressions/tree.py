@@ -0,0 +1,517 @@
+"""
+Immutable syntax trees of the expressions and conditions on the RHS of
+Expressions, which are built by the parsers in `parse`.
+
+Nodes are hash-consed, i.e. there is only ever one node with the same type
+and arguments (and therefore children) alive at a time, so identical
+subtrees are shared within and between expressions, can be compared by
+identity, and transformations (renaming, substitution) only need to visit
+each distinct subtree once.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+import math
+import operator
+import numpy
+from weakref import WeakValueDictionary
+from .utils import str_to_npfunc_map, random_functions
+
+
+class Node(object):
+
+    """
+    Base class of the nodes of expression trees, which are immutable and
+    interned on their type and arguments
+    """
+
+    __slots__ = ('_args', '_hash', '__weakref__')
+
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, *args):
+        key = (cls,) + args
+        try:
+            return Node._interned[key]
+        except KeyError:
+            pass
+        self = super(Node, cls).__new__(cls)
+        object.__setattr__(self, '_args', args)
+        object.__setattr__(self, '_hash', hash(key))
+        Node._interned[key] = self
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Expression tree nodes are immutable")
+
+    def __reduce__(self):
+        return (type(self), self._args)
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__,
+                               ', '.join(repr(a) for a in self._args))
+
+    def __str__(self):
+        return nineml_printer(self)
+
+    @property
+    def children(self):
+        return ()
+
+    def iter_nodes(self):
+        """
+        Iterates through the distinct nodes of the tree (children first)
+        """
+        seen = set()
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                yield node
+            elif node not in seen:
+                seen.add(node)
+                stack.append((node, True))
+                stack.extend((c, False) for c in reversed(node.children))
+
+    @property
+    def names(self):
+        """The names of the variables (and constants) in the tree"""
+        return frozenset(n.name for n in self.iter_nodes()
+                         if isinstance(n, Name))
+
+    @property
+    def funcs(self):
+        """The names of the functions called in the tree"""
+        return frozenset(n.func for n in self.iter_nodes()
+                         if isinstance(n, Call))
+
+    def transform(self, transform_leaf):
+        """
+        Returns the tree with each leaf node replaced by the node returned by
+        `transform_leaf` (or the leaf itself if it returns None), rebuilding
+        only the parts of the tree that change
+        """
+        memo = {}
+        for node in self.iter_nodes():
+            if node.children:
+                children = tuple(memo[c] for c in node.children)
+                if all(n is c for n, c in zip(children, node.children)):
+                    memo[node] = node
+                else:
+                    memo[node] = node._with_children(children)
+            else:
+                transformed = transform_leaf(node)
+                memo[node] = transformed if transformed is not None else node
+        return memo[self]
+
+    def rename(self, name_map, func_map=None):
+        """
+        Returns the tree with the variable names in `name_map` and the
+        function names in `func_map` renamed
+        """
+        func_map = func_map or {}
+
+        def rename_leaf(node):
+            if isinstance(node, Name) and node.name in name_map:
+                return Name(name_map[node.name])
+        renamed = self.transform(rename_leaf)
+        if func_map:
+            renamed = renamed._rename_funcs(func_map)
+        return renamed
+
+    def _rename_funcs(self, func_map):
+        memo = {}
+        for node in self.iter_nodes():
+            children = tuple(memo[c] for c in node.children)
+            if isinstance(node, Call) and node.func in func_map:
+                memo[node] = Call(func_map[node.func], children)
+            elif children and any(n is not c
+                                  for n, c in zip(children, node.children)):
+                memo[node] = node._with_children(children)
+            else:
+                memo[node] = node
+        return memo[self]
+
+    def substitute(self, substitutions):
+        """
+        Returns the tree with the names in `substitutions` replaced by the
+        trees they map to
+        """
+        def substitute_leaf(node):
+            if isinstance(node, Name):
+                return substitutions.get(node.name)
+        return self.transform(substitute_leaf)
+
+    def fold(self):
+        """
+        Returns the tree with its constant sub-expressions evaluated and
+        trivial operations (e.g. 'x * 1' or 'true & x') simplified.
+        Sub-expressions that draw random numbers or can't be evaluated (e.g.
+        division by zero) are left as they are.
+        """
+        memo = {}
+        for node in self.iter_nodes():
+            children = tuple(memo[c] for c in node.children)
+            if any(n is not c for n, c in zip(children, node.children)):
+                memo[node] = node._with_children(children)._fold()
+            else:
+                memo[node] = node._fold()
+        return memo[self]
+
+    def _fold(self):
+        return self
+
+    def to_python(self):
+        return python_printer(self)
+
+    def to_c(self):
+        return c_printer(self)
+
+    def to_nmodl(self):
+        return nmodl_printer(self)
+
+
+class Number(Node):
+
+    __slots__ = ()
+
+    def __new__(cls, value):
+        return Node.__new__(cls, float(value))
+
+    @property
+    def value(self):
+        return self._args[0]
+
+
+class Name(Node):
+
+    __slots__ = ()
+
+    def __new__(cls, name):
+        return Node.__new__(cls, name)
+
+    @property
+    def name(self):
+        return self._args[0]
+
+
+class Bool(Node):
+
+    __slots__ = ()
+
+    def __new__(cls, value):
+        return Node.__new__(cls, bool(value))
+
+    @property
+    def value(self):
+        return self._args[0]
+
+
+class Call(Node):
+
+    __slots__ = ()
+
+    def __new__(cls, func, args):
+        return Node.__new__(cls, func, tuple(args))
+
+    @property
+    def func(self):
+        return self._args[0]
+
+    @property
+    def args(self):
+        return self._args[1]
+
+    @property
+    def children(self):
+        return self._args[1]
+
+    def _with_children(self, children):
+        return Call(self.func, children)
+
+    def _fold(self):
+        if (all(isinstance(a, Number) for a in self.args) and
+                self.func in str_to_npfunc_map and
+                self.func not in random_functions):
+            return _evaluate(self, str_to_npfunc_map[self.func],
+                             *(a.value for a in self.args))
+        return self
+
+
+def make_call(func, args):
+    """
+    Builds the node for a call to `func`, writing calls to pow() as '**'
+    operators so that 'x ^ y', 'x ** y' and 'pow(x, y)' share a tree
+    """
+    args = tuple(args)
+    if func == 'pow' and len(args) == 2:
+        return BinOp('**', *args)
+    return Call(func, args)
+
+
+class UnaryOp(Node):
+
+    """
+    Unary minus ('-') or logical not ('!')
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, op, operand):
+        return Node.__new__(cls, op, operand)
+
+    @property
+    def op(self):
+        return self._args[0]
+
+    @property
+    def operand(self):
+        return self._args[1]
+
+    @property
+    def children(self):
+        return (self._args[1],)
+
+    def _with_children(self, children):
+        return UnaryOp(self.op, children[0])
+
+    def _fold(self):
+        operand = self.operand
+        if self.op == '-':
+            if isinstance(operand, Number):
+                return Number(-operand.value)
+            elif isinstance(operand, UnaryOp) and operand.op == '-':
+                return operand.operand
+        elif self.op == '!':
+            if isinstance(operand, Bool):
+                return Bool(not operand.value)
+            elif isinstance(operand, UnaryOp) and operand.op == '!':
+                return operand.operand
+        return self
+
+
+class BinOp(Node):
+
+    """
+    Arithmetic ('+', '-', '*', '/', '**'), comparison ('<', '<=', '>', '>=',
+    '==', '!=') or logical ('&', '|') binary operator
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, op, left, right):
+        return Node.__new__(cls, op, left, right)
+
+    @property
+    def op(self):
+        return self._args[0]
+
+    @property
+    def left(self):
+        return self._args[1]
+
+    @property
+    def right(self):
+        return self._args[2]
+
+    @property
+    def children(self):
+        return self._args[1:]
+
+    def _with_children(self, children):
+        return BinOp(self.op, *children)
+
+    _operators = {'+': operator.add, '-': operator.sub, '*': operator.mul,
+                  '/': operator.truediv, '**': operator.pow,
+                  '<': operator.lt, '<=': operator.le, '>': operator.gt,
+                  '>=': operator.ge, '==': operator.eq, '!=': operator.ne}
+
+    def _fold(self):
+        left, right = self.left, self.right
+        if self.op in ('&', '|'):
+            # Identity (true & x, false | x) and annihilator values
+            identity = self.op == '&'
+            for const, other in ((left, right), (right, left)):
+                if isinstance(const, Bool):
+                    return other if const.value == identity else const
+            return self
+        if isinstance(left, Number) and isinstance(right, Number):
+            return _evaluate(self, self._operators[self.op], left.value,
+                             right.value)
+        # Arithmetic identities
+        if isinstance(right, Number):
+            if ((self.op in ('+', '-') and right.value == 0.0) or
+                    (self.op in ('*', '/', '**') and right.value == 1.0)):
+                return left
+            if self.op == '**' and right.value == 0.0:
+                return Number(1.0)
+        if isinstance(left, Number):
+            if ((self.op == '+' and left.value == 0.0) or
+                    (self.op == '*' and left.value == 1.0)):
+                return right
+            if self.op == '-' and left.value == 0.0:
+                return UnaryOp('-', right)._fold()
+        return self
+
+
+def _evaluate(node, func, *args):
+    """
+    Evaluates a function of constants, returning the original node if the
+    result isn't a finite number
+    """
+    try:
+        with numpy.errstate(all='ignore'):
+            value = func(*args)
+    except (ArithmeticError, ValueError):
+        return node
+    if isinstance(value, bool) or type(value).__name__ == 'bool_':
+        return Bool(value)
+    try:
+        value = float(value)
+    except TypeError:
+        return node
+    if math.isinf(value) or math.isnan(value):
+        return node
+    return Number(value)
+
+
+class Printer(object):
+
+    """
+    Prints expression trees in the syntax of a language, adding only the
+    brackets that are required by the precedence of its operators
+    """
+
+    # Operator strings and precedences (higher binds more tightly)
+    binary_ops = {'|': ('|', 1), '&': ('&', 2),
+                  '<': ('<', 4), '<=': ('<=', 4), '>': ('>', 4),
+                  '>=': ('>=', 4), '==': ('==', 4), '!=': ('!=', 4),
+                  '+': ('+', 5), '-': ('-', 5), '*': ('*', 6), '/': ('/', 6),
+                  '**': ('**', 8)}
+    # Unary minus binds more tightly than '**' in NineML (i.e. '-x ** 2' is
+    # '(-x) ** 2'), which differs from some of the target languages, so the
+    # operands of '**' are bracketed unless they are atoms (see `_print`)
+    unary_ops = {'!': ('!', 9), '-': ('-', 9)}
+    functions = {}
+    constants = {}
+    bools = ('false', 'true')
+    # Whether x ** y is written as pow(x, y)
+    pow_function = None
+
+    _atom = 10
+    _comparison = 4
+
+    _logical = ('&', '|')
+
+    def __call__(self, node):
+        return self._print(node)[0]
+
+    def _is_logical(self, node):
+        return isinstance(node, BinOp) and node.op in self._logical
+
+    def _is_negative(self, node):
+        return ((isinstance(node, UnaryOp) and node.op == '-') or
+                (isinstance(node, Number) and node.value < 0))
+
+    def _print(self, node):
+        if isinstance(node, Number):
+            # Numbers are always written as floats to avoid integer division.
+            # Negative numbers bind like a unary minus
+            return (repr(node.value),
+                    self.unary_ops['-'][1] if node.value < 0 else self._atom)
+        elif isinstance(node, Name):
+            return self.constants.get(node.name, node.name), self._atom
+        elif isinstance(node, Bool):
+            return self.bools[node.value], self._atom
+        elif isinstance(node, Call):
+            if node.func == 'pow' and len(node.args) == 2 and \
+                    self.pow_function is None:
+                return self._print(BinOp('**', *node.args))
+            return '{}({})'.format(
+                self.functions.get(node.func, node.func),
+                ', '.join(self._print(a)[0] for a in node.args)), self._atom
+        elif isinstance(node, UnaryOp):
+            op, prec = self.unary_ops[node.op]
+            operand, operand_prec = self._print(node.operand)
+            # Negated negatives are bracketed so that they aren't written as
+            # '--', which is the decrement operator in C and NMODL
+            if operand_prec < prec or (node.op == '-' and
+                                       self._is_negative(node.operand)):
+                operand = '(' + operand + ')'
+            return op + operand, prec
+        elif isinstance(node, BinOp):
+            if node.op == '**' and self.pow_function is not None:
+                return self._print(Call(self.pow_function,
+                                        (node.left, node.right)))
+            op, prec = self.binary_ops[node.op]
+            left, left_prec = self._print(node.left)
+            right, right_prec = self._print(node.right)
+            # The operators are left-associative in NineML (including '**')
+            # so brackets are added to right operands with the same
+            # precedence, and to both operands of comparisons (which can't
+            # be chained). The operands of '**' are bracketed unless they are
+            # atoms, as the relative precedence of '**' and unary minus
+            # varies between languages, and logical operands of logical
+            # operators are always bracketed, as '&' and '|' have the same
+            # precedence and group to the right in NineML conditions but not
+            # in the target languages
+            if node.op == '**':
+                if left_prec < self._atom:
+                    left = '(' + left + ')'
+                if right_prec < self._atom:
+                    right = '(' + right + ')'
+            elif node.op in self._logical:
+                if self._is_logical(node.left) or left_prec < prec:
+                    left = '(' + left + ')'
+                if self._is_logical(node.right) or right_prec < prec:
+                    right = '(' + right + ')'
+            else:
+                if left_prec < prec or (left_prec == prec and
+                                        prec == self._comparison):
+                    left = '(' + left + ')'
+                if right_prec <= prec:
+                    right = '(' + right + ')'
+            return '{} {} {}'.format(left, op, right), prec
+        else:
+            raise TypeError("Unrecognised node '{}'".format(node))
+
+
+class NineMLPrinter(Printer):
+
+    pass
+
+
+class PythonPrinter(Printer):
+
+    binary_ops = dict(Printer.binary_ops)
+    binary_ops.update({'|': ('or', 1), '&': ('and', 2)})
+    unary_ops = {'!': ('not ', 3), '-': ('-', 9)}
+    bools = ('False', 'True')
+
+
+class CPrinter(Printer):
+
+    binary_ops = dict(Printer.binary_ops)
+    binary_ops.update({'|': ('||', 1), '&': ('&&', 2)})
+    functions = {'abs': 'fabs', 'mod': 'fmod'}
+    constants = {'pi': 'M_PI'}
+    bools = ('0', '1')
+    pow_function = 'pow'
+
+
+class NMODLPrinter(Printer):
+
+    binary_ops = dict(Printer.binary_ops)
+    binary_ops.update({'|': ('||', 1), '&': ('&&', 2), '**': ('^', 8)})
+    functions = {'abs': 'fabs'}
+    constants = {'pi': 'PI'}
+    bools = ('0', '1')
+
+
+nineml_printer = NineMLPrinter()
+python_printer = PythonPrinter()
+c_printer = CPrinter()
+nmodl_printer = NMODLPrinter()
@@ -126,16 +126,49 @@ def get_reserved_and_builtin_symbols():
     return get_builtin_symbols() | _reserved_symbols
 
 
+# The NumPy implementations of the builtin functions and constants, which are
+# used to evaluate expressions over arrays (see `kernels`). The functions in
+# the math namespaces are included under their dotted names.
 str_to_npfunc_map = {
     "exp": numpy.exp,
-    "sqrt": numpy.sqrt,
     "sin": numpy.sin,
     "cos": numpy.cos,
-    "atan2": numpy.arctan2,
     "log": numpy.log,
+    "log10": numpy.log10,
+    "pow": numpy.power,
+    "abs": numpy.abs,
+    "sinh": numpy.sinh,
+    "cosh": numpy.cosh,
+    "tanh": numpy.tanh,
+    "sqrt": numpy.sqrt,
+    "mod": numpy.mod,
+    "sum": numpy.sum,
+    "atan": numpy.arctan,
+    "asin": numpy.arcsin,
+    "acos": numpy.arccos,
+    "asinh": numpy.arcsinh,
+    "acosh": numpy.arccosh,
+    "atanh": numpy.arctanh,
+    "atan2": numpy.arctan2,
+    "uniform": numpy.random.uniform,
+    "binomial": numpy.random.binomial,
+    "poisson": numpy.random.poisson,
+    "exponential": numpy.random.exponential,
     "pi": numpy.pi,
     "e": numpy.e
 }
+for _ns_name, _ns in _math_namespaces.iteritems():
+    for _func_name, _func in _ns.iteritems():
+        str_to_npfunc_map[_ns_name + math_namespace_separator +
+                          _func_name] = _func
+# randn takes the dimensions of its output as positional arguments
+str_to_npfunc_map['random.randn'] = numpy.random.standard_normal
+
+# The functions that draw random numbers, which need to be told the shape of
+# the arrays they are evaluated over
+random_functions = set(['uniform', 'binomial', 'poisson', 'exponential'])
+random_functions.update('random' + math_namespace_separator + f
+                        for f in _random_namespace)
 
 
 def func_namespace_split(func_name):
@@ -184,10 +217,41 @@ class MathUtil(object):
         else:
             # this will not replace a function name even if its name matches
             # from due to the lookahead disallowing '('
-            p_func = re.compile(r"(?<![a-zA-Z_0-9])(%s)(?![(a-zA-Z_0-9])" %
-                                frm)
+            p_func = re.compile(
+                r"(?<![a-zA-Z_0-9])(%s)(?![a-zA-Z_0-9]|\s*\()" % frm)
         return p_func.sub(to, expr_string)
 
+    # Matches the names in an expression (which may be dotted for function
+    # names), and the opening bracket (and any whitespace before it) after
+    # function names
+    _name_re = re.compile(r"(?<![a-zA-Z_0-9])"
+                          r"([a-zA-Z_][a-zA-Z_0-9]*"
+                          r"(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*)"
+                          r"(\s*\()?")
+
+    @classmethod
+    def str_expr_batch_replacement(cls, name_map, expr_string,
+                                   func_map=None):
+        """ replaces all occurences of the names in 'name_map' with their
+        mapped values in expr_string, and all occurences of the function
+        names in 'func_map' (names followed by '(') with theirs, in a single
+        pass over the names in the expression. As in str_expr_replacement,
+        names in 'name_map' are not replaced where they occur as function
+        names.
+
+        The replacements are simultaneous, i.e. a replaced name is not
+        replaced again if it is also in the map.
+
+        Returns the resulting string. """
+        func_map = func_map or {}
+
+        def replace(match):
+            name, bracket = match.groups()
+            if bracket:
+                return func_map.get(name, name) + bracket
+            return name_map.get(name, func_map.get(name, name))
+        return cls._name_re.sub(replace, expr_string)
+
     @classmethod
     def rename_function(cls, expr, orig_func_name, new_func_expr):
         """ This method allows us to subsitute function call names, and
@@ -212,10 +276,7 @@ class MathUtil(object):
 
     @classmethod
     def get_rhs_substituted(cls, expr_obj, namemap):
-        expr = expr_obj.rhs
-        for frm, to in namemap.iteritems():
-            expr = MathUtil.str_expr_replacement(frm, to, expr, func_ok=False)
-        return expr
+        return MathUtil.str_expr_batch_replacement(namemap, expr_obj.rhs)
 
     @classmethod
     def get_prefixed_rhs_string(cls, expr_obj, prefix="", exclude=None):
@@ -225,18 +286,13 @@ class MathUtil(object):
         variables)
         """
 
-        expr = expr_obj.rhs
-        for name in expr_obj.rhs_names:
-            if exclude and name in exclude:
-                continue
-            expr = MathUtil.str_expr_replacement(name, prefix + name, expr)
-        for func in expr_obj.rhs_funcs:
-            if not is_builtin_symbol(func):
-                expr = MathUtil.str_expr_replacement(func,
-                                                     prefix + func,
-                                                     expr,
-                                                     func_ok=True)
-        return expr
+        exclude = exclude or ()
+        name_map = dict((name, prefix + name) for name in expr_obj.rhs_names
+                        if name not in exclude)
+        func_map = dict((func, prefix + func) for func in expr_obj.rhs_funcs
+                        if not is_builtin_symbol(func))
+        return MathUtil.str_expr_batch_replacement(name_map, expr_obj.rhs,
+                                                   func_map=func_map)
 
     @classmethod
     def is_single_symbol(cls, expr):
@@ -1,45 +1,67 @@
+from weakref import WeakValueDictionary
 from nineml.xmlns import E
 from . import BaseALObject
 from nineml import TopLevelObject
-from nineml.annotations import annotate_xml, read_annotations
-
-# Might be an idea to subclass namedtuple to prevent dimensions being redefined
-# and therefore protect the hash
-#
-# class D(namedtuple('Base', 'name m l t i n k j'), A):
-#     def __new__(self, name, m=0, l=0, t=0, n=0, k=0, j=0):
-#         return super(D, self).__new__(self, name, t, k, m, l, n, j)
-#     def __init__(self, name, m=0, l=0, t=0, n=0, k=0, j=0):
-#         pass
-#
-# NB: Not sure this works
+from nineml.annotations import annotate_xml, extract_annotations
 
 
 class Dimension(BaseALObject, TopLevelObject):
     """
     Defines the dimension used for quantity units
+
+    Dimensions are immutable and interned, so creating a dimension with the
+    same name and powers as an existing one returns the existing object
+    (unless it has annotations).
     """
 
+    __slots__ = ('_name', '_powers', '_hash', 'annotations', '__weakref__')
+
     element_name = 'Dimension'
     valid_dims = ['m', 'l', 't', 'i', 'n', 'k', 'j']
     SI_unit_conversion = {'m': 'Kg', 'l': 'm', 't': 's', 'i': 'A', 'n': 'mol',
                           'k': 'K', 'j': 'cd'}
 
-    def __init__(self, name, **kwargs):
-        super(Dimension, self).__init__()
-        self._name = name
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, name, annotations=None, **kwargs):
         for k in kwargs:
-            if k not in self.valid_dims:
+            if k not in cls.valid_dims:
                 raise Exception("'{}' is not a valid dimension name ('{}')"
-                                .format(k, "', '".join(self.valid_dims)))
-        self._dims = kwargs
+                                .format(k, "', '".join(cls.valid_dims)))
+        powers = tuple(kwargs.get(d, 0) for d in cls.valid_dims)
+        key = (cls, name, powers)
+        if annotations is None:
+            try:
+                return cls._interned[key]
+            except KeyError:
+                pass
+        self = super(Dimension, cls).__new__(cls)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_powers', powers)
+        object.__setattr__(self, '_hash', hash(powers))
+        object.__setattr__(self, 'annotations', annotations)
+        if annotations is None:
+            cls._interned[key] = self
+        return self
+
+    def __init__(self, name, annotations=None, **kwargs):
+        pass  # Initialised in __new__ so interned objects are not modified
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Dimension objects are immutable")
+
+    def __reduce__(self):
+        return (_unpickle_dimension,
+                (type(self), self._name, self._powers, self.annotations))
 
     def __eq__(self, other):
+        if self is other:
+            return True
         assert isinstance(other, Dimension)
-        return all(self.power(d) == other.power(d) for d in self.valid_dims)
+        return self._hash == other._hash and self._powers == other._powers
 
     def __hash__(self):
-        return hash(tuple(self.power(d) for d in self.valid_dims))
+        return self._hash
 
     def __ne__(self, other):
         return not (self == other)
@@ -47,23 +69,34 @@ class Dimension(BaseALObject, TopLevelObject):
     def __repr__(self):
         return ("Dimension(name='{}'{})"
                 .format(self.name, ''.join(", {}={}".format(d, p)
-                                           for d, p in self._dims.items())))
+                                           for d, p in self._nonzero_powers)))
 
     @property
     def name(self):
         return self._name
 
     def power(self, dim_name):
-        return self._dims.get(dim_name, 0)
+        return self._powers[self.valid_dims.index(dim_name)]
+
+    @property
+    def powers(self):
+        """
+        The powers of the fundamental dimensions in the order of valid_dims
+        """
+        return self._powers
+
+    @property
+    def _nonzero_powers(self):
+        return [(d, p) for d, p in zip(self.valid_dims, self._powers) if p]
 
     def to_SI_units_str(self):
         numer = '*'.join(('({}**{})'.format(self.SI_unit_conversion[n], p)
                           if p > 1 else self.SI_unit_conversion[n])
-                         for n, p in self._dims.iteritems()
+                         for n, p in self._nonzero_powers
                          if p > 0)
         denom = '*'.join(('({}**{})'.format(self.SI_unit_conversion[n], p)
                           if p > 1 else self.SI_unit_conversion[n])
-                         for n, p in self._dims.iteritems()
+                         for n, p in self._nonzero_powers
                          if p < 0)
         return '{}/({})'.format(numer, denom)
 
@@ -74,40 +107,80 @@ class Dimension(BaseALObject, TopLevelObject):
     @annotate_xml
     def to_xml(self):
         kwargs = {'name': self.name}
-        kwargs.update(dict((k, str(v)) for k, v in self._dims.items()))
+        kwargs.update(dict((k, str(v)) for k, v in self._nonzero_powers))
         return E(self.element_name, **kwargs)
 
     @classmethod
-    @read_annotations
     def from_xml(cls, element, _):
+        annotations, element = extract_annotations(element)
         kwargs = dict(element.attrib)
         name = kwargs.pop('name')
         kwargs = dict((k, int(v)) for k, v in kwargs.items())
-        return cls(name, **kwargs)
+        return cls(name, annotations=annotations, **kwargs)
+
+
+def _unpickle_dimension(cls, name, powers, annotations):
+    return cls(name, annotations=annotations, **dict(zip(cls.valid_dims,
+                                                         powers)))
 
 
 class Unit(BaseALObject, TopLevelObject):
     """
     Defines the units of a quantity
+
+    Units are immutable and interned, so creating a unit with the same name,
+    dimension object, power and offset as an existing one returns the existing
+    object (unless it has annotations).
     """
 
+    __slots__ = ('_name', '_dimension', '_power', '_offset', '_hash',
+                 'annotations', '__weakref__')
+
     element_name = 'Unit'
     defining_attributes = ('name', 'dimension', 'power', 'offset')
 
-    def __init__(self, name, dimension, power, offset=0.0):
-        super(Unit, self).__init__()
-        self._name = name
-        self._dimension = dimension
-        self._power = power
-        self._offset = offset
+    _interned = WeakValueDictionary()
+
+    def __new__(cls, name, dimension, power, offset=0.0, annotations=None):
+        # Dimensions are compared by identity as equal dimensions can have
+        # different names
+        key = (cls, name, id(dimension), power, offset)
+        if annotations is None:
+            try:
+                return cls._interned[key]
+            except KeyError:
+                pass
+        self = super(Unit, cls).__new__(cls)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_dimension', dimension)
+        object.__setattr__(self, '_power', power)
+        object.__setattr__(self, '_offset', offset)
+        object.__setattr__(self, '_hash', hash((power, offset, dimension)))
+        object.__setattr__(self, 'annotations', annotations)
+        if annotations is None:
+            cls._interned[key] = self
+        return self
+
+    def __init__(self, name, dimension, power, offset=0.0, annotations=None):
+        pass  # Initialised in __new__ so interned objects are not modified
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Unit objects are immutable")
+
+    def __reduce__(self):
+        return (type(self), (self._name, self._dimension, self._power,
+                             self._offset, self.annotations))
 
     def __eq__(self, other):
+        if self is other:
+            return True
         assert isinstance(other, Unit)
-        return (self.power == other.power and self.offset == other.offset and
+        return (self._hash == other._hash and self.power == other.power and
+                self.offset == other.offset and
                 self.dimension == other.dimension)
 
     def __hash__(self):
-        return hash((self.power, self.offset, self.dimension))
+        return self._hash
 
     def __ne__(self, other):
         return not (self == other)
@@ -133,14 +206,18 @@ class Unit(BaseALObject, TopLevelObject):
     def dimension(self):
         return self._dimension
 
-    def set_dimension(self, dimension):
+    def with_dimension(self, dimension):
         """
-        Used to standardize dimension names across a NineML document. The
-        actual dimension (in terms of fundamental dimension powers) should
-        not change.
+        Returns the equivalent unit with the given dimension object. Used to
+        standardize dimension names across a NineML document, the actual
+        dimension (in terms of fundamental dimension powers) should not
+        change.
         """
         assert self.dimension == dimension, "dimensions do not match"
-        self._dimension = dimension
+        if dimension is self.dimension:
+            return self
+        return Unit(self.name, dimension, self.power, self.offset,
+                    annotations=self.annotations)
 
     @property
     def power(self):
@@ -164,13 +241,76 @@ class Unit(BaseALObject, TopLevelObject):
                  **kwargs)
 
     @classmethod
-    @read_annotations
     def from_xml(cls, element, document):
+        annotations, element = extract_annotations(element)
         name = element.attrib['symbol']
         dimension = document[element.attrib['dimension']]
         power = int(element.get('power', 0))
         offset = float(element.attrib.get('name', 0.0))
-        return cls(name, dimension, power, offset)
+        return cls(name, dimension, power, offset, annotations=annotations)
+
+
+class UnitRegistry(object):
+    """
+    Maps dimensions (by the powers of their fundamental dimensions) and units
+    (by their power, offset and dimension) to the first equivalent object
+    that was added, so equivalent dimensions and units with different names
+    can be standardized with a single dictionary lookup
+    """
+
+    def __init__(self, objects=()):
+        self._dimensions = {}
+        self._units = {}
+        for obj in objects:
+            if obj is not None:
+                self.add(obj)
+
+    def add(self, obj):
+        """
+        Adds a dimension or unit and returns the canonical object equivalent
+        to it
+        """
+        table, key = self._entry(obj)
+        entries = table.setdefault(key, [])
+        if not any(e is obj for e in entries):
+            entries.append(obj)
+        return entries[0]
+
+    def remove(self, obj):
+        table, key = self._entry(obj)
+        entries = [e for e in table.get(key, []) if e is not obj]
+        if entries:
+            table[key] = entries
+        else:
+            table.pop(key, None)
+
+    def canonical(self, obj):
+        """
+        Returns the canonical object equivalent to the given dimension or unit
+        or None if no equivalent object has been added
+        """
+        if obj is None:
+            return None
+        table, key = self._entry(obj)
+        try:
+            return table[key][0]
+        except KeyError:
+            return None
+
+    @property
+    def dimensions(self):
+        return (e[0] for e in self._dimensions.itervalues())
+
+    @property
+    def units(self):
+        return (e[0] for e in self._units.itervalues())
+
+    def _entry(self, obj):
+        if isinstance(obj, Dimension):
+            return self._dimensions, obj.powers
+        elif isinstance(obj, Unit):
+            return self._units, (obj.power, obj.offset, obj.dimension.powers)
+        raise TypeError("'{}' is not a Dimension or Unit".format(obj))
 
 
 time = Dimension(name="time", t=1)
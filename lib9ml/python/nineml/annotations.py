@@ -1,4 +1,5 @@
 from copy import copy
+from lxml import etree
 from nineml.xmlns import E, NINEML
 from nineml import TopLevelObject
 
@@ -26,19 +27,38 @@ class Annotations(dict, TopLevelObject):
             children[child.tag] = child
         return cls(**children)
 
+    def __reduce__(self):
+        # lxml elements can't be pickled so they are stored as XML strings
+        return (_unpickle_annotations,
+                (type(self), [(k, etree.tostring(v, with_tail=False))
+                              for k, v in self.iteritems()]),
+                self.__dict__)
+
+
+def _unpickle_annotations(cls, items):
+    return cls((k, etree.fromstring(v)) for k, v in items)
+
+
+def extract_annotations(element):
+    """
+    Returns the annotations of the element (or None if it has none) and the
+    element with the annotations stripped
+    """
+    annot_elem = expect_none_or_single(
+        element.findall(NINEML + Annotations.element_name))
+    if annot_elem is None:
+        return None, element
+    # Extract the annotations
+    annotations = Annotations.from_xml(annot_elem)
+    # Get a copy of the element with the annotations stripped
+    element = copy(element)
+    element.remove(element.find(NINEML + Annotations.element_name))
+    return annotations, element
+
 
 def read_annotations(from_xml):
     def annotate_from_xml(cls, element, *args, **kwargs):
-        annot_elem = expect_none_or_single(
-            element.findall(NINEML + Annotations.element_name))
-        if annot_elem is not None:
-            # Extract the annotations
-            annotations = Annotations.from_xml(annot_elem)
-            # Get a copy of the element with the annotations stripped
-            element = copy(element)
-            element.remove(element.find(NINEML + Annotations.element_name))
-        else:
-            annotations = None
+        annotations, element = extract_annotations(element)
         nineml_object = from_xml(cls, element, *args, **kwargs)
         try:
             nineml_object.annotations = annotations
@@ -1,13 +1,25 @@
 import os.path
+import hashlib
+import hmac
+import tempfile
 from itertools import chain
 from urllib import urlopen
+from urlparse import urlparse
+from xml.parsers import expat
+from xml.sax.saxutils import quoteattr
 from lxml import etree
 import collections
-from nineml.xmlns import NINEML, E
+from copy import deepcopy
+import multiprocessing
+import cPickle as pickle
+from cStringIO import StringIO
+from nineml.xmlns import NINEML, E, nineml_namespace
 from nineml.annotations import Annotations
 from . import BaseNineMLObject
 from nineml.exceptions import NineMLRuntimeError
+from nineml.utils import LRUCache, Settings
 from nineml import TopLevelObject
+from nineml.abstraction_layer.units import UnitRegistry
 
 
 class Document(dict, BaseNineMLObject):
@@ -25,7 +37,14 @@ class Document(dict, BaseNineMLObject):
 
     def __init__(self, *elements, **kwargs):
         self.url = kwargs.pop('_url', None)
-        dict.__init__(self, **kwargs)
+        # Maps the class of each element (or the class it will be loaded as)
+        # to the names of the elements of that class
+        self._type_index = collections.defaultdict(set)
+        # The units and dimensions in the document indexed by their values
+        self._unit_registry = UnitRegistry()
+        dict.__init__(self)
+        for name, elem in kwargs.iteritems():
+            self[name] = elem
         for element in elements:
             self.add(element)
         # Stores the list of elements that are being loaded to check for
@@ -48,6 +67,81 @@ class Document(dict, BaseNineMLObject):
                 "already exists in the document".format(element.name))
         self[element.name] = element
 
+    def __setitem__(self, name, elem):
+        if name in self:
+            self._unindex(name)
+        dict.__setitem__(self, name, elem)
+        self._type_index[self._element_type(elem)].add(name)
+        if isinstance(elem, (nineml.abstraction_layer.Unit,
+                             nineml.abstraction_layer.Dimension)):
+            self._unit_registry.add(elem)
+
+    def __delitem__(self, name):
+        if name in self:
+            self._unindex(name)
+        dict.__delitem__(self, name)
+
+    def _unindex(self, name):
+        elem = super(Document, self).__getitem__(name)
+        if isinstance(elem, (nineml.abstraction_layer.Unit,
+                             nineml.abstraction_layer.Dimension)):
+            self._unit_registry.remove(elem)
+        cls = self._element_type(elem)
+        names = self._type_index[cls]
+        names.discard(name)
+        if not names:
+            del self._type_index[cls]
+
+    def names_of_type(self, cls):
+        """
+        Returns the names of the elements in the document that are (or will
+        be loaded as) instances of the given class, without loading them
+        """
+        return set(chain(*(names
+                           for elem_cls, names in self._type_index.iteritems()
+                           if issubclass(elem_cls, cls))))
+
+    def iter_type(self, cls):
+        """
+        Iterates over the elements of the given class, only loading those
+        """
+        return (self[n] for n in self.names_of_type(cls))
+
+    @classmethod
+    def _element_type(cls, elem):
+        """
+        Returns the class of the element or, for unloaded elements, the class
+        it will be loaded as
+        """
+        if not isinstance(elem, cls._Unloaded):
+            return type(elem)
+        if elem.cls is not nineml.abstraction_layer.ComponentClass:
+            return elem.cls
+        # ComponentClass elements are loaded as the subclass matching their
+        # class type (e.g. Dynamics)
+        if isinstance(elem.xml, _XMLSlice):
+            class_type = elem.xml.class_type
+        else:
+            try:
+                class_type = (nineml.abstraction_layer.componentclass.utils.
+                              ComponentClassXMLLoader.read_class_type(
+                                  elem.xml))
+            except NineMLRuntimeError:
+                class_type = None  # Invalid class will fail on load
+        if class_type is None:
+            return elem.cls
+        return getattr(nineml.abstraction_layer, class_type + 'Class')
+
+    def __reduce__(self):
+        # Elements are passed to the constructor so they are added after the
+        # type index is created. Unloaded elements are loaded first as the
+        # lxml elements they hold can't be pickled
+        state = dict((k, v) for k, v in self.__dict__.iteritems()
+                     if k not in ('_type_index', '_unit_registry',
+                                  '_loading'))
+        return (_unpickle_document, (type(self), dict(self.iteritems())),
+                state)
+
     def __eq__(self, other):
         # Ensure all objects are loaded
         self.values()
@@ -97,28 +191,23 @@ class Document(dict, BaseNineMLObject):
 
     @property
     def components(self):
-        return (o for o in self.itervalues()
-                if isinstance(o, nineml.user_layer.Component))  # @UndefinedVariable @IgnorePep8
+        return self.iter_type(nineml.user_layer.Component)  # @UndefinedVariable @IgnorePep8
 
     @property
     def componentclasses(self):
-        return (o for o in self.itervalues()
-                if isinstance(o, nineml.abstraction_layer.ComponentClass))  # @UndefinedVariable @IgnorePep8
+        return self.iter_type(nineml.abstraction_layer.ComponentClass)  # @UndefinedVariable @IgnorePep8
 
     @property
     def populations(self):
-        return (o for o in self.itervalues()
-                if isinstance(o, nineml.user_layer.Population))  # @UndefinedVariable @IgnorePep8
+        return self.iter_type(nineml.user_layer.Population)  # @UndefinedVariable @IgnorePep8
 
     @property
     def projections(self):
-        return (o for o in self.itervalues()
-                if isinstance(o, nineml.user_layer.Projection))  # @UndefinedVariable @IgnorePep8
+        return self.iter_type(nineml.user_layer.Projection)  # @UndefinedVariable @IgnorePep8
 
     @property
     def selections(self):
-        return (o for o in self.itervalues()
-                if isinstance(o, nineml.user_layer.Selection))  # @UndefinedVariable @IgnorePep8
+        return self.iter_type(nineml.user_layer.Selection)  # @UndefinedVariable @IgnorePep8
 
     @property
     def network_structures(self):
@@ -131,107 +220,338 @@ class Document(dict, BaseNineMLObject):
         """
         if unloaded in self._loading:
             raise Exception("Circular reference detected in '{}(name={})' "
-                            "element. Resolution stack was:\n"
-                            .format(unloaded.name,
-                                    "\n".join('{}(name={})'.format(u.tag,
-                                                                   u.name)
-                                              for u in self._loading)))
+                            "element. Resolution stack was:\n{}"
+                            .format(unloaded.cls.element_name, unloaded.name,
+                                    "\n".join('{}(name={})'.format(
+                                        u.cls.element_name, u.name)
+                                        for u in self._loading)))
         self._loading.append(unloaded)
-        elem = unloaded.cls.from_xml(unloaded.xml, self)
-        assert self._loading[-1] is unloaded
-        self._loading.pop()
+        xml = unloaded.xml
+        if isinstance(xml, _XMLSlice):
+            xml = xml.parse()
+        try:
+            elem = unloaded.cls.from_xml(xml, self)
+        finally:
+            # Documents are shared via the document cache so the loading
+            # stack needs to be left clean even if the element is invalid
+            assert self._loading[-1] is unloaded
+            self._loading.pop()
         self[unloaded.name] = elem
         return elem
 
+    def references(self, name):
+        """
+        Returns the names of the elements in the document that the element
+        of the given name refers to. For elements that are yet to be loaded
+        these are extracted from the raw XML (Reference, Definition and
+        Prototype elements and 'dimension' and 'units' attributes) without
+        instantiating any objects. Loaded elements have no unloaded
+        references, as loading an element loads everything it refers to, so
+        an empty set is returned for them.
+        """
+        elem = super(Document, self).__getitem__(name)
+        if not isinstance(elem, self._Unloaded):
+            return set()
+        if isinstance(elem.xml, _XMLSlice):
+            refs = elem.xml.references
+        else:
+            refs = set()
+            for child in elem.xml.iter(tag=etree.Element):
+                if (child.tag in _REFERENCE_TAGS and child.text and
+                        'url' not in child.attrib):
+                    refs.add(child.text.strip())
+                refs.update(child.attrib[a] for a in _REFERENCE_ATTRIBUTES
+                            if a in child.attrib)
+        # Names that are not in the document will fail when the element is
+        # loaded, so just skip them here
+        return set(r for r in refs if r in self and r != name)
+
+    def closure(self, names):
+        """
+        Returns the names of the given elements and all the elements they
+        transitively refer to within the document, without loading them
+        """
+        closure = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in closure:
+                continue
+            if name not in self:
+                # Raise the standard KeyError
+                self[name]
+            closure.add(name)
+            stack.extend(self.references(name) - closure)
+        return closure
+
+    def load_closure(self, names):
+        """
+        Loads the given elements and the elements they transitively refer to,
+        leaving the rest of the document unloaded, and returns the elements
+        for the given names
+        """
+        for name in self.closure(names):
+            self[name]
+        return [self[n] for n in names]
+
+    def load_all(self, workers=None):
+        """
+        Loads all elements of the document that are yet to be loaded.
+
+        Elements are loaded in topological order of their references. At each
+        step the component classes whose references have been loaded (which
+        are the expensive elements to parse and validate) are built in
+        parallel in a pool of `workers` processes (defaults to the number of
+        CPUs) and merged back into the document, with their references
+        resolved to the objects already in this process. Other elements, and
+        any component class that cannot be built in a worker, are loaded in
+        the current process. If `workers` is 1 or less everything is loaded
+        in the current process.
+        """
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        pending = set(n for n, v in super(Document, self).iteritems()
+                      if isinstance(v, self._Unloaded))
+        if workers <= 1 or not pending:
+            self.values()
+            return
+        references = dict((n, self.references(n)) for n in pending)
+        pool = None
+        try:
+            while pending:
+                ready = [n for n in pending if not references[n] & pending]
+                if not ready:
+                    # Circular references, which will raise an error when
+                    # loaded
+                    self.values()
+                    break
+                parallel = []
+                for name in ready:
+                    if issubclass(self._element_type(super(
+                            Document, self).__getitem__(name)),
+                            nineml.abstraction_layer.ComponentClass):
+                        parallel.append(name)
+                    else:
+                        self[name]
+                # Skip elements already loaded as references of the others
+                parallel = [n for n in parallel if isinstance(
+                    super(Document, self).__getitem__(n), self._Unloaded)]
+                if parallel:
+                    if pool is None:
+                        pool = multiprocessing.Pool(workers)
+                    results = pool.map(
+                        _load_in_subprocess,
+                        [self._subprocess_args(n) for n in parallel])
+                    for name, result in zip(parallel, results):
+                        if result is not None:
+                            self[name] = _loads(result, self._resolve_id)
+                        else:
+                            self[name]  # Load here to raise the error
+                pending.difference_update(ready)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+    def _subprocess_args(self, name):
+        """
+        Returns the arguments for loading an element in a subprocess, the
+        elements it refers to (which have been loaded) are passed pickled
+        """
+        unloaded = super(Document, self).__getitem__(name)
+        xml = unloaded.xml
+        if isinstance(xml, _XMLSlice):
+            xml = xml.parse()
+        dependencies = dict((n, self[n])
+                            for n in self.closure([name]) - set([name]))
+        return (self.url, name, unloaded.cls,
+                etree.tostring(xml, with_tail=False),
+                _dumps(dependencies, _loaded_ids(exclude=self)))
+
+    def _resolve_id(self, pid):
+        url, name = pid
+        return self[name] if url is None else read(url)[name]
+
     def standardize_units(self):
         """
         Standardized the units into a single set (no duplicates). Used to avoid
         naming conflicts when writing to file.
+
+        Only the loaded elements are standardized, the units and dimensions
+        referred to (by name) from elements that haven't been loaded are left
+        in the document as they are.
         """
-        # Get the set of all units and dimensions that are used in the document
-        # Note that Dimension & Unit objects are equal even if they have
-        # different names so when this set is traversed the dimension/unit will
-        # be substituted for the first equivalent dimension/unit.
-        all_units = set(chain(*[o.all_units for o in self.itervalues()]))
-        all_dimensions = set(chain(
-            [u.dimension for u in all_units],
-            *[o.all_dimensions for o in self.itervalues()]))
+        # Units and dimensions are cheap to load and are needed to check for
+        # conflicts with the units and dimensions of the loaded objects
+        unit_names = (self.names_of_type(nineml.abstraction_layer.Unit) |
+                      self.names_of_type(nineml.abstraction_layer.Dimension))
+        for name in unit_names:
+            self[name]
+        loaded = self._loaded_values()
+        referenced = [self[n] for n in unit_names.intersection(chain(*(
+            self.references(k) for k, o in super(Document, self).iteritems()
+            if isinstance(o, self._Unloaded))))]
+        # Get the set of all units and dimensions that are used in the
+        # document. Note that Dimension & Unit objects are equivalent even if
+        # they have different names so each is substituted for the first
+        # equivalent dimension/unit, taking those in the document first.
+        used = UnitRegistry()
+        for unit in chain(
+                [o for o in referenced
+                 if isinstance(o, nineml.abstraction_layer.Unit)],
+                *[o.all_units for o in loaded]):
+            used.add(self._unit_registry.canonical(unit) or unit)
+        for dimension in chain(
+                [u.dimension for u in used.units],
+                [o for o in referenced
+                 if isinstance(o, nineml.abstraction_layer.Dimension)],
+                *[o.all_dimensions for o in loaded]):
+            used.add(self._unit_registry.canonical(dimension) or dimension)
         # Delete unused units from the document
-        for k, o in self.items():
-            if ((isinstance(o, nineml.abstraction_layer.Unit) and
-                 o not in all_units) or
-                (isinstance(o, nineml.abstraction_layer.Dimension) and
-                 o not in all_dimensions)):
+        for k, o in super(Document, self).items():
+            if (isinstance(o, (nineml.abstraction_layer.Unit,
+                               nineml.abstraction_layer.Dimension)) and
+                    used.canonical(o) is None):
                 del self[k]
         # Add missing units and dimensions to the document
-        for unit in all_units:
-            if unit.name in self:
-                if unit != self[unit.name]:
-                    raise NineMLRuntimeError(
-                        "Name of unit '{}' conflicts with existing object of "
-                        "differring value or type '{}' and '{}'"
-                        .format(unit.name, unit, self[unit.name]))
-            self[unit.name] = unit
-        for dimension in all_dimensions:
-            if dimension.name in self:
-                if dimension != self[dimension.name]:
-                    raise NineMLRuntimeError(
-                        "Name of dimension '{}' conflicts with existing object"
-                        " of differring value or type '{}' and '{}'"
-                        .format(dimension.name, dimension, self[unit.name]))
-            self[dimension.name] = dimension
+        for unit in list(used.units):
+            std_unit = unit.with_dimension(used.canonical(unit.dimension))
+            if std_unit is not unit:
+                used.remove(unit)
+                used.add(std_unit)
+            self._add_standardized(std_unit, 'unit')
+        for dimension in used.dimensions:
+            self._add_standardized(dimension, 'dimension')
         # Replace units and dimensions with those in the superset
-        for obj in self.itervalues():
+        for obj in self._loaded_values():
             for a in obj.attributes_with_dimension:
-                try:
-                    std_dim = next(d for d in all_dimensions
-                                   if d == a.dimension)
-                except StopIteration:
-                    assert False, \
-                        ("Did not find matching dimension in supposed superset"
-                         " of dimensions")
+                std_dim = used.canonical(a.dimension)
+                assert std_dim is not None, \
+                    ("Did not find matching dimension in supposed superset"
+                     " of dimensions")
                 a.set_dimension(std_dim)
             for a in obj.attributes_with_units:
-                try:
-                    std_units = next(u for u in all_units
-                                     if u == a.units)
-                except StopIteration:
-                    assert False, \
-                        ("Did not find matching unit in supposed superset"
-                         " of units")
+                std_units = used.canonical(a.units)
+                assert std_units is not None, \
+                    ("Did not find matching unit in supposed superset"
+                     " of units")
                 a.set_units(std_units)
 
+    def _add_standardized(self, obj, type_name):
+        existing = super(Document, self).get(obj.name)
+        if existing is obj:
+            return
+        if existing is not None and self[obj.name] != obj:
+            raise NineMLRuntimeError(
+                "Name of {} '{}' conflicts with existing object of "
+                "differring value or type '{}' and '{}'"
+                .format(type_name, obj.name, obj, self[obj.name]))
+        self[obj.name] = obj
+
+    def _loaded_values(self):
+        return [o for o in super(Document, self).itervalues()
+                if not isinstance(o, self._Unloaded)]
+
+    def _iter_xml(self, copy_unloaded=True):
+        """
+        Iterates over the XML of the elements of the document. Elements that
+        haven't been loaded are passed through from the XML they were read
+        from (copied unless `copy_unloaded` is False) and only the loaded
+        elements are serialized.
+        """
+        for elem in super(Document, self).itervalues():
+            if isinstance(elem, self._Unloaded):
+                if isinstance(elem.xml, _XMLSlice):
+                    yield elem.xml.parse()
+                elif copy_unloaded:
+                    yield deepcopy(elem.xml)
+                else:
+                    yield elem.xml
+            elif isinstance(elem, nineml.user_layer.BaseULObject):
+                yield elem.to_xml(as_reference=False)
+            else:
+                yield elem.to_xml()
+
     def to_xml(self):
         self.standardize_units()
-        return E(
-            self.element_name,
-            *[c.to_xml(as_reference=False)
-              if isinstance(c, nineml.user_layer.BaseULObject) else c.to_xml()
-              for c in self.itervalues()])
-
-    def write(self, filename):
-        doc = self.to_xml()
-        with open(filename, 'w') as f:
-            etree.ElementTree(doc).write(f, encoding="UTF-8",
-                                         pretty_print=True,
-                                         xml_declaration=True)
+        return E(self.element_name, *self._iter_xml())
+
+    def write(self, filename, spill_threshold=None, spill_mimetype=None):
+        """
+        Writes the document to file, writing the elements one at a time so
+        that the full XML tree is never held in memory. Elements that haven't
+        been loaded are written from the XML they were read from.
+
+        If `spill_threshold` is provided, the ArrayValues of loaded elements
+        with at least that many values are written to sidecar files next to
+        the document (in the format of `spill_mimetype`, '.npy' by default)
+        and referred to by ExternalArrayValues instead of being written into
+        the XML.
+        """
+        self.standardize_units()
+        if spill_threshold is not None:
+            directory, basename = os.path.split(os.path.abspath(filename))
+            values = nineml.user_layer.values
+            spiller = values.spill_arrays(
+                directory, os.path.splitext(basename)[0] + '_array',
+                spill_threshold, spill_mimetype or values.NPY_MIMETYPE)
+        else:
+            spiller = _no_spill()
+        with spiller, etree.xmlfile(filename, encoding='UTF-8') as xf:
+            xf.write_declaration()
+            nsmap = {None: nineml_namespace}
+            with xf.element(NINEML + self.element_name, nsmap=nsmap):
+                for elem_xml in self._iter_xml(copy_unloaded=False):
+                    _write_element(xf, elem_xml, 1, nsmap)
+                xf.write('\n')
 
     @classmethod
     def from_xml(cls, element, url=None):
         if element.tag != NINEML + cls.element_name:
             raise Exception("Not a NineML root ('{}')".format(element.tag))
+        # Units use 'symbol' as their unique identifier (from LEMS) all
+        # other elements use 'name'
+        return cls._from_children(
+            ((child.tag, child.attrib.get('name', child.attrib.get('symbol')),
+              child) for child in element.getchildren()), url)
+
+    @classmethod
+    def from_file(cls, filename, url=None):
+        """
+        Loads a document from a local file without building its element tree.
+        The file is scanned once to index the byte range of each top-level
+        element, which is then only re-read and parsed when the element is
+        accessed, so the memory used scales with the elements that are
+        actually loaded rather than with the size of the file.
+        """
+        index = _FileIndex(filename)
+        if index.root_tag != NINEML + cls.element_name:
+            raise Exception("Not a NineML root ('{}')".format(index.root_tag))
+        return cls._from_children(
+            ((child[0], child[1], _XMLSlice(index, *child[2:]))
+             for child in index.children), url)
+
+    @classmethod
+    def _from_children(cls, children, url):
+        """
+        Creates a document from (tag, name, xml) tuples of its child elements,
+        where xml is either an lxml element or an _XMLSlice to be parsed when
+        the element is loaded
+        """
         # Initialise the document
         elements = {'_url': url}
         # Loop through child elements, determine the class needed to extract
         # them and add them to the dictionary
         annotations = None
-        for child in element.getchildren():
-            if child.tag.startswith(NINEML):
-                element_name = child.tag[len(NINEML):]
+        for tag, name, xml in children:
+            if tag.startswith(NINEML):
+                element_name = tag[len(NINEML):]
                 if element_name == Annotations.element_name:
                     assert annotations is None, \
                         "Multiple annotations tags found"
-                    annotations = Annotations.from_xml(child)
+                    if isinstance(xml, _XMLSlice):
+                        xml = xml.parse()
+                    annotations = Annotations.from_xml(xml)
                     continue
                 try:
                     child_cls = getattr(nineml.user_layer, element_name)
@@ -250,21 +570,223 @@ class Document(dict, BaseNineMLObject):
             else:
                 raise NotImplementedError(
                     "Cannot load '{}' element (extensions not implemented)"
-                    .format(child.tag))
-            # Units use 'symbol' as their unique identifier (from LEMS) all
-            # other elements use 'name'
-            name = child.attrib.get('name', child.attrib.get('symbol'))
+                    .format(tag))
             if name in elements:
                 raise NineMLRuntimeError(
                     "Duplicate identifier '{ob1}:{name}'in NineML file '{url}'"
                     .format(name=name, ob1=elements[name].cls.element_name,
                             ob2=child_cls.element_name, url=url or ''))
-            elements[name] = cls._Unloaded(name, child, child_cls)
+            elements[name] = cls._Unloaded(name, xml, child_cls)
         document = cls(**elements)
         document.annotations = annotations
         return document
 
 
+# Elements whose text is the name of the element they refer to (unless they
+# have a 'url' attribute, in which case it is in another document) and
+# attributes that hold the names of units or dimensions
+_REFERENCE_TAGS = tuple(NINEML + t
+                        for t in ('Reference', 'Definition', 'Prototype'))
+_REFERENCE_ATTRIBUTES = ('dimension', 'units')
+
+
+def _class_types():
+    return (nineml.abstraction_layer.componentclass.utils.
+            ComponentClassXMLLoader.class_types)
+
+
+class _FileIndex(object):
+    """
+    Scans a NineML file with expat, recording the tag, name and byte range of
+    each top-level element without keeping any of the parsed XML, and parses
+    the byte ranges back into lxml elements on request.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.encoding = 'UTF-8'
+        self.namespaces = {}
+        self.root_tag = None
+        # [tag, name, start, end, references, class_type] of the top-level
+        # elements
+        self.children = []
+        self._depth = 0
+        self._reference_text = None
+        self._parser = expat.ParserCreate(namespace_separator=' ')
+        self._parser.XmlDeclHandler = self._xml_decl
+        self._parser.StartNamespaceDeclHandler = self._namespace_decl
+        self._parser.StartElementHandler = self._start_element
+        self._parser.EndElementHandler = self._end_element
+        self._parser.CharacterDataHandler = self._character_data
+        try:
+            with open(filename, 'rb') as f:
+                self._parser.ParseFile(f)
+        except (IOError, expat.ExpatError), e:
+            raise Exception("Could not parse XML file '{}' ({})"
+                            .format(filename, e))
+        finally:
+            del self._parser
+
+    def parse(self, start, end):
+        """
+        Parses the element stored between the given byte offsets
+        """
+        with open(self.filename, 'rb') as f:
+            f.seek(start)
+            text = f.read(end - start).decode(self.encoding)
+        # Wrap the element in the namespace declarations of the root element
+        # it was taken from
+        xmlns = u''.join(u' xmlns{}={}'.format(u':' + p if p else u'',
+                                               quoteattr(uri))
+                         for p, uri in self.namespaces.iteritems())
+        wrapper = etree.fromstring(u'<Fragment{}>{}</Fragment>'
+                                   .format(xmlns, text))
+        return next(c for c in wrapper if isinstance(c.tag, basestring))
+
+    def _xml_decl(self, version, encoding, standalone):  # @UnusedVariable
+        if encoding:
+            self.encoding = encoding
+
+    def _namespace_decl(self, prefix, uri):
+        # Only the declarations on the root element are needed as the others
+        # are contained within the byte ranges of the elements
+        if self._depth == 0:
+            self.namespaces[prefix] = uri
+
+    def _start_element(self, name, attrs):
+        if self._depth == 0:
+            self.root_tag = self._clark_notation(name)
+        else:
+            if self._depth == 1:
+                start = self._parser.CurrentByteIndex
+                self._close_previous(start)
+                name_attr = attrs.get('name', attrs.get('symbol'))
+                self.children.append(
+                    [self._clark_notation(name),
+                     self._native_str(name_attr) if name_attr else name_attr,
+                     start, None, set(), None])
+            else:
+                tag = self._clark_notation(name)
+                if tag in _REFERENCE_TAGS and 'url' not in attrs:
+                    self._reference_text = []
+                elif (self._depth == 2 and self.children[-1][5] is None and
+                      self.children[-1][0] == NINEML + 'ComponentClass' and
+                      tag[len(NINEML):] in _class_types()):
+                    # Record the type of component class (e.g. Dynamics) so
+                    # documents can be indexed by type without loading them
+                    self.children[-1][5] = tag[len(NINEML):]
+            self.children[-1][4].update(
+                self._native_str(attrs[a]) for a in _REFERENCE_ATTRIBUTES
+                if a in attrs)
+        self._depth += 1
+
+    def _end_element(self, name):  # @UnusedVariable
+        self._depth -= 1
+        if self._depth == 0:
+            self._close_previous(self._parser.CurrentByteIndex)
+        elif self._reference_text is not None:
+            self.children[-1][4].add(
+                self._native_str(u''.join(self._reference_text).strip()))
+            self._reference_text = None
+
+    def _character_data(self, data):
+        if self._reference_text is not None:
+            self._reference_text.append(data)
+
+    def _close_previous(self, offset):
+        # Each element is taken to extend to the start of the next element
+        # (or the root end tag), which also covers empty-element tags
+        if self.children and self.children[-1][3] is None:
+            self.children[-1][3] = offset
+
+    @classmethod
+    def _clark_notation(cls, name):
+        # expat separates the namespace from the local name with a space
+        try:
+            namespace, local_name = name.split(' ')
+        except ValueError:
+            return cls._native_str(name)
+        return cls._native_str('{' + namespace + '}' + local_name)
+
+    @classmethod
+    def _native_str(cls, s):
+        # Match lxml, which returns str objects for ASCII strings
+        try:
+            return str(s)
+        except UnicodeEncodeError:
+            return s
+
+
+class _XMLSlice(collections.namedtuple(
+        '_XMLSlice', 'index start end references class_type')):
+    """
+    The byte range of a top-level element in a file indexed by a _FileIndex
+    along with the names of the elements it references and, for component
+    classes, the tag of its type (e.g. 'Dynamics')
+    """
+
+    def parse(self):
+        return self.index.parse(self.start, self.end)
+
+
+def _unpickle_document(cls, elements):
+    return cls(**elements)
+
+
+def _loaded_ids(document=None, exclude=None):
+    """
+    Maps the ids of the loaded elements of the cached documents (and the given
+    document) to (url, name) tuples, with url None for the given document, so
+    they can be pickled by reference
+    """
+    ids = {}
+    for url, doc in document_cache.iteritems():
+        if doc is not exclude and doc is not document:
+            ids.update((id(v), (url, k))
+                       for k, v in dict.iteritems(doc)
+                       if not isinstance(v, Document._Unloaded))
+    if document is not None:
+        ids.update((id(v), (None, k)) for k, v in dict.iteritems(document)
+                   if not isinstance(v, Document._Unloaded))
+    return ids
+
+
+def _dumps(obj, ids):
+    f = StringIO()
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    pickler.persistent_id = lambda o: ids.get(id(o))
+    pickler.dump(obj)
+    return f.getvalue()
+
+
+def _loads(string, resolve_id):
+    unpickler = pickle.Unpickler(StringIO(string))
+    unpickler.persistent_load = resolve_id
+    return unpickler.load()
+
+
+def _load_in_subprocess(args):
+    """
+    Loads an element in a worker process of Document.load_all and returns it
+    pickled with references to the elements it depends on, or None if it
+    couldn't be loaded (in which case it is loaded again in the parent process
+    to raise the error)
+    """
+    url, name, cls, xml, dependencies = args
+    try:
+        document = Document(_url=url)
+        for dep_name, dep in _loads(dependencies,
+                                    document._resolve_id).iteritems():
+            document[dep_name] = dep
+        document[name] = Document._Unloaded(name, etree.fromstring(xml), cls)
+        elem = document[name]
+        ids = _loaded_ids(document)
+        del ids[id(elem)]
+        return _dumps(elem, ids)
+    except Exception:
+        return None
+
+
 def load(root_element, read_from=None):
     """
     Loads the lib9ml object model from a root lxml.etree.Element
@@ -276,41 +798,388 @@ def load(root_element, read_from=None):
     return Document.from_xml(root_element, url=read_from)
 
 
-def read(url, relative_to=None):
+class DocumentCache(object):
+    """
+    A process-wide cache of the documents read from URLs so that a file
+    referred to by many Definition, Prototype or Reference elements is only
+    opened and parsed once.
+
+    The cached documents are shared by all the reads of their URLs (so that
+    references resolve to the same objects) and aren't copied, so changes
+    made to a document read from a URL are seen by the subsequent reads of
+    it.
+
+    Documents are keyed by their absolute URL and the least recently used
+    documents are dropped once ``max_size`` documents are held. Local files
+    are also keyed by their modification time so that an edited file is
+    re-read on its next access. Remote documents are held until they are
+    evicted or explicitly invalidated.
+    """
+
+    def __init__(self, max_size=64):
+        self._documents = LRUCache(max_size)
+
+    def __len__(self):
+        return len(self._documents)
+
+    @property
+    def max_size(self):
+        return self._documents.max_size
+
+    @max_size.setter
+    def max_size(self, max_size):
+        self._documents.resize(max_size)
+
+    @property
+    def hits(self):
+        return self._documents.hits
+
+    @property
+    def misses(self):
+        return self._documents.misses
+
+    @classmethod
+    def key(cls, url):
+        """
+        Returns the key the document at the given URL is stored under, which
+        is the absolute path for local files and the URL otherwise
+        """
+        path = cls.local_path(url)
+        return os.path.abspath(path) if path is not None else url
+
+    @classmethod
+    def local_path(cls, url):
+        """
+        Returns the local path of the file the URL points to or None if it
+        refers to a remote document
+        """
+        parsed = urlparse(url)
+        if parsed.scheme == 'file':
+            return parsed.path
+        elif not parsed.scheme or len(parsed.scheme) == 1:  # Windows drives
+            return url
+        return None
+
+    @classmethod
+    def _mtime(cls, url):
+        path = cls.local_path(url)
+        if path is None:
+            return None
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def get(self, url):
+        """
+        Returns the cached document read from the given URL or None if it
+        has not been read (or has been modified since it was read)
+        """
+        key = self.key(url)
+        entry = self._documents.get(key)
+        if entry is None:
+            return None
+        mtime, document = entry
+        if mtime != self._mtime(url):
+            self._documents.remove(key)
+            return None
+        return document
+
+    def iteritems(self):
+        """
+        Iterates over the (key, document) pairs of the cached documents
+        """
+        for key, (_, document) in self._documents.items():
+            yield key, document
+
+    def add(self, url, document):
+        self._documents.add(self.key(url), (self._mtime(url), document))
+
+    def invalidate(self, url=None):
+        """
+        Drops the document read from the given URL from the cache, or all
+        documents if no URL is provided
+        """
+        if url is None:
+            self._documents.clear()
+        else:
+            self._documents.remove(self.key(url))
+
+
+# The cache shared by all calls to `read`, including those made when
+# resolving Definition, Prototype and Reference elements
+document_cache = DocumentCache()
+
+
+def read(url, relative_to=None, stream=False, use_cache=False,
+         prefetch=False):
     """
     Read a NineML file and parse its child elements
 
     If the URL does not have a scheme identifier, it is taken to refer to a
-    local file.
+    local file. Documents read from URLs are stored in the `document_cache`
+    and subsequent reads of the same URL return the cached document. The
+    cached document is shared, i.e. changes made to it (or to its elements)
+    are seen by subsequent reads of the URL and by the references resolved
+    to it. To change a document without affecting them, change a copy of it
+    (`copy.deepcopy(document)`), or drop it from the cache with
+    `document_cache.invalidate(url)` before reading it again.
+
+    If `stream` is True and the URL refers to a local file, the file is only
+    indexed and each top-level element is parsed from it when it is first
+    accessed (see `Document.from_file`). Remote files are always read in full.
+
+    If `use_cache` is True and the URL refers to a local file, the document is
+    loaded from its compiled sidecar file (see `compiled_path`) if the
+    sidecar was written from a file with the same contents. Otherwise the
+    document is read from the XML, all of its elements are loaded and the
+    compiled sidecar is (re)written for subsequent reads. As the sidecars are
+    pickles, they are only read from `Settings.compiled_cache_dir`, which
+    must be owned by the current user and not writable by anyone else, and
+    only if they are signed with the key stored in it (i.e. were written by
+    the library for the same user).
+
+    If `prefetch` is True, the remote documents the document refers to (and
+    the documents they refer to in turn) are first fetched concurrently (see
+    `nineml.prefetch.prefetch`) and loaded into the `document_cache`, where
+    they are found when the references are resolved. `prefetch` can also be
+    a dictionary of keyword arguments for `nineml.prefetch.prefetch`, e.g.
+    the `cache_dir`.
     """
+    if isinstance(url, file):
+        try:
+            xml = etree.parse(url)
+        except:  # FIXME: Need to work out what exceptions etree raises
+            raise Exception("Could not parse XML file '{}'".format(url))
+        return load(xml.getroot(), url)
     if url.startswith('.') and relative_to:
-        url = os.path.abspath(os.path.join(relative_to, url))
-    try:
-        if not isinstance(url, file):
+        url = nineml.prefetch.resolve_relative(url, relative_to)
+    document = document_cache.get(url)
+    if document is not None:
+        return document
+    prefetched = {}
+    if prefetch:
+        prefetched = nineml.prefetch.prefetch(
+            url, **(prefetch if isinstance(prefetch, dict) else {}))
+        for doc_url, content in prefetched.iteritems():
+            if doc_url != url and document_cache.get(doc_url) is None:
+                try:
+                    doc = load(etree.fromstring(content), doc_url)
+                except Exception:
+                    continue  # The error is raised if the document is read
+                document_cache.add(doc_url, doc)
+    path = DocumentCache.local_path(url)
+    use_cache = use_cache and path is not None
+    if use_cache:
+        digest = _file_digest(path)
+        document = _read_compiled(path, digest)
+        if document is not None:
+            document.url = url
+            document_cache.add(url, document)
+            return document
+    if stream and path is not None:
+        document = Document.from_file(path, url=url)
+    else:
+        content = prefetched.get(url)
+        try:
             try:
-                f = urlopen(url)
+                f = (StringIO(content) if content is not None
+                     else urlopen(url))
                 xml = etree.parse(f)
             except:  # FIXME: Need to work out what exceptions urlopen raises
                 raise Exception("Could not read URL '{}'".format(url))
             finally:
                 f.close()
-        else:
-            xml = etree.parse(url)
-    except:  # FIXME: Need to work out what exceptions etree raises
-        raise Exception("Could not parse XML file '{}'".format(url))
-    root = xml.getroot()
-    return load(root, url)
+        except:  # FIXME: Need to work out what exceptions etree raises
+            raise Exception("Could not parse XML file '{}'".format(url))
+        root = xml.getroot()
+        document = load(root, url)
+    document_cache.add(url, document)
+    if use_cache:
+        _write_compiled(path, digest, document)
+    return document
+
+
+# Compiled documents are pickles of the loaded object model, which change with
+# the classes of the library, so the format version needs to be incremented
+# whenever the attributes of pickled classes change. Unpickling can execute
+# arbitrary code, so the sidecars are signed with an HMAC keyed by a secret
+# stored in the cache directory and are rejected unless the signature matches
+COMPILED_FORMAT_VERSION = 3
+COMPILED_EXTENSION = '.9mlc'
+_COMPILED_MAGIC = '9MLC'
+_COMPILED_KEY_FILE = 'key'
+
 
+def compiled_path(path):
+    """
+    Returns the path of the compiled sidecar file for a NineML file, which is
+    in `Settings.compiled_cache_dir` and named by the hash of its absolute
+    path
+    """
+    return os.path.join(
+        Settings.compiled_cache_dir,
+        hashlib.sha1(os.path.abspath(path)).hexdigest() + COMPILED_EXTENSION)
 
-def write(document, filename):
+
+def _compiled_key(create=False):
+    """
+    Returns the key the compiled sidecars are signed with, or None if the
+    cache directory doesn't exist (and `create` is False) or could have been
+    written to by another user
+    """
+    cache_dir = Settings.compiled_cache_dir
+    try:
+        if create and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir, 0700)
+        st = os.stat(cache_dir)
+        if st.st_uid != os.getuid() or st.st_mode & 022:
+            return None
+        key_path = os.path.join(cache_dir, _COMPILED_KEY_FILE)
+        if create and not os.path.exists(key_path):
+            fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(os.urandom(32))
+        st = os.stat(key_path)
+        if st.st_uid != os.getuid() or st.st_mode & 077:
+            return None
+        with open(key_path, 'rb') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def _signature(key, header, payload):
+    return hmac.new(key, header + payload, hashlib.sha256).hexdigest() + '\n'
+
+
+def _file_digest(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), ''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def _compiled_header(digest):
+    return '{} {} {} {}\n'.format(_COMPILED_MAGIC, COMPILED_FORMAT_VERSION,
+                                  nineml.__version__, digest)
+
+
+def _read_compiled(path, digest):
+    """
+    Loads the document from the compiled sidecar of the given file or returns
+    None if there isn't one or it wasn't written from the current contents
+    of the file (or with the current format)
+    """
+    key = _compiled_key()
+    if key is None:
+        return None
+    try:
+        with open(compiled_path(path), 'rb') as f:
+            header = f.readline()
+            if header != _compiled_header(digest):
+                return None
+            signature = f.readline()
+            payload = f.read()
+        # The payload is only unpickled if it was signed with the key
+        if not hmac.compare_digest(signature,
+                                   _signature(key, header, payload)):
+            return None
+        # Elements of other documents are stored by reference and loaded
+        # via their own compiled files
+        return _loads(payload, lambda pid: read(pid[0],
+                                                use_cache=True)[pid[1]])
+    except IOError:
+        return None
+    except Exception:  # A corrupt or incompatible file is just regenerated
+        return None
+
+
+def _write_compiled(path, digest, document):
+    """
+    Loads all elements of the document and writes them to the compiled
+    sidecar of the given file. If any element fails to load, or the sidecar
+    can't be written, no sidecar is written and the errors are left to be
+    raised when the elements are accessed.
+    """
+    key = _compiled_key(create=True)
+    if key is None:
+        return
+    try:
+        document.values()
+    except Exception:
+        return
+    sidecar = compiled_path(path)
+    try:
+        tmp = tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(os.path.abspath(sidecar)),
+            prefix=os.path.basename(sidecar), delete=False)
+    except (IOError, OSError):  # e.g. read-only directory
+        return
+    try:
+        header = _compiled_header(digest)
+        payload = _dumps(document, _loaded_ids(exclude=document))
+        with tmp:
+            tmp.write(header)
+            tmp.write(_signature(key, header, payload))
+            tmp.write(payload)
+        # Rename so that concurrent readers never see a partial file
+        os.rename(tmp.name, sidecar)
+    except (IOError, OSError, pickle.PicklingError, TypeError):
+        os.remove(tmp.name)
+
+
+def write(document, filename, **kwargs):
     """
     Provided for symmetry with read method, takes a nineml.document.Document
-    object and writes it to the specified file
+    object and writes it to the specified file (see `Document.write` for the
+    keyword arguments)
     """
     # Encapsulate the NineML element in a document if it is not already
     if not isinstance(document, Document):
         document = Document(document)
-    document.write(filename)
+    document.write(filename, **kwargs)
+
+
+class _no_spill(object):
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+def _write_element(xf, elem, depth, declared):
+    """
+    Writes an element to an `etree.xmlfile`, indented to `depth`. The element
+    and its descendants are written within the elements that are open in the
+    file, so the namespaces `declared` on them (i.e. the NineML namespace on
+    the root) aren't declared again, which they would be if the element was
+    written as a whole with `xf.write`
+    """
+    xf.write('\n' + '  ' * depth)
+    if not isinstance(elem.tag, basestring):  # comments and PIs
+        xf.write(elem)
+        return
+    nsmap = dict((p, u) for p, u in elem.nsmap.iteritems()
+                 if u != nineml_namespace and declared.get(p) != u)
+    with xf.element(elem.tag, elem.attrib, nsmap=nsmap):
+        if nsmap:
+            declared = dict(declared)
+            declared.update(nsmap)
+        if elem.text and elem.text.strip():
+            xf.write(elem.text)
+        for child in elem:
+            _write_element(xf, child, depth + 1, declared)
+            if child.tail and child.tail.strip():
+                xf.write(child.tail)
+        if len(elem):
+            xf.write('\n' + '  ' * depth)
+
 
 import nineml.user_layer
 import nineml.abstraction_layer
+import nineml.prefetch
@@ -54,7 +54,8 @@ comp_data = TestableComponent('nestequivalent_iaf_cond_exp')
 
 # Build the component:
 component = comp_data()
-component = flatten( component )
+component = flatten( component,
+                     initial_regimes=comp_data.metadata.initial_regime )
 component.backsub_all()
 ComponentModifier.close_all_reduce_ports(component=component)
 
@@ -0,0 +1,281 @@
+"""
+Concurrent prefetching of the remote documents referred to by a NineML file
+
+The `url` attributes of the Definition, Prototype and Reference elements of a
+document (and of the documents they refer to) are scanned before any objects
+are built and the remote ones are fetched in parallel, so that a document
+referring to many remote catalog files does not pay for each round trip in
+turn when the references are resolved. The data files of ExternalArrayValue
+elements aren't prefetched as they are only read from local paths.
+
+:copyright: Copyright 2010-2013 by the Python lib9ML team, see AUTHORS.
+:license: BSD-3, see LICENSE for details.
+"""
+import os.path
+import json
+import hashlib
+import httplib
+import threading
+from Queue import Queue
+from urlparse import urlparse, urljoin
+from lxml import etree
+from nineml.xmlns import NINEML
+
+# Elements whose 'url' attribute refers to another NineML document
+_DOCUMENT_TAGS = tuple(NINEML + t
+                       for t in ('Definition', 'Prototype', 'Reference'))
+
+
+def is_remote(url):
+    return urlparse(url).scheme in ('http', 'https')
+
+
+def prefetch(url, max_connections=8, cache_dir=None, timeout=30):
+    """
+    Fetches the remote documents referred to from the document at the given
+    URL, and from the documents they refer to, using up to `max_connections`
+    concurrent connections. If `cache_dir` is provided, the contents are also
+    stored in an on-disk cache that is revalidated with the server (ETag or
+    Last-Modified) when prefetching again.
+
+    Returns a dictionary mapping the remote URLs that were fetched to their
+    contents (which `nineml.read` loads into the `document_cache`). URLs that
+    couldn't be fetched are skipped so the error is raised when they are read.
+    """
+    fetcher = Fetcher(max_connections=max_connections, cache_dir=cache_dir,
+                      timeout=timeout)
+    url = _absolute(url)
+    seen = set([url])
+    documents = [url]
+    fetched = {}
+    try:
+        while documents:
+            # Fetch the remote documents found in the previous pass in
+            # parallel
+            contents = fetcher.fetch_all([u for u in documents
+                                          if is_remote(u)])
+            fetched.update(contents)
+            next_documents = []
+            for doc_url in documents:
+                if is_remote(doc_url):
+                    content = contents.get(doc_url)
+                else:
+                    content = _read_local(doc_url)
+                if content is None:
+                    continue
+                for ref_url in _scan_urls(content, doc_url):
+                    if ref_url not in seen:
+                        seen.add(ref_url)
+                        next_documents.append(ref_url)
+            documents = next_documents
+    finally:
+        fetcher.close()
+    return fetched
+
+
+class Fetcher(object):
+    """
+    Fetches URLs concurrently in a pool of threads, each of which keeps a
+    persistent connection open to every host it has fetched from
+    """
+
+    max_redirects = 5
+
+    def __init__(self, max_connections=8, cache_dir=None, timeout=30):
+        self.max_connections = max_connections
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self._local = threading.local()
+        self._tasks = Queue()
+        self._workers = []
+
+    def fetch_all(self, urls):
+        """
+        Fetches the URLs concurrently and returns a dictionary mapping the
+        URLs that were fetched successfully to their contents
+        """
+        urls = set(urls)
+        results = Queue()
+        for url in urls:
+            self._tasks.put((url, results))
+        # The worker threads are kept between calls so that their connections
+        # can be reused
+        while len(self._workers) < min(self.max_connections, len(urls)):
+            worker = threading.Thread(target=self._work)
+            worker.daemon = True
+            worker.start()
+            self._workers.append(worker)
+        contents = {}
+        for _ in xrange(len(urls)):
+            url, content = results.get()
+            if content is not None:
+                contents[url] = content
+        return contents
+
+    def _work(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            url, results = task
+            try:
+                content = self.fetch(url)
+            except Exception:
+                content = None
+            results.put((url, content))
+        for conn in getattr(self._local, 'connections', {}).itervalues():
+            conn.close()
+
+    def fetch(self, url):
+        """
+        Fetches a single URL, returning None if it couldn't be fetched (and
+        isn't in the on-disk cache)
+        """
+        cached, meta = self._read_cache(url)
+        headers = {}
+        if cached is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last-modified'):
+                headers['If-Modified-Since'] = meta['last-modified']
+        location = url
+        try:
+            for _ in xrange(self.max_redirects + 1):
+                response = self._request(location, headers)
+                content = response.read()
+                if response.status in (301, 302, 303, 307):
+                    location = urljoin(location,
+                                       response.getheader('location'))
+                    continue
+                break
+            else:
+                return cached
+        except (httplib.HTTPException, IOError):
+            return cached  # Use the cached copy when offline
+        if response.status == 304:
+            return cached
+        if response.status != 200:
+            return None
+        self._write_cache(url, content, response)
+        return content
+
+    def close(self):
+        """
+        Stops the worker threads, closing their connections
+        """
+        for _ in self._workers:
+            self._tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _request(self, url, headers):
+        parsed = urlparse(url)
+        path = parsed.path or '/'
+        if parsed.query:
+            path += '?' + parsed.query
+        for attempt in (0, 1):
+            conn = self._connection(parsed.scheme, parsed.netloc,
+                                    reconnect=attempt > 0)
+            try:
+                conn.request('GET', path, headers=headers)
+                return conn.getresponse()
+            except (httplib.HTTPException, IOError):
+                # The server may have closed the persistent connection so try
+                # again once with a new one
+                conn.close()
+                if attempt:
+                    raise
+
+    def _connection(self, scheme, netloc, reconnect=False):
+        """
+        Returns the connection to the host for the current thread
+        """
+        try:
+            connections = self._local.connections
+        except AttributeError:
+            connections = self._local.connections = {}
+        key = (scheme, netloc)
+        if key not in connections or reconnect:
+            conn_cls = (httplib.HTTPSConnection if scheme == 'https'
+                        else httplib.HTTPConnection)
+            connections[key] = conn_cls(netloc, timeout=self.timeout)
+        return connections[key]
+
+    def _cache_path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url).hexdigest())
+
+    def _read_cache(self, url):
+        if self.cache_dir is None:
+            return None, {}
+        path = self._cache_path(url)
+        try:
+            with open(path + '.meta') as f:
+                meta = json.load(f)
+            with open(path, 'rb') as f:
+                return f.read(), meta
+        except (IOError, ValueError):
+            return None, {}
+
+    def _write_cache(self, url, content, response):
+        if self.cache_dir is None:
+            return
+        path = self._cache_path(url)
+        meta = {'url': url, 'etag': response.getheader('etag'),
+                'last-modified': response.getheader('last-modified')}
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(path, 'wb') as f:
+                f.write(content)
+            with open(path + '.meta', 'w') as f:
+                json.dump(meta, f)
+        except (IOError, OSError):
+            pass  # The cache is only an optimisation
+
+
+def _absolute(url):
+    parsed = urlparse(url)
+    if parsed.scheme and len(parsed.scheme) > 1:
+        return url
+    return os.path.abspath(url)
+
+
+def _read_local(url):
+    parsed = urlparse(url)
+    path = parsed.path if parsed.scheme == 'file' else url
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except IOError:
+        return None
+
+
+def _scan_urls(content, doc_url):
+    """
+    Yields the absolute URLs of the documents referred to from the document
+    """
+    try:
+        root = etree.fromstring(content)
+    except etree.XMLSyntaxError:
+        return
+    for elem in root.iter(*_DOCUMENT_TAGS):
+        url = elem.get('url')
+        if not url:
+            continue
+        # Relative URLs are resolved in the same way as in `nineml.read`
+        if url.startswith('.'):
+            url = resolve_relative(url, os.path.dirname(doc_url))
+        else:
+            url = _absolute(url)
+        yield url
+
+
+def resolve_relative(url, relative_to):
+    """
+    Resolves a URL starting with '.' relative to the directory (or remote
+    "directory") `relative_to`
+    """
+    if is_remote(relative_to):
+        return urljoin(relative_to.rstrip('/') + '/', url)
+    return os.path.abspath(os.path.join(relative_to, url))
@@ -357,7 +357,7 @@ class Quantity(BaseULObject):
         self.units = units
 
     def __hash__(self):
-        return hash(self.value) ^ hash(self.units)
+        return hash(self._value) ^ hash(self.units)
 
     def is_single(self):
         return isinstance(self._value, SingleValue)
@@ -384,8 +384,13 @@ class Quantity(BaseULObject):
 
     @property
     def value_array(self):
+        """
+        A read-only numpy array of the values of an array quantity, which is a
+        view of the stored values rather than a copy (memory-mapped from the
+        file for external arrays in binary formats)
+        """
         if self.is_array():
-            raise NotImplementedError
+            return self._value.values
         else:
             raise NineMLRuntimeError("Cannot access value array for "
                                      "componentclass or single value types")
@@ -410,14 +415,16 @@ class Quantity(BaseULObject):
         if u"µ" in units:
             units = units.replace(u"µ", "u")
         return ("{}(value={}, units={})"
-                .format(self.element_name, self.value, units))
+                .format(self.element_name,
+                        self.value if self.is_single() else self._value,
+                        units))
 
     def __eq__(self, other):
         # FIXME: obviously we should resolve the units, so 0.001 V == 1 mV,
         #        could use python-quantities package to do this if we are
         #        okay with the dependency
         return isinstance(other, self.__class__) and \
-            reduce(and_, (self.value == other.value,
+            reduce(and_, (self._value == other._value,
                           self.units == other.units))
 
     @annotate_xml
@@ -438,8 +445,8 @@ class Quantity(BaseULObject):
                 expect_single(element.findall(NINEML + 'ArrayValue')),
                 document)
         elif element.find(NINEML + 'ExternalArrayValue') is not None:
-            value = ArrayValue.from_xml(
-                expect_single(element.findall(NINEML + 'ArrayValue')),
+            value = ExternalArrayValue.from_xml(
+                expect_single(element.findall(NINEML + 'ExternalArrayValue')),
                 document)
         elif element.find(NINEML + 'ComponentValue') is not None:
             value = ArrayValue.from_xml(
@@ -486,7 +493,9 @@ class Property(Quantity):
         if u"µ" in units:
             units = units.replace(u"µ", "u")
         return ("{}(name={}, value={}, units={})"
-                .format(self.element_name, self.name, self.value, units))
+                .format(self.element_name, self.name,
+                        self.value if self.is_single() else self._value,
+                        units))
 
     @annotate_xml
     def to_xml(self):
@@ -504,7 +513,7 @@ class Property(Quantity):
             name = element.attrib['name']
         except KeyError:
             raise Exception("Property did not have a name")
-        return cls(name=name, value=quantity.value, units=quantity.units)
+        return cls(name=name, value=quantity._value, units=quantity.units)
 
 
 class InitialValue(Property):
@@ -1,10 +1,17 @@
 from itertools import chain
+from inspect import getargspec
+from collections import namedtuple
+import numpy
+from lxml import etree
 from . import BaseULObject
 from .component import resolve_reference, write_reference, Component
+from .values import ExternalArrayValue, NPY_MIMETYPE, current_spiller
 from nineml import TopLevelObject
-from nineml.xmlns import NINEML, E
+from nineml.exceptions import NineMLRuntimeError
+from nineml.xmlns import NINEML, E, nineml_namespace
 from nineml.utils import expect_single, check_tag
 from nineml.annotations import annotate_xml, read_annotations
+from nineml.abstraction_layer.units import length, dimensionless
 
 
 class Population(BaseULObject, TopLevelObject):
@@ -80,8 +87,8 @@ class Population(BaseULObject, TopLevelObject):
         check_tag(element, cls)
         layout_elem = element.find(NINEML + 'Layout')
         kwargs = {}
-        if layout_elem:
-            kwargs['positions'] = Component.from_xml(layout_elem, document)
+        if layout_elem is not None:
+            kwargs['positions'] = PositionList.from_xml(layout_elem, document)
         cell = expect_single(element.findall(NINEML + 'Cell'))
         cell_component = cell.find(NINEML + 'Component')
         if cell_component is None:
@@ -102,29 +109,31 @@ class PositionList(BaseULObject, TopLevelObject):
 
     **Arguments**:
         *positions*
-            a list of (x,y,z) tuples or a 3xN (Nx3?) numpy array.
+            a list of (x,y,z) tuples or an Nx3 numpy array.
         *structure*
             a :class:`Structure` component.
     """
     element_name = "Layout"
     defining_attributes = []
 
-    def __init__(self, positions=[], structure=None):
+    def __init__(self, positions=None, structure=None):
         """
         Create a new PositionList.
 
         Either `positions` or `structure` should be provided. Providing both
         will raise an Exception.
 
-        `positions` should be a list of (x,y,z) tuples or a 3xN (Nx3?) numpy
-                    array.
+        `positions` should be a list of (x,y,z) tuples or an Nx3 numpy array,
+                    which is stored as an Nx3 numpy array of floats.
         `structure` should be a Structure componentclass.
         """
         super(PositionList, self).__init__()
-        if positions and structure:
+        if positions is not None and len(positions) and structure:
             raise Exception("Please provide either positions or structure, "
                             "not both.")
         assert not isinstance(positions, Structure)
+        if positions is not None:
+            positions = numpy.asarray(positions, dtype=float).reshape(-1, 3)
         self._positions = positions
         if isinstance(structure, Structure):
             self.structure = structure
@@ -134,8 +143,9 @@ class PositionList(BaseULObject, TopLevelObject):
             raise Exception("structure is", structure)
 
     def __eq__(self, other):
-        if self._positions:
-            return self._positions == other._positions
+        if self._positions is not None:
+            return (other._positions is not None and
+                    numpy.array_equal(self._positions, other._positions))
         else:
             return self.structure == other.structure
 
@@ -147,9 +157,9 @@ class PositionList(BaseULObject, TopLevelObject):
 
     def get_positions(self, population):
         """
-        Return a list or 1D numpy array of (x,y,z) positions.
+        Return an Nx3 numpy array of (x,y,z) positions.
         """
-        if self._positions:
+        if self._positions is not None:
             assert len(self._positions) == population.number
             return self._positions
         elif self.structure:
@@ -166,17 +176,27 @@ class PositionList(BaseULObject, TopLevelObject):
     @write_reference
     @annotate_xml
     def to_xml(self):
-        element = E(self.element_name)
-        if self._positions:
-            for pos in self._positions:
-                x, y, z = pos
-                element.append(E.position(x=str(x), y=str(y), z=str(z),
-                                          units="um"))
+        if self._positions is not None:
+            spiller = current_spiller()
+            if (spiller is not None and
+                    len(self._positions) >= spiller.threshold):
+                # The positions are written to a .npy sidecar file, which
+                # keeps the shape of the array
+                return E(self.element_name,
+                         spiller.spill(self._positions,
+                                       NPY_MIMETYPE).to_xml())
+            # The positions are written to a string and parsed in a single
+            # pass, which is much faster than building an element for each
+            position = '<position x="%s" y="%s" z="%s" units="um"/>'
+            return etree.fromstring(
+                '<{0} xmlns="{1}">{2}</{0}>'.format(
+                    self.element_name, nineml_namespace,
+                    ''.join([position % tuple(p)
+                             for p in self._positions.astype(str)])))
         elif self.structure:
-            element.append(E.structure(self.structure.name))
+            return E(self.element_name, E.structure(self.structure.name))
         else:
             raise Exception("Neither positions nor structure is set.")
-        return element
 
     @classmethod
     @resolve_reference
@@ -187,14 +207,26 @@ class PositionList(BaseULObject, TopLevelObject):
         else:
             check_tag(element, cls)
             structure_element = element.find(NINEML + 'structure')
+            external_element = element.find(NINEML + 'ExternalArrayValue')
             if structure_element is not None:
                 return cls(structure=document.resolve_ref(
                     structure_element, Structure))
+            elif external_element is not None:
+                return cls(positions=ExternalArrayValue.from_xml(
+                    external_element, document).values)
             else:
-                positions = [(float(p.attrib['x']), float(p.attrib['y']),
-                              float(p.attrib['z']))
-                             for p in element.findall(NINEML + 'position')]
-                return cls(positions=positions)
+                coords = [numpy.array(_position_coords[c](element))
+                          for c in 'xyz']
+                if any(len(c) != len(coords[0]) for c in coords):
+                    raise Exception("Missing coordinates in positions")
+                return cls(positions=numpy.column_stack(
+                    [c.astype(float) for c in coords]))
+
+
+_position_coords = dict(
+    (c, etree.XPath('ni:position/@' + c, namespaces={'ni': nineml_namespace},
+                    smart_strings=False))
+    for c in 'xyz')
 
 
 def qstr(obj):
@@ -209,14 +241,90 @@ class Structure(Component):
     """
     Component representing the structure of a network, e.g. 2D grid, random
     distribution within a sphere, etc.
+
+    Positions are generated by the layout registered in `layouts` under
+    the name of the component class, which is passed the values of the
+    properties it takes as keyword arguments (lengths in um, the units
+    positions are written in).
+
+    The 'fillOrder' property, if present, sets the order the nodes are
+    assigned to the positions of the layout: 0 (the default) in sequence and
+    1 in a random order.
     """
     abstraction_layer_module = 'Structure'
 
-    def generate_positions(self, number):
+    def generate_positions(self, number, rng=None, chunk_size=2 ** 16):
         """
         Generate a number of node positions according to the network structure.
+
+        Returns an Nx3 numpy array, which is filled in chunks of `chunk_size`
+        positions. `rng` is the numpy RandomState used for random layouts
+        (the global numpy one by default).
         """
-        raise NotImplementedError
+        positions = numpy.empty((number, 3))
+        start = 0
+        for chunk in self.iter_positions(number, rng=rng,
+                                         chunk_size=chunk_size):
+            positions[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        return positions
+
+    def iter_positions(self, number, rng=None, chunk_size=2 ** 16):
+        """
+        Generate the node positions in Nx3 numpy arrays of (at most)
+        `chunk_size` positions.
+        """
+        name = self.component_class.name
+        try:
+            layout = layouts[name]
+        except KeyError:
+            raise NineMLRuntimeError(
+                "No layout for structure '{}' (can be one of '{}')"
+                .format(name, "', '".join(sorted(layouts))))
+        kwargs = {}
+        fill_order = 0
+        for prop in self.properties.itervalues():
+            if prop.name in layout.lengths:
+                kwargs[prop.name] = self._scaled_value(prop, length, 6)
+            elif prop.name in layout.dimensionless:
+                kwargs[prop.name] = self._scaled_value(prop, dimensionless)
+            elif prop.name == 'fillOrder':
+                fill_order = self._scaled_value(prop, dimensionless)
+            else:
+                raise NineMLRuntimeError(
+                    "Unrecognised property '{}' of '{}' structure"
+                    .format(prop.name, name))
+        if fill_order not in (0, 1):
+            raise NineMLRuntimeError(
+                "Invalid fillOrder {} of '{}' structure (0 for sequential or 1 "
+                "for random)".format(fill_order, name))
+        if rng is None:
+            rng = numpy.random
+        if 'rng' in getargspec(layout.function).args:
+            kwargs['rng'] = rng
+        order = rng.permutation(number) if fill_order == 1 else None
+        for start in xrange(0, number, chunk_size):
+            stop = min(start + chunk_size, number)
+            indices = (order[start:stop] if order is not None
+                       else numpy.arange(start, stop))
+            yield layout.function(indices, number, **kwargs)
+
+    def _scaled_value(self, prop, dimension, power=0):
+        """
+        Returns the value of the property scaled from its units to
+        10 ** -power of the SI unit of the dimension
+        """
+        units = prop.units
+        if units is None:
+            units_dimension, units_power = dimensionless, 0
+        else:
+            units_dimension, units_power = units.dimension, units.power
+        if units_dimension != dimension:
+            raise NineMLRuntimeError(
+                "Property '{}' of '{}' structure should be {}, not {}"
+                .format(prop.name, self.component_class.name, dimension.name,
+                        units_dimension.name))
+        return prop.value * 10 ** (units_power + power)
 
     @property
     def is_csa(self):
@@ -228,3 +336,67 @@ class Structure(Component):
         else:
             raise Exception("Structure cannot be transformed to CSA geometry "
                             "function")
+
+
+def grid_layout(indices, number, dx=1.0, dy=1.0, dz=1.0, x0=0.0, y0=0.0,
+                z0=0.0, aspectRatioXY=1.0, layers=1):
+    """
+    A regular grid in the x-y plane with the given aspect ratio (filled
+    sequentially along x then y), or a stack of `layers` such grids spaced
+    by `dz`.
+    """
+    per_layer = int(numpy.ceil(float(number) / layers))
+    ny = max(int(numpy.ceil(numpy.sqrt(per_layer / aspectRatioXY))), 1)
+    nx = int(numpy.ceil(float(per_layer) / ny))
+    layer, index = numpy.divmod(indices, per_layer)
+    iy, ix = numpy.divmod(index, nx)
+    return numpy.column_stack((x0 + ix * dx, y0 + iy * dy, z0 + layer * dz))
+
+
+def random_box_layout(indices, number, rng, xmin=0.0, xmax=1.0, ymin=0.0,
+                      ymax=1.0, zmin=0.0, zmax=1.0):
+    """
+    Positions drawn uniformly from a box
+    """
+    return rng.uniform((xmin, ymin, zmin), (xmax, ymax, zmax),
+                       size=(len(indices), 3))
+
+
+def random_sphere_layout(indices, number, rng, radius=1.0, x0=0.0, y0=0.0,
+                         z0=0.0):
+    """
+    Positions drawn uniformly from a sphere
+    """
+    directions = rng.normal(size=(len(indices), 3))
+    directions /= numpy.sqrt((directions ** 2).sum(axis=1))[:, numpy.newaxis]
+    radii = radius * rng.uniform(size=len(indices)) ** (1.0 / 3.0)
+    return directions * radii[:, numpy.newaxis] + (x0, y0, z0)
+
+
+def line_layout(indices, number, dx=1.0, dy=0.0, dz=0.0, x0=0.0, y0=0.0,
+                z0=0.0):
+    """
+    Evenly spaced positions along a line
+    """
+    return (numpy.outer(indices, (dx, dy, dz)) + (x0, y0, z0))
+
+
+# A function generating the positions of the given indices (of `number`
+# nodes) and the names of its arguments that are lengths (in um) and that are
+# dimensionless
+Layout = namedtuple('Layout', ('function', 'lengths', 'dimensionless'))
+
+# The layouts of structures keyed by the names of the component classes, which
+# follow the names of the layouts in the NineML specification (the names of
+# the '2Dgrid' and '3Dgrid' structures of the catalog aren't valid identifiers
+# in the current format)
+layouts = {
+    'Grid1D': Layout(line_layout, ('dx', 'dy', 'dz', 'x0', 'y0', 'z0'), ()),
+    'Grid2D': Layout(grid_layout, ('dx', 'dy', 'x0', 'y0'),
+                     ('aspectRatioXY',)),
+    'Grid3D': Layout(grid_layout, ('dx', 'dy', 'dz', 'x0', 'y0', 'z0'),
+                     ('aspectRatioXY', 'layers')),
+    'Uniform3D': Layout(random_box_layout,
+                        ('xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax'), ()),
+    'UniformSphere': Layout(random_sphere_layout,
+                            ('radius', 'x0', 'y0', 'z0'), ())}
@@ -1,6 +1,14 @@
 # encoding: utf-8
 from . import BaseULObject
-from nineml.xmlns import E, NINEML
+import os.path
+import csv
+import threading
+from itertools import islice
+from urlparse import urlparse
+import numpy
+from lxml import etree
+from nineml.exceptions import NineMLRuntimeError
+from nineml.xmlns import E, nineml_namespace
 from nineml.annotations import read_annotations, annotate_xml
 from nineml.utils import check_tag
 
@@ -48,39 +56,96 @@ class SingleValue(BaseValue):
 
 class ArrayValue(BaseValue):
 
+    """
+    An array of numerical values, stored in a contiguous numpy array of
+    integers or floats (depending on the values).
+
+    `values` can be a numpy array, a sequence of numbers or a sequence of
+    ArrayValueRow objects (in the order of their indices).
+    """
+
     element_name = "ArrayValue"
-    defining_attributes = ("rows",)
+    defining_attributes = ("values",)
+
+    def __init__(self, values):
+        if not isinstance(values, numpy.ndarray):
+            values = list(values)
+            if values and isinstance(values[0], ArrayValueRow):
+                values = _parse_numbers([r.value for r in values])
+        # Read-only arrays (e.g. the values of another ArrayValue) are shared
+        # instead of copied
+        values = numpy.array(values, copy=(not isinstance(values,
+                                                          numpy.ndarray) or
+                                           values.flags.writeable))
+        if values.dtype.kind not in 'if':
+            values = values.astype(numpy.float64)
+        values.flags.writeable = False
+        self._values = values
+
+    @property
+    def values(self):
+        """
+        A read-only numpy array of the values (without copying them)
+        """
+        return self._values
+
+    @property
+    def rows(self):
+        return [ArrayValueRow(str(i), str(v))
+                for i, v in enumerate(self._values.astype(str))]
 
-    def __init__(self, rows):
-        self.rows = rows
+    def __len__(self):
+        return len(self._values)
 
     def __repr__(self):
-        return "ArrayValue(with {} rows)".format(len(self.rows))
+        return "ArrayValue(with {} rows)".format(len(self._values))
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__) and
-                len(self.rows) == len(other.rows) and
-                all(r1 == r2 for r1, r2 in zip(self.rows, other.rows)))
+                numpy.array_equal(self._values, other._values))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
 
     def __hash__(self):
-        return hash(self.value)
+        return hash(self._values.astype(numpy.float64).tostring())
 
     @annotate_xml
     def to_xml(self):
-        return E(self.element_name, *[r.to_xml() for r in self.rows])
+        spiller = current_spiller()
+        if spiller is not None and len(self) >= spiller.threshold:
+            return spiller.spill(self.values).to_xml()
+        # The rows are written to a string and parsed in a single pass, which
+        # is much faster than building an element for each row
+        row = '<{0} index="%d">%s</{0}>'.format(ArrayValueRow.element_name)
+        return etree.fromstring(
+            '<{0} xmlns="{1}">{2}</{0}>'.format(
+                self.element_name, nineml_namespace,
+                ''.join([row % r
+                         for r in enumerate(self._values.astype(str))])))
 
     @classmethod
     @read_annotations
     def from_xml(cls, element, document):
-        rows = []
-        for row_xml in element.findall(NINEML + ArrayValueRow.element_name):
-            rows.append(ArrayValueRow.from_xml(row_xml, document))
-        sorted_rows = sorted(rows, key=lambda r: r.index)
-        if any(r.index != i for i, r in enumerate(sorted_rows)):
+        indices = _row_indices(element)
+        texts = _row_texts(element)
+        if len(texts) != len(indices):
+            raise Exception("Missing values in ArrayValue rows")
+        try:
+            indices = numpy.array(indices).astype(numpy.int64)
+        except ValueError:
+            raise Exception("Invalid indices in ArrayValue rows ({})"
+                            .format(', '.join(indices)))
+        values = _parse_numbers(texts)
+        order = numpy.argsort(indices, kind='mergesort')
+        if not numpy.array_equal(indices[order],
+                                 numpy.arange(len(indices))):
             raise Exception("Missing or duplicate indices in ArrayValue rows "
-                            "({})".format(', '.join(r.index
-                                                    for r in sorted_rows)))
-        return cls(sorted_rows)
+                            "({})".format(', '.join(str(i) for i in
+                                                    indices[order])))
+        values = values[order]
+        values.flags.writeable = False
+        return cls(values)
 
 
 class ArrayValueRow(BaseValue):
@@ -97,8 +162,7 @@ class ArrayValueRow(BaseValue):
 
     def __eq__(self, other):
         return (isinstance(other, self.__class__) and
-                len(self.rows) == len(other.rows) and
-                all(r1 == r2 for r1, r2 in zip(self.rows, other.rows)))
+                self.index == other.index and self.value == other.value)
 
     @annotate_xml
     def to_xml(self):
@@ -112,21 +176,80 @@ class ArrayValueRow(BaseValue):
 
 class ExternalArrayValue(BaseValue):
 
+    """
+    An array of numerical values stored in an external file, which is read
+    with the reader registered in `array_readers` for its mimetype (raw
+    little-endian binary, numpy '.npy', and CSV/TSV columns). Binary files
+    are memory-mapped so only the parts of the array that are accessed are
+    read into memory.
+
+    Relative URLs are resolved relative to the directory `relative_to`
+    (the directory of the document the value is read from).
+    """
+
     element_name = "ExternalArrayValue"
     defining_attributes = ("url", "mimetype", "columnName")
 
-    def __init__(self, url, mimetype, columnName):
+    def __init__(self, url, mimetype, columnName, relative_to=None):
         self.url = url
         self.mimetype = mimetype
         self.columnName = columnName
+        self.relative_to = relative_to
+        self._values = None
+
+    @property
+    def path(self):
+        """
+        The local path of the file the values are stored in
+        """
+        parsed = urlparse(self.url)
+        if parsed.scheme == 'file':
+            return parsed.path
+        elif parsed.scheme and len(parsed.scheme) > 1:
+            raise NineMLRuntimeError(
+                "Can only read external arrays from local files ('{}')"
+                .format(self.url))
+        if self.relative_to is not None:
+            return os.path.join(self.relative_to, self.url)
+        return self.url
+
+    @property
+    def values(self):
+        """
+        A read-only numpy array of the values, which is a memory-mapped view
+        of the file for binary mimetypes
+        """
+        if self._values is None:
+            self._values = _array_reader(self.mimetype).read(
+                self.path, self.columnName)
+        return self._values
+
+    def iter_chunks(self, chunk_size=2 ** 20):
+        """
+        Iterates through the values in numpy arrays of (at most) `chunk_size`
+        values, so that arrays larger than memory can be processed
+        """
+        return _array_reader(self.mimetype).iter_chunks(
+            self.path, self.columnName, chunk_size)
+
+    def __len__(self):
+        return len(self.values)
 
     def __repr__(self):
-        return "ExternalArrayValue(with {} rows)".format(len(self.rows))
+        return ("ExternalArrayValue(url={}, mimetype={}, columnName={})"
+                .format(self.url, self.mimetype, self.columnName))
 
     def __eq__(self, other):
-        return (self.url == other.url and self.mimetype == other.mimetype and
+        return (isinstance(other, self.__class__) and
+                self.url == other.url and self.mimetype == other.mimetype and
                 self.columnName == other.columnName)
 
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.url) ^ hash(self.mimetype) ^ hash(self.columnName)
+
     @annotate_xml
     def to_xml(self):
         return E(self.element_name, url=self.url, mimetype=self.mimetype,
@@ -134,10 +257,211 @@ class ExternalArrayValue(BaseValue):
 
     @classmethod
     @read_annotations
-    def from_xml(cls, element, _):
+    def from_xml(cls, element, document):
+        url = getattr(document, 'url', None)
         return cls(url=element.attrib["url"],
                    mimetype=element.attrib["mimetype"],
-                   columnName=element.attrib["columnName"])
+                   columnName=element.attrib.get("columnName", ''),
+                   relative_to=os.path.dirname(url) if url else None)
+
+
+class BaseArrayReader(object):
+
+    def iter_chunks(self, path, column_name, chunk_size):
+        values = self.read(path, column_name)
+        for start in xrange(0, len(values), chunk_size):
+            yield values[start:start + chunk_size]
+
+
+class RawArrayReader(BaseArrayReader):
+
+    """
+    Reads raw little-endian binary files, the type of the values being given
+    by the 'dtype' parameter of the mimetype (float64 by default), e.g.
+    'application/octet-stream; dtype=int32'
+    """
+
+    def __init__(self, dtype='float64'):
+        self.dtype = numpy.dtype(dtype).newbyteorder('<')
+
+    def read(self, path, column_name):
+        if not os.path.getsize(path):
+            return numpy.zeros(0, dtype=self.dtype)
+        return numpy.memmap(path, dtype=self.dtype, mode='r')
+
+    def write(self, values, path, column_name):
+        values.astype(self.dtype).tofile(path)
+
+
+class NpyArrayReader(BaseArrayReader):
+
+    """
+    Reads numpy '.npy' files, selecting the field named by the column name if
+    the array has named fields
+    """
+
+    def read(self, path, column_name):
+        values = numpy.load(path, mmap_mode='r')
+        if values.dtype.names:
+            values = values[column_name]
+        return values
+
+    def write(self, values, path, column_name):
+        numpy.save(path, values)
+
+
+class DelimitedArrayReader(BaseArrayReader):
+
+    """
+    Reads the column with the given name (in the header row) from
+    delimiter-separated text files
+    """
+
+    def __init__(self, delimiter):
+        self.delimiter = delimiter
+
+    def read(self, path, column_name):
+        chunks = list(self.iter_chunks(path, column_name, 2 ** 20))
+        if not chunks:
+            return numpy.zeros(0)
+        values = _parse_numbers(numpy.concatenate(chunks))
+        values.flags.writeable = False
+        return values
+
+    def iter_chunks(self, path, column_name, chunk_size):
+        with open(path, 'rb') as f:
+            reader = csv.reader(f, delimiter=self.delimiter)
+            try:
+                header = [h.strip() for h in next(reader)]
+            except StopIteration:
+                return
+            try:
+                column = header.index(column_name)
+            except ValueError:
+                raise NineMLRuntimeError(
+                    "Did not find column '{}' in '{}' (found '{}')"
+                    .format(column_name, path, "', '".join(header)))
+            while True:
+                chunk = [row[column] for row in islice(reader, chunk_size)]
+                if not chunk:
+                    break
+                yield numpy.array(chunk)
+
+    def write(self, values, path, column_name):
+        with open(path, 'wb') as f:
+            f.write(column_name + '\n')
+            numpy.savetxt(f, values, fmt='%r' if values.dtype.kind == 'f'
+                          else '%d')
+
+
+RAW_MIMETYPE = 'application/octet-stream'
+NPY_MIMETYPE = 'application/x-npy'
+CSV_MIMETYPE = 'text/csv'
+TSV_MIMETYPE = 'text/tab-separated-values'
+
+# Functions returning the reader for a mimetype given its parameters, and
+# the names of the parameters they take (the other parameters of the
+# mimetype, e.g. 'charset', are ignored)
+array_readers = {
+    RAW_MIMETYPE: (RawArrayReader, ('dtype',)),
+    NPY_MIMETYPE: (NpyArrayReader, ()),
+    CSV_MIMETYPE: (lambda: DelimitedArrayReader(','), ()),
+    TSV_MIMETYPE: (lambda: DelimitedArrayReader('\t'), ())}
+
+
+def _array_reader(mimetype):
+    parts = [p.strip() for p in mimetype.split(';')]
+    try:
+        reader_cls, parameter_names = array_readers[parts[0].lower()]
+    except KeyError:
+        raise NineMLRuntimeError(
+            "No reader for external arrays of mimetype '{}' (can be one of "
+            "'{}')".format(mimetype, "', '".join(array_readers)))
+    parameters = {}
+    for part in parts[1:]:
+        name, _, value = part.partition('=')
+        name = name.strip().lower()
+        if name in parameter_names:
+            parameters[name] = value.strip().strip('"')
+    return reader_cls(**parameters)
+
+
+class spill_arrays(object):
+
+    """
+    A context manager within which ArrayValues with at least `threshold`
+    values are written (by `to_xml`) to sidecar files in `directory`, named
+    from `prefix` and a counter, and replaced by ExternalArrayValues that
+    refer to them. Used by `Document.write`.
+    """
+
+    def __init__(self, directory, prefix, threshold, mimetype=NPY_MIMETYPE):
+        self.directory = directory
+        self.prefix = prefix
+        self.threshold = threshold
+        self.mimetype = mimetype
+        self.paths = []
+
+    def __enter__(self):
+        self._previous = getattr(_spill, 'spiller', None)
+        _spill.spiller = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _spill.spiller = self._previous
+
+    def spill(self, values, mimetype=None):
+        """
+        Writes the numpy array to a new sidecar file and returns the
+        ExternalArrayValue that refers to it
+        """
+        mimetype = mimetype or self.mimetype
+        extension = {NPY_MIMETYPE: '.npy', CSV_MIMETYPE: '.csv',
+                     TSV_MIMETYPE: '.tsv'}.get(mimetype, '.bin')
+        filename = '{}{}{}'.format(self.prefix, len(self.paths), extension)
+        path = os.path.join(self.directory, filename)
+        if mimetype == RAW_MIMETYPE:
+            mimetype += '; dtype={}'.format(values.dtype.name)
+        column_name = ('values' if mimetype in (CSV_MIMETYPE, TSV_MIMETYPE)
+                       else '')
+        _array_reader(mimetype).write(values, path, column_name)
+        self.paths.append(path)
+        return ExternalArrayValue('./' + filename, mimetype, column_name,
+                                  relative_to=self.directory)
+
+
+def current_spiller():
+    """
+    Returns the `spill_arrays` context that is active in the current thread,
+    if any
+    """
+    return getattr(_spill, 'spiller', None)
+
+
+_spill = threading.local()
+
+
+_row_indices = etree.XPath('ni:ArrayValueRow/@index',
+                           namespaces={'ni': nineml_namespace},
+                           smart_strings=False)
+_row_texts = etree.XPath('ni:ArrayValueRow/text()',
+                         namespaces={'ni': nineml_namespace},
+                         smart_strings=False)
+
+
+def _parse_numbers(texts):
+    """
+    Converts a list of strings to a numpy array of integers if they are all
+    integers or floats otherwise
+    """
+    texts = numpy.array(texts)
+    try:
+        return texts.astype(numpy.int64)
+    except ValueError:
+        try:
+            return texts.astype(numpy.float64)
+        except ValueError:
+            raise Exception("Invalid values in ArrayValue rows")
 
 
 # class ComponentValue(BaseValue):
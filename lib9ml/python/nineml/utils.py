@@ -6,12 +6,13 @@ analysis.
 :license: BSD-3, see LICENSE for details.
 """
 
-from os.path import dirname, normpath, realpath, exists, join
+from os.path import dirname, normpath, realpath, exists, join, expanduser
 import sys
 import re
 
 import itertools
 import hashlib
+from collections import OrderedDict
 
 from .exceptions import internal_error
 from .exceptions import NineMLRuntimeError
@@ -401,8 +402,74 @@ class LocationMgr(object):
         return join_norm(cls.getRootDir(), "catalog/")
 
 
+class LRUCache(object):
+    """
+    A size-bounded mapping that evicts the least-recently used entry once
+    ``max_size`` entries are stored. Lookups and insertions count as a "use".
+
+    ``hits`` and ``misses`` record the outcomes of ``get`` so that callers
+    can size the cache for their workloads.
+    """
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        # Reinsert so the entry becomes the most recently used
+        self._entries[key] = value
+        self.hits += 1
+        return value
+
+    def add(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        self._trim()
+
+    def resize(self, max_size):
+        self.max_size = max_size
+        self._trim()
+
+    def _trim(self):
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
+
+    def remove(self, key):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def keys(self):
+        return self._entries.keys()
+
+    def items(self):
+        return self._entries.items()
+
+
 class Settings(object):
     enable_component_validation = True
+    # Skip the validation of components with the same structure as one that
+    # has already passed (see the validation_cache of DynamicsValidator)
+    cache_component_validation = True
+    # The directory the compiled sidecars of documents read with
+    # `use_cache=True` are written to (see `nineml.document.read`)
+    compiled_cache_dir = join(expanduser('~'), '.cache', 'nineml')
 
     enable_nmodl_gsl = True
     use_developer_path = False
@@ -53,7 +53,8 @@ class ComponentMetaData(object):
 def get_component():
 
     component = hierachical_iaf_2coba.get_component()
-    comp = flattening.flatten(component)
+    comp = flattening.flatten(
+        component, initial_regimes=ComponentMetaData.initial_regime)
 
     # Remap some ports:
     RenameSymbol(comp, 'iaf_vthresh', 'V_th')
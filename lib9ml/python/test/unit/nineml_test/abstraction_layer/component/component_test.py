@@ -8,6 +8,7 @@ from nineml.abstraction_layer import (
     DynamicsClass as ComponentClass, DynamicsBlock, AnalogSendPort, Alias,
     AnalogReceivePort, AnalogReducePort, Regime, On, NamespaceAddress,
     OutputEvent, EventReceivePort)
+from nineml.abstraction_layer.expressions.kernels import compile_kernel
 
 
 class ComponentClass_test(unittest.TestCase):
@@ -291,10 +292,62 @@ class ComponentClass_test(unittest.TestCase):
 
         # Check the equations:
         # ====================== #
-#         warnings.warn('Tests not implemented')
-        pass
+        c3 = ComponentClass(
+            name='C3',
+            aliases=['A:=x*2', 'B:=A+A', 'C:=B/A'],
+            regimes=Regime(
+                'dx/dt = C - B',
+                transitions=On('x > B', do=['x = A']),
+                name='r1'))
+        c3.backsub_all()
+        regime = c3.regimes_map['r1']
+        self.assertEqual(regime.time_derivatives_map['x'].rhs,
+                         '(x * 2.0 + x * 2.0) / (x * 2.0) - '
+                         '(x * 2.0 + x * 2.0)')
+        transition = next(regime.on_conditions)
+        self.assertEqual(transition.trigger.rhs, 'x > x * 2.0 + x * 2.0')
+        self.assertEqual(transition.state_assignments[0].rhs, 'x * 2.0')
         # ====================== #
 
+    def test_backsub_precedence(self):
+        # The substituted expressions evaluate to the same values as the
+        # original expressions with the aliases evaluated separately
+        c = ComponentClass(
+            name='C',
+            aliases=['A := -(x^2)', 'B := 2 * x'],
+            regimes=Regime(
+                'dx/dt = A',
+                'dy/dt = -A^2 - B',
+                transitions=On('(x > 1 & x < 2) | B > 5', do=['y = A']),
+                name='r1'))
+        regime = c.regimes_map['r1']
+        exprs = [regime.time_derivatives_map['x'],
+                 regime.time_derivatives_map['y'],
+                 next(regime.on_conditions).trigger,
+                 next(regime.on_conditions).state_assignments[0]]
+        namespaces = [{'x': x, 'y': 1.0} for x in (-3.0, 1.5, 2.2, 3.0)]
+        for namespace in namespaces:
+            namespace['A'] = evaluate(c.aliases_map['A'].rhs_tree, namespace)
+            namespace['B'] = evaluate(c.aliases_map['B'].rhs_tree, namespace)
+        before = [[evaluate(e.rhs_tree, n) for e in exprs]
+                  for n in namespaces]
+        c.backsub_all()
+        self.assertEqual(regime.time_derivatives_map['x'].rhs,
+                         '-(x ** 2.0)')
+        after = [[evaluate(e.rhs_tree, n) for e in exprs]
+                 for n in namespaces]
+        self.assertEqual(after, before)
+        self.assertEqual(before[3][:3], [-9.0, 75.0, True])
+
+    def test_aliases_in_dependency_order(self):
+        c = ComponentClass(name='C1', aliases=['C:=B+A', 'B:=5*A', 'A:=1',
+                                               'D:=2'])
+        order = [a.lhs for a in c.query.aliases_in_dependency_order]
+        self.assertEqual(sorted(order), ['A', 'B', 'C', 'D'])
+        for alias, deps in c.query.alias_dependencies.iteritems():
+            for dep in deps:
+                self.assertLess(order.index(dep), order.index(alias))
+
     def test_connect_ports(self):
         # Signature: name(self, src, sink)
                 # Connects the ports of 2 subcomponents.
@@ -816,3 +869,8 @@ class ComponentClass_test(unittest.TestCase):
 
     # Write is better tested in the round trip tests.
     # def test_write(self):
+
+
+def evaluate(tree, namespace):
+    kernel = compile_kernel(tree)
+    return kernel(*[namespace[a] for a in kernel.arguments])
@@ -3,6 +3,10 @@
 # Automatically Generated Testing Skeleton Template:
 import warnings
 import unittest
+from nineml.abstraction_layer.expressions.parse.expressions import expr_parse
+from nineml.abstraction_layer.expressions.parse.conditions import (
+    cond_parse, cond_parse_cache)
+from nineml.exceptions import NineMLMathParseError
 
 
 # Testing Skeleton for function:
@@ -114,3 +118,27 @@ class Testcond_to_obj(unittest.TestCase):
 #        warnings.warn('Tests not implemented')
 # raise NotImplementedError()
 #
+
+
+class TestCondParse(unittest.TestCase):
+
+    def setUp(self):
+        cond_parse_cache.clear()
+
+    def test_cached(self):
+        names, funcs = cond_parse('V > Vth & sin(x) < 1e-3')
+        self.assertEqual(names, frozenset(['V', 'Vth', 'x']))
+        self.assertEqual(funcs, frozenset(['sin']))
+        self.assertIs(cond_parse(' V > Vth &\nsin(x) < 1e-3'),
+                      cond_parse('V > Vth & sin(x) < 1e-3'))
+        self.assertEqual((cond_parse_cache.hits, cond_parse_cache.misses),
+                         (2, 1))
+        # The expression and condition parsers don't interfere with each other
+        self.assertEqual(expr_parse('a * b'),
+                         (frozenset(['a', 'b']), frozenset()))
+        self.assertEqual(cond_parse('!(a > b)'),
+                         (frozenset(['a', 'b']), frozenset()))
+
+    def test_errors_not_cached(self):
+        self.assertRaises(NineMLMathParseError, cond_parse, 'a + b')
+        self.assertEqual(len(cond_parse_cache), 0)
@@ -3,6 +3,8 @@ import unittest
 from nineml.abstraction_layer import (Expression,
                                       Alias, StateAssignment, TimeDerivative)
 from nineml.abstraction_layer.expressions import ExpressionWithSimpleLHS
+from nineml.abstraction_layer.expressions.parse.expressions import (
+    expr_parse, expr_parse_cache)
 from nineml.exceptions import NineMLMathParseError
 
 
@@ -283,3 +285,27 @@ class TimeDerivative_test(unittest.TestCase):
         # independent_variable (dt)
         td.lhs_name_transform_inplace({'T': 'time'})
         self.assertEquals(td.independent_variable, 'time')
+
+
+class ExprParse_test(unittest.TestCase):
+
+    def setUp(self):
+        expr_parse_cache.clear()
+
+    def test_cached(self):
+        names, funcs = expr_parse('a + sin(b) * 1e-3 + c^2')
+        self.assertEquals(names, frozenset(['a', 'b', 'c']))
+        self.assertEquals(funcs, frozenset(['sin', 'pow']))
+        # Expressions that differ only in whitespace share the cache entry
+        self.assertIs(expr_parse(' a +  sin(b)\n* 1e-3 + c^2'),
+                      expr_parse('a + sin(b) * 1e-3 + c^2'))
+        self.assertEquals(expr_parse_cache.misses, 1)
+        self.assertEquals(expr_parse_cache.hits, 2)
+        # The parser is reused between expressions
+        self.assertEquals(expr_parse('x * exp(y)'),
+                          (frozenset(['x', 'y']), frozenset(['exp'])))
+
+    def test_errors_not_cached(self):
+        self.assertRaises(NineMLMathParseError, expr_parse, 'a + (b')
+        self.assertEquals(len(expr_parse_cache), 0)
+        self.assertRaises(NineMLMathParseError, expr_parse, 'a + (b')
@@ -0,0 +1,74 @@
+import unittest
+import numpy
+from nineml.abstraction_layer import Alias, Regime, TimeDerivative
+from nineml.abstraction_layer.dynamics import Trigger
+from nineml.abstraction_layer.expressions.kernels import (
+    compile_kernel, kernel_cache, kernel_namespace, kernel_func_name)
+from nineml.abstraction_layer.expressions.utils import get_builtin_symbols
+from nineml.exceptions import NineMLRuntimeError
+
+
+class Kernel_test(unittest.TestCase):
+
+    def test_namespace(self):
+        # All the builtin functions can be evaluated
+        for symbol in get_builtin_symbols():
+            self.assertIn(kernel_func_name(symbol), kernel_namespace)
+
+    def test_regime(self):
+        regime = Regime('dV/dt = (a * V - U + I) / C',
+                        'dU/dt = -U / tau + b * exp(V / 10)',
+                        name='R')
+        kernel = compile_kernel(sorted(regime.time_derivatives,
+                                       key=lambda td: td.lhs),
+                                arguments=('V', 'U', 'I', 'a', 'b', 'C',
+                                           'tau'))
+        V = numpy.linspace(-70.0, -50.0, 1000)
+        U = numpy.ones(1000)
+        dU, dV = kernel(V, U, 1.5, 2.0, 0.5, 3.0, 10.0)
+        self.assertEqual(dV.shape, (1000,))
+        self.assertTrue(numpy.allclose(dV, (2.0 * V - U + 1.5) / 3.0))
+        self.assertTrue(numpy.allclose(dU, -U / 10.0 +
+                                       0.5 * numpy.exp(V / 10.0)))
+        results = kernel.evaluate({'V': V, 'U': U, 'I': 1.5, 'a': 2.0,
+                                   'b': 0.5, 'C': 3.0, 'tau': 10.0})
+        self.assertEqual(sorted(results), ['dU/dt', 'dV/dt'])
+        self.assertTrue(numpy.array_equal(results['dV/dt'], dV))
+
+    def test_cache(self):
+        kernel = compile_kernel(Alias('A', 'sqrt(x) + atan(y)'))
+        self.assertIs(compile_kernel(Alias('B', 'sqrt( x )+atan(y)'))._func,
+                      kernel._func)
+        self.assertEqual(compile_kernel(Alias('B', 'sqrt(x) + atan(y)'))
+                         .outputs, ('B',))
+        hits = kernel_cache.hits
+        Alias('C', 'sqrt(x) + atan(y)').rhs_as_python_func()(x=4.0, y=0.0)
+        self.assertEqual(kernel_cache.hits, hits + 1)
+
+    def test_random(self):
+        kernel = compile_kernel('mu + random.normal() * sigma + uniform(0, 1)')
+        mu = numpy.zeros(100000)
+        values = kernel(mu, 2.0)
+        self.assertEqual(values.shape, mu.shape)
+        self.assertAlmostEqual(values.std(), numpy.sqrt(4.0 + 1.0 / 12.0),
+                               places=1)
+        self.assertTrue(numpy.isscalar(kernel(0.0, 2.0)))
+
+    def test_conditions(self):
+        kernel = compile_kernel(Trigger('V > Vth & !(t < t_ref)'))
+        V = numpy.array([0.0, 2.0, 2.0])
+        t = numpy.array([5.0, 5.0, 0.0])
+        self.assertEqual(list(kernel(V=V, Vth=1.0, t=t, t_ref=1.0)),
+                         [False, True, False])
+
+    def test_true_division(self):
+        # Integer arguments are divided as they are when expressions are
+        # folded
+        kernel = compile_kernel('a / b')
+        self.assertEqual(kernel(1, 2), 0.5)
+        self.assertTrue(numpy.array_equal(
+            kernel(numpy.array([1, 3]), numpy.array([2, 2])), [0.5, 1.5]))
+
+    def test_argument_clash(self):
+        self.assertRaises(NineMLRuntimeError, compile_kernel, 'exp(x)',
+                          arguments=('exp', 'x'))
@@ -0,0 +1,123 @@
+import cPickle as pickle
+import unittest
+from nineml.abstraction_layer import Alias
+from nineml.abstraction_layer.dynamics import Trigger
+from nineml.abstraction_layer.expressions.parse import expr_tree, cond_tree
+from nineml.abstraction_layer.expressions.tree import (
+    Name, Number, BinOp, UnaryOp, Call)
+
+
+class Tree_test(unittest.TestCase):
+
+    def test_hash_consing(self):
+        tree = expr_tree('(a + b) * sin(a + b)')
+        self.assertIs(tree, expr_tree('(a+b)*sin(a+b)'))
+        self.assertIs(tree.left, tree.right.args[0])
+        self.assertIs(tree.left, BinOp('+', Name('a'), Name('b')))
+        self.assertIs(pickle.loads(pickle.dumps(tree, 2)), tree)
+        self.assertRaises(AttributeError, setattr, tree, 'op', '-')
+
+    def test_names(self):
+        tree = expr_tree('a * exp(-b / tau) + pi')
+        self.assertEqual(tree.names, frozenset(['a', 'b', 'tau', 'pi']))
+        self.assertEqual(tree.funcs, frozenset(['exp']))
+        self.assertEqual(expr_tree('2.5e-3 * x'),
+                         BinOp('*', Number(0.0025), Name('x')))
+
+    def test_rename(self):
+        tree = expr_tree('a * exp(-b) + f(a)')
+        renamed = tree.rename({'a': 'A'}, {'f': 'g'})
+        self.assertIs(renamed, expr_tree('A * exp(-b) + g(A)'))
+        # Unchanged subtrees are reused
+        self.assertIs(renamed.left.right, tree.left.right)
+        self.assertIs(tree.rename({'x': 'y'}), tree)
+
+    def test_substitute(self):
+        tree = expr_tree('a / (b - c)')
+        self.assertIs(tree.substitute({'c': expr_tree('x + y')}),
+                      expr_tree('a / (b - (x + y))'))
+
+    def test_printing(self):
+        tree = expr_tree('-a^2 + b / (c - d) - sin(x) ** 2 + pi')
+        self.assertEqual(
+            tree.to_python(),
+            '(-a) ** 2.0 + b / (c - d) - sin(x) ** 2.0 + pi')
+        self.assertEqual(
+            tree.to_c(),
+            'pow(-a, 2.0) + b / (c - d) - pow(sin(x), 2.0) + M_PI')
+        self.assertEqual(
+            tree.to_nmodl(),
+            '(-a) ^ 2.0 + b / (c - d) - sin(x) ^ 2.0 + PI')
+        # The printed expressions parse to the same tree
+        self.assertIs(expr_tree(str(tree)), tree)
+        self.assertEqual(expr_tree('a - (b - c)').to_python(), 'a - (b - c)')
+
+    def test_double_negation(self):
+        # '--' is the decrement operator in C and NMODL
+        for tree in (expr_tree('-(-x)'), UnaryOp('-', Number(-2.0)),
+                     expr_tree('-(-(-x))'), expr_tree('x - -(-x)')):
+            self.assertNotIn('--', tree.to_c())
+            self.assertNotIn('--', tree.to_nmodl())
+            self.assertEqual(eval(tree.to_python(), {'x': 3.0}),
+                             eval(str(tree), {'x': 3.0}))
+        self.assertEqual(expr_tree('-(-x)').to_c(), '-(-x)')
+        self.assertEqual(UnaryOp('-', Number(-2.0)).to_nmodl(), '-(-2.0)')
+        self.assertEqual(eval(expr_tree('-(-x)').to_python(), {'x': 3.0}),
+                         3.0)
+
+    def test_conditions(self):
+        tree = cond_tree('!(V > Vth) & (t < 2 | true)')
+        self.assertEqual(tree.to_python(),
+                         'not V > Vth and (t < 2.0 or True)')
+        self.assertEqual(tree.to_c(), '!(V > Vth) && (t < 2.0 || 1)')
+        self.assertIs(cond_tree(str(tree)), tree)
+        self.assertEqual(eval(tree.to_python(), {'V': 0, 'Vth': 1, 't': 5}),
+                         True)
+
+    def test_round_trip(self):
+        # Unary minus binds more tightly than '**' in NineML
+        for expr in ('-(x^2)', '-x^2', '-(x^2)^y', 'x^(-y)', '2 * -(x^2)',
+                     '(x^2)^3', 'x^(y^z)', '-2^x'):
+            tree = expr_tree(expr)
+            self.assertIs(expr_tree(str(tree)), tree, str(tree))
+            self.assertIs(expr_tree(tree.to_nmodl().replace('^', '**')),
+                          tree, tree.to_nmodl())
+        self.assertEqual(
+            eval(expr_tree('-(x^2)').to_python(), {'x': 3.0}), -9.0)
+        self.assertEqual(
+            eval(expr_tree('-x^2').to_python(), {'x': 3.0}), 9.0)
+        # '&' and '|' have the same precedence and group to the right in
+        # NineML conditions
+        for cond in ('(x > 1 & x < 2) | y > 5', 'x > 1 & (x < 2 | y > 5)',
+                     'x > 1 | y > 5 & x < 2', '(x > 1 | y > 5) & x < 2',
+                     '!(x > 1 | y > 5) & x < 2'):
+            tree = cond_tree(cond)
+            self.assertIs(cond_tree(str(tree)), tree, str(tree))
+            for x, y in ((0, 6), (1.5, 0), (1.5, 6), (3, 6)):
+                self.assertEqual(
+                    eval(tree.to_python(), {'x': x, 'y': y}),
+                    eval(str(tree).replace('&', ' and ').replace('|', ' or ')
+                         .replace('!', ' not '), {'x': x, 'y': y}))
+
+    def test_expression(self):
+        alias = Alias.from_str('x := a * f(b)')
+        self.assertIs(alias.rhs_tree,
+                      BinOp('*', Name('a'), Call('f', [Name('b')])))
+        alias.rhs_name_transform_inplace({'a': 'A'})
+        self.assertIs(alias.rhs_tree, expr_tree('A * f(b)'))
+        trigger = Trigger('V > Vth')
+        self.assertIs(trigger.rhs_tree, cond_tree('V > Vth'))
+
+    def test_fold(self):
+        self.assertIs(expr_tree('2 * 3 + x * 1 - exp(0) * 0').fold(),
+                      expr_tree('6 + x'))
+        self.assertIs(expr_tree('0 - -(-x)').fold(), expr_tree('-x'))
+        # Random draws and invalid values aren't folded
+        for rhs in ('random.normal() * 2', '1 / 0', 'sqrt(0 - 1)'):
+            self.assertNotIsInstance(expr_tree(rhs).fold(), Number)
+        self.assertIs(cond_tree('a > 2 * 3 & 1 < 2').fold(),
+                      cond_tree('a > 6'))
+        self.assertIs(cond_tree('a > 2 | !false').fold(), cond_tree('true'))
+        # Negative numbers are bracketed as a unary minus would be
+        self.assertEqual(str(expr_tree('x ** y').substitute(
+            {'x': Number(-2)})), '(-2.0) ** y')
@@ -74,6 +74,30 @@ class MathUtil_test(unittest.TestCase):
         t = MathUtil.str_expr_replacement(frm='e', to='E', expr_string=t)
         self.assertEqual(t, 'B*c + d/(E*sin(f+g/E)) + b1 + e_ / exp(12*g)')
 
+        # Function names are recognised with whitespace before the bracket
+        self.assertEqual(
+            MathUtil.str_expr_replacement('f', 'F', 'f (x) + f'),
+            'f (x) + F')
+
+    def test_str_expr_batch_replacement(self):
+        t = 'b*c + d/(e*sin(f+g/e)) + b1 + e_ / exp(12*g) + 1e-3*b'
+        # The replacements are simultaneous and don't touch function names,
+        # longer names or the exponents of numbers
+        self.assertEqual(
+            MathUtil.str_expr_batch_replacement(
+                {'b': 'c', 'c': 'b', 'e': 'E', 'sin': 'SIN'}, t),
+            'c*b + d/(E*sin(f+g/E)) + b1 + e_ / exp(12*g) + 1e-3*c')
+        self.assertEqual(
+            MathUtil.str_expr_batch_replacement(
+                {'g': 'G'}, 'mtrand.dirichlet(g) + f (g)',
+                func_map={'mtrand.dirichlet': 'dirichlet', 'f': 'F'}),
+            'dirichlet(G) + F (G)')
+        # Names followed by whitespace and a bracket are function names
+        self.assertEqual(
+            MathUtil.str_expr_batch_replacement(
+                {'f': 'x', 'sin': 'SIN'}, 'f (x) + sin  (f) + f'),
+            'f (x) + sin  (x) + x')
+
     def test_get_prefixed_rhs_string(self):
         # Signature: name(cls, expr_obj, prefix='', exclude=None)
                 # No Docstring
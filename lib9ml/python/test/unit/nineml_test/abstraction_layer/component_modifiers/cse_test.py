@@ -0,0 +1,124 @@
+import unittest
+import numpy
+from nineml.abstraction_layer import DynamicsClass, Regime, On
+from nineml.abstraction_layer.dynamics.utils.cse import DynamicsCSE
+from nineml.abstraction_layer.expressions.kernels import compile_kernel
+
+
+class DynamicsCSE_test(unittest.TestCase):
+
+    def setUp(self):
+        self.componentclass = DynamicsClass(
+            name='A',
+            aliases=['rate := a * exp(-(V - V0) / k)',
+                     'tau := 1 / (rate + b * exp(-(V - V0) / k))'],
+            regimes=[
+                Regime('dV/dt = -V / tau + exp(-(V - V0) / k) * g',
+                       'dU/dt = -U * rate + random.normal()',
+                       transitions=On('V > Vth * (V - V0)',
+                                      do=['U = U * (V - V0)']),
+                       name='R')])
+
+    def test_temporaries(self):
+        cse = DynamicsCSE(self.componentclass)
+        self.assertEqual([str(t) for t in cse.temporaries.itervalues()],
+                         ['V - V0', 'exp(-cse0 / k)'])
+        eliminated = self.componentclass.eliminate_common_subexpressions()
+        aliases = dict((a.lhs, a.rhs) for a in eliminated.aliases)
+        self.assertEqual(aliases, {'cse0': 'V - V0',
+                                   'cse1': 'exp(-cse0 / k)',
+                                   'rate': 'a * cse1',
+                                   'tau': '1.0 / (rate + b * cse1)'})
+        regime = next(eliminated.regimes)
+        self.assertEqual(regime.time_derivatives_map['V'].rhs,
+                         '-V / tau + cse1 * g')
+        # Random draws aren't shared
+        self.assertEqual(regime.time_derivatives_map['U'].rhs,
+                         '-U * rate + random.normal()')
+        transition = next(regime.on_conditions)
+        self.assertEqual(transition.trigger.rhs, 'V > Vth * cse0')
+        self.assertEqual(transition.state_assignments[0].rhs, 'U * cse0')
+        # The rewritten class is constructed with the same interface
+        self.assertEqual(
+            eliminated,
+            DynamicsClass(
+                name='A',
+                parameters=list(self.componentclass.parameters),
+                aliases=['cse0 := V - V0', 'cse1 := exp(-cse0 / k)',
+                         'rate := a * cse1',
+                         'tau := 1.0 / (rate + b * cse1)'],
+                regimes=[
+                    Regime('dV/dt = -V / tau + cse1 * g',
+                           'dU/dt = -U * rate + random.normal()',
+                           transitions=On('V > Vth * cse0',
+                                          do=['U = U * cse0']),
+                           name='R')]))
+        # The original componentclass is left unchanged
+        self.assertEqual(len(list(self.componentclass.aliases)), 2)
+
+    def test_equivalent(self):
+        eliminated = self.componentclass.eliminate_common_subexpressions()
+        values = {'V': numpy.linspace(-70.0, -50.0, 11), 'V0': -60.0,
+                  'k': 5.0, 'a': 0.1, 'b': 0.2, 'g': 2.0}
+        for componentclass in (self.componentclass, eliminated):
+            namespace = dict(values)
+            aliases = dict((a.lhs, a) for a in componentclass.aliases)
+            # Evaluate the aliases in dependency order
+            while aliases:
+                for name, alias in aliases.items():
+                    if all(n in namespace for n in alias.rhs_names):
+                        namespace[name] = compile_kernel(alias).evaluate(
+                            namespace)[name]
+                        del aliases[name]
+            td = next(componentclass.regimes).time_derivatives_map['V']
+            namespace['dV'] = compile_kernel(td).evaluate(namespace)['dV/dt']
+            if componentclass is self.componentclass:
+                expected = namespace
+            else:
+                for name in ('rate', 'tau', 'dV'):
+                    self.assertTrue(numpy.allclose(namespace[name],
+                                                   expected[name]))
+
+    def test_precedence(self):
+        # The rewritten expressions keep negated powers and bracketed
+        # logical operators
+        componentclass = DynamicsClass(
+            name='B',
+            aliases=['A := -(x^3) * (y * z)'],
+            regimes=[
+                Regime('dx/dt = -(x^2) + y * z',
+                       transitions=On('(x > 1 & x < 2) | y * z > 5',
+                                      do=['x = -(x^4)^z * (y * z)']),
+                       name='R')])
+        eliminated = componentclass.eliminate_common_subexpressions()
+        self.assertEqual(
+            dict((a.lhs, a.rhs) for a in eliminated.aliases),
+            {'cse0': 'y * z', 'A': '-(x ** 3.0) * cse0'})
+        regime = next(eliminated.regimes)
+        self.assertEqual(regime.time_derivatives_map['x'].rhs,
+                         '-(x ** 2.0) + cse0')
+        transition = next(regime.on_conditions)
+        self.assertEqual(transition.trigger.rhs,
+                         '(x > 1.0 & x < 2.0) | cse0 > 5.0')
+        self.assertEqual(transition.state_assignments[0].rhs,
+                         '-((x ** 4.0) ** z) * cse0')
+        for x, y in ((3.0, 1.0), (1.5, 0.5), (1.5, 6.0), (0.0, 6.0)):
+            self.assertEqual(self._evaluate(eliminated, x=x, y=y, z=2.0),
+                             self._evaluate(componentclass, x=x, y=y, z=2.0))
+        self.assertEqual(self._evaluate(componentclass, x=3.0, y=1.0, z=2.0),
+                         [-54.0, -7.0, False, -13122.0])
+
+    def _evaluate(self, componentclass, **namespace):
+        aliases = dict((a.lhs, a) for a in componentclass.aliases)
+        while aliases:
+            for name, alias in aliases.items():
+                if all(n in namespace for n in alias.rhs_names):
+                    namespace[name] = compile_kernel(alias).evaluate(
+                        namespace)[name]
+                    del aliases[name]
+        regime = next(componentclass.regimes)
+        transition = next(regime.on_conditions)
+        return [namespace['A']] + [
+            compile_kernel(e.rhs_tree).evaluate(namespace)[None]
+            for e in (regime.time_derivatives_map['x'], transition.trigger,
+                      transition.state_assignments[0])]
@@ -0,0 +1,115 @@
+import unittest
+from nineml.abstraction_layer import (
+    DynamicsClass, Regime, On, AnalogSendPort)
+from nineml.abstraction_layer.units import Unit, Dimension
+from nineml.user_layer.component import Property, PropertySet
+from nineml.abstraction_layer.expressions.kernels import compile_kernel
+from nineml.abstraction_layer.expressions.parse import expr_tree
+from nineml.abstraction_layer.expressions.tree import Name
+from nineml.abstraction_layer.dynamics.utils.specialiser import (
+    DynamicsSpecialiser)
+from nineml.exceptions import NineMLRuntimeError
+
+
+class DynamicsSpecialiser_test(unittest.TestCase):
+
+    def setUp(self):
+        self.componentclass = DynamicsClass(
+            name='A',
+            aliases=['scale := gain * 2',
+                     'offset := V0',
+                     'I := scale * (V - offset) + exp(-k * 0)'],
+            regimes=[
+                Regime('dV/dt = (-V + I * R) / tau',
+                       transitions=On('V > Vth + offset',
+                                      do=['V = Vreset * scale']),
+                       name='R')],
+            analog_ports=[AnalogSendPort('I')])
+
+    def test_specialise(self):
+        specialised = self.componentclass.specialise(
+            {'gain': 1.5, 'V0': -65.0, 'k': 3.0, 'R': 1.0, 'Vth': 15.0},
+            name='B')
+        self.assertEqual(specialised.name, 'B')
+        self.assertEqual(sorted(specialised.parameters_map),
+                         ['Vreset', 'tau'])
+        # Constant aliases are substituted, the sent alias is kept
+        self.assertEqual(dict((a.lhs, a.rhs) for a in specialised.aliases),
+                         {'I': '3.0 * (V - -65.0) + 1.0'})
+        regime = next(specialised.regimes)
+        self.assertEqual(regime.time_derivatives_map['V'].rhs,
+                         '(-V + I) / tau')
+        transition = next(regime.on_conditions)
+        self.assertEqual(transition.trigger.rhs, 'V > -50.0')
+        self.assertEqual(transition.state_assignments[0].rhs,
+                         'Vreset * 3.0')
+        # The original class is unchanged
+        self.assertEqual(len(list(self.componentclass.aliases)), 3)
+        self.assertEqual(len(list(self.componentclass.parameters)), 7)
+        # The specialised class is constructed from its specialised parts
+        self.assertEqual(
+            specialised,
+            DynamicsClass(
+                name='B',
+                parameters=['Vreset', 'tau'],
+                aliases=['I := 3.0 * (V - -65.0) + 1.0'],
+                regimes=[
+                    Regime('dV/dt = (-V + I) / tau',
+                           transitions=On('V > -50.0',
+                                          do=['V = Vreset * 3.0']),
+                           name='R')],
+                analog_ports=[AnalogSendPort('I')]))
+
+    def test_cyclic_substitutions(self):
+        specialiser = DynamicsSpecialiser(self.componentclass, {})
+        specialiser.substitutions.update({'a': Name('b'), 'b': Name('a')})
+        self.assertRaises(NineMLRuntimeError, specialiser.specialise,
+                          expr_tree('a + 1'))
+
+    def test_property_set(self):
+        voltage = Dimension('voltage', m=1, l=2, t=-3, i=-1)
+        mV = Unit('mV', dimension=voltage, power=-3)
+        properties = PropertySet(Property('V0', -65.0, mV),
+                                 Property('Vth', 15.0, mV))
+        specialised = self.componentclass.specialise(properties,
+                                                     si_units=True)
+        transition = next(next(specialised.regimes).on_conditions)
+        self.assertEqual(transition.trigger.rhs, 'V > -0.05')
+
+    def test_precedence(self):
+        componentclass = DynamicsClass(
+            name='C',
+            regimes=[
+                Regime('dx/dt = -(p^2) * x - (x^2)^q',
+                       'dy/dt = -(x^q) + y',
+                       transitions=On('(x > a & x < b) | y > c',
+                                      do=['y = -(p^q)']),
+                       name='R')])
+        specialised = componentclass.specialise(
+            {'p': 3.0, 'q': 2.0, 'a': 1.0, 'b': 2.0, 'c': 5.0})
+        regime = next(specialised.regimes)
+        self.assertEqual(regime.time_derivatives_map['x'].rhs,
+                         '-9.0 * x - (x ** 2.0) ** 2.0')
+        self.assertEqual(regime.time_derivatives_map['y'].rhs,
+                         '-(x ** 2.0) + y')
+        transition = next(regime.on_conditions)
+        self.assertEqual(transition.trigger.rhs,
+                         '(x > 1.0 & x < 2.0) | y > 5.0')
+        self.assertEqual(transition.state_assignments[0].rhs, '-9.0')
+        # The specialised expressions evaluate to the same values
+        original = next(componentclass.regimes)
+        originals = [original.time_derivatives_map['x'],
+                     original.time_derivatives_map['y'],
+                     next(original.on_conditions).trigger,
+                     next(original.on_conditions).state_assignments[0]]
+        exprs = [regime.time_derivatives_map['x'],
+                 regime.time_derivatives_map['y'], transition.trigger,
+                 transition.state_assignments[0]]
+        for x, y in ((3.0, 1.0), (1.5, 0.0), (0.0, 6.0), (-2.0, 0.0)):
+            namespace = {'x': x, 'y': y, 'p': 3.0, 'q': 2.0, 'a': 1.0,
+                         'b': 2.0, 'c': 5.0}
+            self.assertEqual(
+                [compile_kernel(e.rhs_tree).evaluate(namespace)[None]
+                 for e in exprs],
+                [compile_kernel(e.rhs_tree).evaluate(namespace)[None]
+                 for e in originals])
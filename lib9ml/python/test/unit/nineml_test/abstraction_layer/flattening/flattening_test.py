@@ -1,10 +1,25 @@
 
 
+import itertools
+import os
+import tempfile
 import unittest
+import nineml
 from nineml.abstraction_layer import (Regime, On, OutputEvent,
                                       AnalogReceivePort, AnalogSendPort,
                                       flattening)
 from nineml.abstraction_layer.dynamics import DynamicsClass as ComponentClass
+from nineml.exceptions import NineMLRuntimeError
+
+
+def all_regimes(namespaces, regime_names=('r1', 'r2')):
+    """
+    The initial regimes that build all the combinations of the regimes of
+    the subcomponents
+    """
+    return [' '.join('{}:{}'.format(ns, r) for ns, r in zip(namespaces, rs))
+            for rs in itertools.product(regime_names,
+                                        repeat=len(namespaces))]
 
 
 class ComponentFlattener_test(unittest.TestCase):
@@ -119,7 +134,8 @@ class ComponentFlattener_test(unittest.TestCase):
                            # portconnections= [('c1.C1','c2.cIn1'),('c2.emit','c1.spikein'), ]
                            )
 
-        b_flat = flattening.flatten(b)
+        b_flat = flattening.flatten(
+            b, initial_regimes=all_regimes(('d', 'c1', 'c2')))
 
         # Name
         self.assertEqual(b_flat.name, 'B')
@@ -254,7 +270,8 @@ class ComponentFlattener_test(unittest.TestCase):
                            subnodes={'b': b, 'c': c},
                            )
 
-        a_flat = flattening.flatten(a)
+        a_flat = flattening.flatten(
+            a, initial_regimes=all_regimes(('b.d', 'b.c1', 'b.c2', 'c')))
 
         # Name
         self.assertEqual(a_flat.name, 'A')
@@ -457,7 +474,8 @@ class ComponentFlattener_test(unittest.TestCase):
                                             ('b.c1.C2', 'b.d.dIn1')]
                            )
 
-        a_flat = flattening.flatten(a)
+        a_flat = flattening.flatten(
+            a, initial_regimes=all_regimes(('b.d', 'b.c1', 'b.c2', 'c')))
 
         # Name
         self.assertEqual(a_flat.name, 'A')
@@ -633,6 +651,122 @@ class ComponentFlattener_test(unittest.TestCase):
             set(a_flat.aliases_map['b_d_D2'].rhs_atoms),
             set(['b_c2_cp1', 'b_d_dp2']))
 
+    def test_reachable_regimes(self):
+        c = ComponentClass(
+            name='C',
+            regimes=[
+                Regime('dSV1/dt = -SV1/cp2',
+                       transitions=On('SV1>cp1', to='r2'), name='r1'),
+                Regime(name='r2', transitions=On('SV1>1', to='r3')),
+                Regime(name='r3')],
+            parameters=['cp1', 'cp2'])
+        b = ComponentClass(name='B', subnodes={'c1': c, 'c2': c})
+
+        # The initial regimes are needed as the subcomponents have several
+        self.assertRaises(NineMLRuntimeError, flattening.ComponentFlattener,
+                          b)
+        flattener = flattening.ComponentFlattener(
+            b, initial_regimes=all_regimes(('c1', 'c2'), ('r1', 'r2', 'r3')))
+        self.assertEqual(len(flattener.reducedcomponent.regimes_map), 9)
+        self.assertEqual(flattener.pruned_regimes, 0)
+
+        # Only the combinations reachable from the initial regimes are built
+        flattener = flattening.ComponentFlattener(
+            b, initial_regimes='c1:r2 c2:r1')
+        self.assertEqual(len(flattener.reducedcomponent.regimes_map), 6)
+        self.assertEqual(flattener.pruned_regimes, 3)
+        for r1 in ('r2', 'r3'):
+            for r2 in ('r1', 'r2', 'r3'):
+                flattener.get_new_regime('c1:{} c2:{}'.format(r1, r2))
+        self.assertRaises(NineMLRuntimeError, flattener.get_new_regime,
+                          'c1:r1 c2:r1')
+        # c1 never leaves the regimes without time derivatives, so its
+        # parameters are unused (but kept in the interface) and its state
+        # variable is held constant
+        flat = flattener.reducedcomponent
+        self.assertEqual(set(flat.parameters_map),
+                         set(['c1_cp1', 'c1_cp2', 'c2_cp1', 'c2_cp2']))
+        self.assertEqual(flat.unused_interface,
+                         frozenset(['c1_cp1', 'c1_cp2']))
+        # and is kept when the flattened component is copied
+        self.assertEqual(flattening.flatten(flat).unused_interface,
+                         flat.unused_interface)
+        # and when it is written to and read back from XML
+        fd, filename = tempfile.mkstemp(suffix='.xml')
+        os.close(fd)
+        try:
+            nineml.write(flat, filename)
+            reread = nineml.read(filename)[flat.name]
+        finally:
+            os.remove(filename)
+        self.assertEqual(reread.unused_interface, flat.unused_interface)
+        self.assertEqual(set(reread.parameters_map),
+                         set(flat.parameters_map))
+        self.assertEqual(
+            flat.regimes_map.values()[0].time_derivatives_map['c1_SV1'].rhs,
+            '0')
+
+        self.assertRaises(NineMLRuntimeError, flattening.flatten, b,
+                          initial_regimes='c1:r1 c2:r1', max_regimes=8)
+
+    def test_pruned_regimes_equivalent(self):
+        c = ComponentClass(
+            name='C',
+            regimes=[
+                Regime('dSV1/dt = -SV1/cp2',
+                       transitions=On('SV1>cp1', do=['SV1 = 0'], to='r2'),
+                       name='r1'),
+                Regime('dSV1/dt = cp3',
+                       transitions=On('SV1>1', to='r3'), name='r2'),
+                Regime('dSV1/dt = -SV1',
+                       transitions=On('SV1<0.5', to='r4'), name='r3'),
+                Regime(name='r4',
+                       transitions=On('SV1>cp1', do=['SV1 = 1'],
+                                      to='r3'))],
+            parameters=['cp1', 'cp2', 'cp3'])
+        b = ComponentClass(name='B', subnodes={'c1': c, 'c2': c, 'c3': c})
+        full = flattening.ComponentFlattener(
+            b, initial_regimes=all_regimes(('c1', 'c2', 'c3'),
+                                           ('r1', 'r2', 'r3', 'r4')))
+        initial = 'c1:r3 c2:r3 c3:r2'
+        pruned = flattening.ComponentFlattener(b, initial_regimes=initial)
+        self.assertEqual(len(full.reducedcomponent.regimes_map), 64)
+        self.assertEqual(len(pruned.reducedcomponent.regimes_map), 12)
+        self.assertEqual(pruned.pruned_regimes, 52)
+        # The regimes that are built are those reachable from the initial
+        # regime in the full flattening
+        reachable = set()
+        unvisited = [full.get_new_regime(initial)]
+        while unvisited:
+            regime = unvisited.pop()
+            if regime.name not in reachable:
+                reachable.add(regime.name)
+                unvisited.extend(t.target_regime for t in regime.transitions)
+        self.assertEqual(set(pruned.reducedcomponent.regimes_map), reachable)
+        # and they have the same dynamics and transitions
+        for regime in pruned.reducedcomponent.regimes:
+            full_regime = full.reducedcomponent.regimes_map[regime.name]
+            self.assertEqual(
+                dict((td.dependent_variable, td.rhs)
+                     for td in regime.time_derivatives),
+                dict((td.dependent_variable, td.rhs)
+                     for td in full_regime.time_derivatives))
+            self.assertEqual(
+                sorted((t.trigger.rhs, t.target_regime.name,
+                        sorted((a.lhs, a.rhs) for a in t.state_assignments))
+                       for t in regime.on_conditions),
+                sorted((t.trigger.rhs, t.target_regime.name,
+                        sorted((a.lhs, a.rhs) for a in t.state_assignments))
+                       for t in full_regime.on_conditions))
+        # The interface is the same as the full flattening's
+        self.assertEqual(set(pruned.reducedcomponent.parameters_map),
+                         set(full.reducedcomponent.parameters_map))
+        self.assertEqual(set(pruned.reducedcomponent.state_variables_map),
+                         set(full.reducedcomponent.state_variables_map))
+        self.assertEqual(
+            pruned.reducedcomponent.unused_interface,
+            frozenset(['c1_cp2', 'c1_cp3', 'c2_cp2', 'c2_cp3', 'c3_cp2']))
+
     def test_event_resolution(self):
         pass
         # pass
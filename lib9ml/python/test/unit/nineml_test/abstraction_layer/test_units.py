@@ -1,6 +1,12 @@
 import os.path
 import unittest
-from nineml import read, load
+import cPickle as pickle
+from lxml import etree
+from nineml import read, load, Document
+from nineml.abstraction_layer import DynamicsClass, Parameter
+from nineml.annotations import Annotations
+from nineml.abstraction_layer.units import (
+    Unit, Dimension, UnitRegistry, voltage, time, temperature, mV, ms, nA)
 
 
 class TestUnitsDimensions(unittest.TestCase):
@@ -13,3 +19,61 @@ class TestUnitsDimensions(unittest.TestCase):
         xml = document1.to_xml()
         document2 = load(xml, read_from=self.test_file)
         self.assertEquals(document1, document2)
+
+
+class TestUnitRegistry(unittest.TestCase):
+
+    def test_canonical(self):
+        millivolt = Unit('millivolt', Dimension('potential', m=1, l=2, t=-3,
+                                                i=-1), power=-3)
+        registry = UnitRegistry([voltage, mV, ms])
+        self.assertIs(registry.add(millivolt), mV)
+        self.assertIs(registry.canonical(millivolt.dimension), voltage)
+        self.assertIsNone(registry.canonical(nA))
+        self.assertIsNone(registry.canonical(
+            Unit('degC', temperature, power=0, offset=273.15)))
+        registry.remove(mV)
+        self.assertIs(registry.canonical(mV), millivolt)
+        self.assertEqual(set(registry.units), set([millivolt, ms]))
+
+    def test_document_standardization(self):
+        # Equivalent dimensions with different names are merged into the one
+        # in the document and unused ones are removed
+        potential = Dimension('potential', m=1, l=2, t=-3, i=-1)
+        componentclass = DynamicsClass(
+            name='A', parameters=[Parameter('E', dimension=potential)],
+            aliases=['x := E'])
+        document = Document(voltage, componentclass, time)
+        document.standardize_units()
+        self.assertEqual(sorted(document.iterkeys()), ['A', 'voltage'])
+        self.assertIs(next(componentclass.parameters).dimension, voltage)
+
+
+class TestInterning(unittest.TestCase):
+
+    def test_interned(self):
+        self.assertIs(Dimension('voltage', m=1, l=2, t=-3, i=-1), voltage)
+        self.assertIs(Unit('mV', voltage, -3), mV)
+        self.assertIs(pickle.loads(pickle.dumps(mV, 2)), mV)
+        potential = Dimension('potential', m=1, l=2, t=-3, i=-1)
+        self.assertIsNot(potential, voltage)
+        self.assertEqual(potential, voltage)
+        self.assertEqual(hash(potential), hash(voltage))
+        self.assertIsNot(Unit('mV', potential, -3), mV)
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            voltage.name = 'potential'
+        with self.assertRaises(AttributeError):
+            mV.power = -6
+        potential = Dimension('potential', m=1, l=2, t=-3, i=-1)
+        self.assertIs(mV.with_dimension(voltage), mV)
+        self.assertIs(mV.with_dimension(potential).dimension, potential)
+
+    def test_annotated_not_interned(self):
+        annotations = Annotations(note=etree.Element('note'))
+        annotated = Dimension('voltage', annotations=annotations, m=1, l=2,
+                              t=-3, i=-1)
+        self.assertIsNot(annotated, voltage)
+        self.assertIs(annotated.annotations, annotations)
+        self.assertIsNone(voltage.annotations)
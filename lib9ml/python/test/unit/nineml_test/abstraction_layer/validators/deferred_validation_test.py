@@ -0,0 +1,68 @@
+import threading
+import unittest
+import nineml
+from nineml.exceptions import NineMLRuntimeError
+from nineml.abstraction_layer import DynamicsClass, Regime
+
+
+class DeferredValidation_test(unittest.TestCase):
+
+    def islands(self):
+        # Two regimes without transitions between them fail validation
+        return DynamicsClass(
+            name='A', regimes=[Regime('dV/dt = -V / tau', name='R1'),
+                               Regime('dU/dt = -U / tau', name='R2')])
+
+    def valid(self, i):
+        return DynamicsClass(
+            name='A{}'.format(i),
+            regimes=[Regime('dV/dt = -V / tau{}'.format(i), name='R')])
+
+    def test_deferred(self):
+        self.assertRaises(NineMLRuntimeError, self.islands)
+
+        exited = []
+
+        def construct():
+            with nineml.deferred_validation():
+                self.valid(0)
+                with nineml.deferred_validation():
+                    self.islands()
+                # Nested blocks are validated with the outermost one
+                exited.append(True)
+        self.assertRaises(NineMLRuntimeError, construct)
+        self.assertEqual(exited, [True])
+        # Nothing is validated if the block raises an exception
+        try:
+            with nineml.deferred_validation():
+                self.islands()
+                raise KeyError()
+        except KeyError:
+            pass
+        self.assertRaises(NineMLRuntimeError, self.islands)
+
+    def test_process_pool(self):
+        with nineml.deferred_validation(processes=2):
+            for i in xrange(4):
+                self.valid(i)
+
+        def construct():
+            with nineml.deferred_validation(processes=2):
+                self.valid(0)
+                self.islands()
+        self.assertRaises(NineMLRuntimeError, construct)
+
+    def test_other_threads(self):
+        # Validation is only deferred in the thread that entered the block
+        errors = []
+
+        def construct():
+            try:
+                self.islands()
+            except NineMLRuntimeError as e:
+                errors.append(e)
+        with nineml.deferred_validation():
+            thread = threading.Thread(target=construct)
+            thread.start()
+            thread.join()
+        self.assertEqual(len(errors), 1)
@@ -0,0 +1,100 @@
+import unittest
+from nineml.exceptions import NineMLRuntimeError
+from nineml.abstraction_layer import (
+    DynamicsClass, Regime, On, OutputEvent, Alias, AnalogSendPort)
+from nineml.abstraction_layer.dynamics import StateVariable
+from nineml.abstraction_layer.dynamics.validators import DynamicsValidator
+from nineml.abstraction_layer.dynamics.validators.base import validation_cache
+from nineml.abstraction_layer.dynamics.utils.cloner import (
+    DynamicsClonerVisitor)
+from nineml.abstraction_layer.dynamics.utils.fingerprint import (
+    DynamicsFingerprinter)
+from nineml.utils import Settings
+
+
+class FusedDynamicsValidator_test(unittest.TestCase):
+
+    def setUp(self):
+        self.componentclass = DynamicsClass(
+            name='A',
+            aliases=['I := g * (E - V)'],
+            regimes=[
+                Regime('dV/dt = (I - V) / tau',
+                       transitions=On('V > Vth',
+                                      do=['V = Vr', OutputEvent('spike')]),
+                       name='R')],
+            analog_ports=[AnalogSendPort('I')])
+
+    def assertSameError(self, componentclass):
+        errors = []
+        for validate in (DynamicsValidator.validate_componentclass,
+                         DynamicsValidator.validate_componentclass_separately):
+            try:
+                validate(componentclass)
+            except Exception as e:
+                errors.append((type(e), str(e)))
+            else:
+                errors.append(None)
+        self.assertIsNotNone(errors[0])
+        self.assertEqual(errors[0], errors[1])
+        return errors[0][1]
+
+    def test_valid(self):
+        DynamicsValidator.validate_componentclass(self.componentclass)
+
+    def test_same_errors(self):
+        block = self.componentclass.dynamicsblock
+        block._aliases['J'] = Alias('J', 'x * V')
+        self.assertEqual(self.assertSameError(self.componentclass),
+                         'Unresolved Symbol in Alias: x [<Alias: J := x * V>]')
+        # Errors raised during the traversal are raised in the order of the
+        # validators that raised them
+        block._state_variables['I'] = StateVariable('I')
+        self.assertEqual(self.assertSameError(self.componentclass),
+                         "Duplication of symbol found: I in "
+                         "<NameSpaceAddress: '//'>")
+        del block._state_variables['I']
+        del block._aliases['J']
+        del block._aliases['I']
+        self.assertEqual(self.assertSameError(self.componentclass),
+                         'Unable to find an Alias or State variable for '
+                         'analog-port: I')
+
+
+class ValidationCache_test(unittest.TestCase):
+
+    def setUp(self):
+        self.componentclass = DynamicsClass(
+            name='A',
+            aliases=['I := g * (E - V)'],
+            regimes=[Regime('dV/dt = (I - V) / tau', name='R')],
+            analog_ports=[AnalogSendPort('I')])
+
+    def fingerprint(self, componentclass):
+        return DynamicsFingerprinter().fingerprint(componentclass)
+
+    def test_fingerprint(self):
+        clone = DynamicsClonerVisitor().visit(self.componentclass)
+        clone._name = 'B'
+        self.assertEqual(self.fingerprint(clone),
+                         self.fingerprint(self.componentclass))
+        clone.dynamicsblock._aliases['I'] = Alias('I', 'g * (V - E)')
+        self.assertNotEqual(self.fingerprint(clone),
+                            self.fingerprint(self.componentclass))
+
+    def test_cache(self):
+        hits = validation_cache.hits
+        DynamicsClonerVisitor().visit(self.componentclass)
+        self.assertEqual(validation_cache.hits, hits + 1)
+        Settings.cache_component_validation = False
+        try:
+            DynamicsClonerVisitor().visit(self.componentclass)
+        finally:
+            Settings.cache_component_validation = True
+        self.assertEqual(validation_cache.hits, hits + 1)
+        # Invalid componentclasses aren't cached
+        self.componentclass.dynamicsblock._aliases['J'] = Alias('J', 'x')
+        for _ in range(2):
+            self.assertRaises(
+                NineMLRuntimeError, DynamicsValidator.validate_componentclass,
+                self.componentclass)
@@ -0,0 +1,436 @@
+import os.path
+import cPickle as pickle
+import shutil
+import tempfile
+import time
+import unittest
+from copy import deepcopy
+from lxml import etree
+from nineml import read
+from nineml.utils import Settings
+from nineml.document import (
+    Document, DocumentCache, document_cache, compiled_path,
+    _load_in_subprocess)
+from nineml.abstraction_layer import (
+    DynamicsClass, ConnectionRuleClass, Dimension)
+from nineml.user_layer import Population, Component
+
+xml_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), '..',
+                                        '..', 'xml'))
+
+
+def streamed_and_parsed(*path):
+    path = os.path.join(xml_dir, *path)
+    return (Document.from_file(path, url=path),
+            Document.from_xml(etree.parse(path).getroot(), url=path))
+
+
+def unloaded_names(document):
+    return set(k for k, v in dict.iteritems(document)
+               if isinstance(v, Document._Unloaded))
+
+
+def canonical(elem):
+    """
+    A prefix and whitespace independent representation of an element
+    """
+    return (elem.tag, sorted(elem.attrib.items()), (elem.text or '').strip(),
+            [canonical(c) for c in elem if isinstance(c.tag, basestring)])
+
+
+def indentation(elem, depth=0):
+    """
+    Whether the whitespace before each element and end tag (with children)
+    indents it to its depth in the tree
+    """
+    correct = set()
+    if len(elem):
+        correct.add(elem.text == '\n' + '  ' * (depth + 1))
+        for child in elem[:-1]:
+            correct.add(child.tail == '\n' + '  ' * (depth + 1))
+        correct.add(elem[-1].tail == '\n' + '  ' * depth)
+        for child in elem:
+            correct.update(indentation(child, depth + 1))
+    return correct
+
+
+class TestDocumentCache(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        document_cache.invalidate()
+        shutil.rmtree(self.tmp_dir)
+
+    def _copy(self, *path):
+        dest = os.path.join(self.tmp_dir, path[-1])
+        shutil.copy(os.path.join(xml_dir, *path), dest)
+        return dest
+
+    def test_repeated_read(self):
+        path = os.path.join(xml_dir, 'neurons', 'HodgkinHuxley.xml')
+        doc1 = read(path)
+        doc2 = read(os.path.join(xml_dir, 'neurons', '..', 'neurons',
+                                 'HodgkinHuxley.xml'))
+        self.assertIs(doc1, doc2)
+        self.assertIs(read('file://' + path), doc1)
+
+    def test_shared_by_references(self):
+        hh = read(os.path.join(xml_dir, 'neurons', 'HodgkinHuxley.xml'))
+        pops = read(os.path.join(xml_dir, 'populations', 'simple.xml'))
+        cell = pops['HHPopulation'].cell
+        self.assertIs(cell, hh['HodgkinHuxley'])
+
+    def test_shared_changes(self):
+        path = os.path.join(xml_dir, 'populations', 'simple.xml')
+        document = read(path)
+        copied = deepcopy(document)
+        document['HHPopulation'].number = 15
+        # Changes to the cached document are seen by subsequent reads
+        self.assertEqual(read(path)['HHPopulation'].number, 15)
+        # but not by copies of it
+        self.assertEqual(copied['HHPopulation'].number, 10)
+        copied['HHPopulation'].number = 20
+        self.assertEqual(read(path)['HHPopulation'].number, 15)
+        # or by reads after the document has been dropped from the cache
+        document_cache.invalidate(path)
+        self.assertEqual(read(path)['HHPopulation'].number, 10)
+
+    def test_modified_file_reread(self):
+        path = self._copy('neurons', 'Izhikevich.xml')
+        doc1 = read(path)
+        self.assertIs(read(path), doc1)
+        mtime = os.path.getmtime(path)
+        os.utime(path, (time.time(), mtime + 10))
+        doc2 = read(path)
+        self.assertIsNot(doc2, doc1)
+        self.assertEqual(doc1, doc2)
+
+    def test_invalidate(self):
+        path = self._copy('neurons', 'Izhikevich.xml')
+        doc1 = read(path)
+        document_cache.invalidate(path)
+        self.assertIsNot(read(path), doc1)
+        document_cache.invalidate()
+        self.assertEqual(len(document_cache), 0)
+
+    def test_lru_eviction(self):
+        cache = DocumentCache(max_size=2)
+        paths = [self._copy('neurons', f)
+                 for f in ('HodgkinHuxley.xml', 'Izhikevich.xml',
+                           'HodgkinHuxleyClass.xml')]
+        docs = [object() for _ in paths]
+        cache.add(paths[0], docs[0])
+        cache.add(paths[1], docs[1])
+        self.assertIs(cache.get(paths[0]), docs[0])  # paths[1] becomes LRU
+        cache.add(paths[2], docs[2])
+        self.assertIsNone(cache.get(paths[1]))
+        self.assertIs(cache.get(paths[0]), docs[0])
+        self.assertIs(cache.get(paths[2]), docs[2])
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+        cache.max_size = 1
+        self.assertEqual(len(cache), 1)
+        self.assertIs(cache.get(paths[2]), docs[2])
+
+
+class TestStreamedDocument(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        document_cache.invalidate()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_matches_full_read(self):
+        for path in (('populations', 'simple.xml'),
+                     ('neurons', 'HodgkinHuxley.xml'),
+                     ('projections', 'simple.xml')):
+            path = os.path.join(xml_dir, *path)
+            streamed = read(path, stream=True)
+            document_cache.invalidate()
+            full = read(path)
+            self.assertEqual(sorted(streamed.iterkeys()),
+                             sorted(full.iterkeys()))
+            self.assertEqual(streamed, full)
+            document_cache.invalidate()
+
+    def test_loaded_on_access(self):
+        path = os.path.join(xml_dir, 'populations', 'simple.xml')
+        document = Document.from_file(path, url=path)
+        unloaded = dict.__getitem__(document, 'HHPopulation')
+        self.assertIsInstance(unloaded, Document._Unloaded)
+        with open(path) as f:
+            f.seek(unloaded.xml.start)
+            self.assertTrue(f.read(unloaded.xml.end - unloaded.xml.start)
+                            .strip().startswith('<Population'))
+        population = document['HHPopulation']
+        self.assertEqual(population.number, 10)
+        self.assertIs(dict.__getitem__(document, 'HHPopulation'), population)
+        self.assertIsInstance(dict.__getitem__(document, 'IzhiPopulation'),
+                              Document._Unloaded)
+
+    def test_prefixed_namespace(self):
+        path = os.path.join(self.tmp_dir, 'prefixed.xml')
+        with open(path, 'w') as f:
+            f.write(
+                '<?xml version="1.0" encoding="ISO-8859-1"?>\n'
+                '<nml:NineML xmlns:nml="http://nineml.net/9ML/1.0">\n'
+                '  <nml:Dimension name="voltage" m="1" l="2" t="-3" i="-1"/>'
+                '<nml:Unit symbol="mV" dimension="voltage" power="-3"/>\n'
+                '  <!-- \xe9 -->\n'
+                '  <nml:Annotations><nml:Text>note</nml:Text>'
+                '</nml:Annotations>\n'
+                '</nml:NineML>\n')
+        document = Document.from_file(path)
+        self.assertEqual(sorted(document.iterkeys()), ['mV', 'voltage'])
+        self.assertEqual(document['mV'].dimension, document['voltage'])
+        self.assertEqual(document['mV'].power, -3)
+        self.assertEqual(len(document.annotations), 1)
+
+
+class TestClosure(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+
+    def tearDown(self):
+        document_cache.invalidate()
+
+    def test_units(self):
+        for document in streamed_and_parsed('neurons', 'HodgkinHuxley.xml'):
+            self.assertEqual(document.references('mV'), set(['voltage']))
+            self.assertEqual(document.closure(['mV', 'per_ms']),
+                             set(['mV', 'voltage', 'per_ms', 'per_time']))
+            self.assertEqual(document.closure(['HodgkinHuxley']),
+                             set(document.iterkeys()))
+
+    def test_load_closure(self):
+        for document in streamed_and_parsed('populations', 'simple.xml'):
+            self.assertEqual(
+                document.closure(['CombinedSelection']),
+                set(['CombinedSelection', 'HHPopulation', 'IzhiPopulation']))
+            hh, = document.load_closure(['HHPopulation'])
+            self.assertEqual(hh.name, 'HHPopulation')
+            self.assertEqual(unloaded_names(document),
+                             set(['IzhiPopulation', 'CombinedSelection']))
+            self.assertEqual(document.references('HHPopulation'), set())
+            with self.assertRaises(KeyError):
+                document.closure(['Missing'])
+
+
+class TestTypeIndex(unittest.TestCase):
+
+    def test_names_of_type(self):
+        for document in streamed_and_parsed('neurons', 'HodgkinHuxleyClass.xml'):
+            self.assertEqual(
+                document.names_of_type(DynamicsClass),
+                set(['HodgkinHuxleyClass']))
+            self.assertEqual(document.names_of_type(ConnectionRuleClass),
+                             set())
+            self.assertLessEqual(set(['per_time', 'voltage']),
+                                 document.names_of_type(Dimension))
+            self.assertEqual(unloaded_names(document),
+                             set(document.iterkeys()))
+            componentclass, = document.componentclasses
+            self.assertIsInstance(componentclass, DynamicsClass)
+            self.assertEqual(document.names_of_type(DynamicsClass),
+                             set(['HodgkinHuxleyClass']))
+
+    def test_properties_only_load_type(self):
+        for document in streamed_and_parsed('populations', 'simple.xml'):
+            self.assertEqual(sorted(p.name for p in document.populations),
+                             ['HHPopulation', 'IzhiPopulation'])
+            self.assertEqual(unloaded_names(document),
+                             set(['CombinedSelection']))
+            self.assertEqual(list(document.projections), [])
+            del document['HHPopulation']
+            self.assertEqual(document.names_of_type(Population),
+                             set(['IzhiPopulation']))
+
+
+class TestLoadAll(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+
+    def tearDown(self):
+        document_cache.invalidate()
+
+    def test_parallel_matches_serial(self):
+        for path in (('neurons', 'HodgkinHuxleyClass.xml'),
+                     ('connectionrules', 'all_to_all.xml'),
+                     ('populations', 'simple.xml')):
+            serial, parsed = streamed_and_parsed(*path)
+            serial.load_all(workers=1)
+            for document in (streamed_and_parsed(*path)[0], parsed):
+                document.load_all(workers=2)
+                self.assertEqual(unloaded_names(document), set())
+                self.assertEqual(document, serial)
+
+    def test_references_merged(self):
+        _, document = streamed_and_parsed('neurons', 'HodgkinHuxleyClass.xml')
+        document.load_closure(document.references('HodgkinHuxleyClass'))
+        # Check the worker function succeeds rather than falling back to
+        # loading in this process
+        self.assertIsNotNone(_load_in_subprocess(
+            document._subprocess_args('HodgkinHuxleyClass')))
+        document.load_all(workers=2)
+        componentclass = document['HodgkinHuxleyClass']
+        for param in componentclass.parameters:
+            self.assertIs(param.dimension, document[param.dimension.name])
+
+    def test_annotations_pickle(self):
+        _, document = streamed_and_parsed('neurons', 'HodgkinHuxleyClass.xml')
+        annotations = document['HodgkinHuxleyClass'].annotations
+        copied = pickle.loads(pickle.dumps(annotations, 2))
+        self.assertEqual(
+            dict((k, etree.tostring(v)) for k, v in copied.iteritems()),
+            dict((k, etree.tostring(v)) for k, v in annotations.iteritems()))
+
+
+class TestCompiledCache(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+        for fname in ('HodgkinHuxley.xml', 'HodgkinHuxleyClass.xml'):
+            shutil.copy(os.path.join(xml_dir, 'neurons', fname), self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'HodgkinHuxley.xml')
+        self.compiled_cache_dir = Settings.compiled_cache_dir
+        Settings.compiled_cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+        document_cache.invalidate()
+        Settings.compiled_cache_dir = self.compiled_cache_dir
+        shutil.rmtree(self.tmp_dir)
+
+    def test_roundtrip(self):
+        document = read(self.path, use_cache=True)
+        self.assertTrue(os.path.exists(compiled_path(self.path)))
+        self.assertEqual(unloaded_names(document), set())
+        document_cache.invalidate()
+        inode = os.stat(compiled_path(self.path)).st_ino
+        compiled = read(self.path, use_cache=True)
+        # The sidecar is replaced by a new file when it is rewritten
+        self.assertEqual(os.stat(compiled_path(self.path)).st_ino, inode)
+        self.assertIsNot(compiled, document)
+        self.assertEqual(compiled, document)
+        self.assertEqual(compiled.url, self.path)
+        # Type index is rebuilt on unpickling
+        self.assertEqual(compiled.names_of_type(Component),
+                         set(['HodgkinHuxley']))
+        # References to other documents are resolved via their own caches
+        self.assertTrue(os.path.exists(compiled_path(
+            os.path.join(self.tmp_dir, 'HodgkinHuxleyClass.xml'))))
+        self.assertIs(compiled['HodgkinHuxley'].component_class,
+                      read(os.path.join(self.tmp_dir,
+                                        'HodgkinHuxleyClass.xml'))
+                      ['HodgkinHuxleyClass'])
+
+    def test_stale(self):
+        read(self.path, use_cache=True)
+        document_cache.invalidate()
+        with open(self.path) as f:
+            xml = f.read()
+        with open(self.path, 'w') as f:
+            f.write(xml.replace('<SingleValue>1.0</SingleValue>',
+                                '<SingleValue>2.0</SingleValue>'))
+        document = read(self.path, use_cache=True)
+        self.assertEqual(document['HodgkinHuxley'].properties['C'].value, 2.0)
+        with open(compiled_path(self.path), 'w') as f:
+            f.write('corrupt')
+        document_cache.invalidate()
+        self.assertEqual(read(self.path, use_cache=True), document)
+        self.assertNotEqual(os.path.getsize(compiled_path(self.path)),
+                            len('corrupt'))
+
+    def test_tampered(self):
+        document = read(self.path, use_cache=True)
+        document_cache.invalidate()
+        # Replace the payload with a pickle that would create a directory
+        # when loaded, keeping the valid header
+        marker = os.path.join(self.tmp_dir, 'exploited')
+        with open(compiled_path(self.path), 'rb') as f:
+            header = f.readline()
+            signature = f.readline()
+        with open(compiled_path(self.path), 'wb') as f:
+            f.write(header + signature)
+            f.write("cos\nmkdir\n(S'{}'\ntR.".format(marker))
+        self.assertEqual(read(self.path, use_cache=True), document)
+        self.assertFalse(os.path.exists(marker))
+
+    def test_insecure_cache_dir(self):
+        read(self.path, use_cache=True)
+        document_cache.invalidate()
+        # Sidecars aren't used from a directory others can write to
+        os.chmod(Settings.compiled_cache_dir, 0777)
+        inode = os.stat(compiled_path(self.path)).st_ino
+        with open(compiled_path(self.path), 'rb') as f:
+            compiled = f.read()
+        document = read(self.path, use_cache=True)
+        self.assertNotEqual(unloaded_names(document), set())
+        self.assertEqual(os.stat(compiled_path(self.path)).st_ino, inode)
+        with open(compiled_path(self.path), 'rb') as f:
+            self.assertEqual(f.read(), compiled)
+
+
+class TestPassThroughWrite(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+        self.tmp_dir = tempfile.mkdtemp()
+        for dname in ('neurons', 'populations'):
+            shutil.copytree(os.path.join(xml_dir, dname),
+                            os.path.join(self.tmp_dir, dname))
+
+    def tearDown(self):
+        document_cache.invalidate()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_unloaded_elements_passed_through(self):
+        path = os.path.join(self.tmp_dir, 'populations', 'simple.xml')
+        out_path = os.path.join(self.tmp_dir, 'populations', 'out.xml')
+        for document in (read(path, stream=True), read(path)):
+            document['HHPopulation'].number = 15
+            document.write(out_path)
+            self.assertEqual(unloaded_names(document),
+                             set(['IzhiPopulation', 'CombinedSelection']))
+            document_cache.invalidate()
+            written = read(out_path)
+            self.assertEqual(written['HHPopulation'].number, 15)
+            self.assertEqual(written['IzhiPopulation'],
+                             read(path)['IzhiPopulation'])
+            document_cache.invalidate()
+
+    def test_units_of_unloaded_elements_kept(self):
+        path = os.path.join(self.tmp_dir, 'neurons', 'HodgkinHuxley.xml')
+        out_path = os.path.join(self.tmp_dir, 'neurons', 'out.xml')
+        document = read(path, stream=True)
+        document.write(out_path)
+        self.assertEqual(unloaded_names(document), set(['HodgkinHuxley']))
+        document_cache.invalidate()
+        self.assertEqual(read(out_path)['HodgkinHuxley'],
+                         read(path)['HodgkinHuxley'])
+
+    def test_matches_to_xml(self):
+        path = os.path.join(self.tmp_dir, 'populations', 'simple.xml')
+        out_path = os.path.join(self.tmp_dir, 'populations', 'out.xml')
+        for document in (read(path, stream=True), read(path)):
+            document['HHPopulation'].number = 15
+            document.write(out_path)
+            with open(out_path) as f:
+                written = f.read()
+            # The namespace is only declared on the root and all the
+            # elements are written with the same (default) prefix
+            self.assertEqual(written.count('xmlns'), 1)
+            self.assertNotIn('ni:', written)
+            tree = etree.parse(out_path)
+            self.assertEqual(canonical(tree.getroot()),
+                             canonical(document.to_xml()))
+            # The output is consistently indented
+            self.assertEqual(indentation(tree.getroot()), set([True]))
+            document_cache.invalidate()
@@ -0,0 +1,125 @@
+import os.path
+import posixpath
+import shutil
+import tempfile
+import threading
+import unittest
+import urllib
+from BaseHTTPServer import HTTPServer
+from SimpleHTTPServer import SimpleHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+from nineml import read
+from nineml.document import document_cache
+from nineml.prefetch import prefetch, Fetcher
+
+xml_dir = os.path.normpath(os.path.join(os.path.dirname(__file__), '..',
+                                        '..', 'xml'))
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+
+    daemon_threads = True
+
+
+class _Handler(SimpleHTTPRequestHandler):
+    """
+    Serves the test XML files over persistent connections and records the
+    requests made
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def translate_path(self, path):
+        path = posixpath.normpath(urllib.unquote(path.split('?')[0]))
+        return os.path.join(self.server.root, *path.split('/')[1:])
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append(self.path)
+            self.server.clients.add(self.client_address)
+        path = self.translate_path(self.path)
+        last_modified = self.date_time_string(os.path.getmtime(path))
+        if self.headers.get('If-Modified-Since') == last_modified:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            with self.server.lock:
+                self.server.not_modified.append(self.path)
+        else:
+            SimpleHTTPRequestHandler.do_GET(self)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        document_cache.invalidate()
+        self.cache_dir = tempfile.mkdtemp()
+        self.server = _ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self.server.root = xml_dir
+        self.server.requests = []
+        self.server.clients = set()
+        self.server.not_modified = []
+        self.server.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.base_url = 'http://127.0.0.1:{}/'.format(
+            self.server.server_address[1])
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        document_cache.invalidate()
+        shutil.rmtree(self.cache_dir)
+
+    def test_prefetch_closure(self):
+        url = self.base_url + 'projections/simple.xml'
+        fetched = prefetch(url, max_connections=2)
+        self.assertEqual(
+            set(fetched),
+            set(self.base_url + p for p in (
+                'projections/simple.xml', 'populations/simple.xml',
+                'neurons/HodgkinHuxley.xml', 'neurons/HodgkinHuxleyClass.xml',
+                'neurons/Izhikevich.xml',
+                'postsynapticresponses/DoubleExpCondSynapse.xml',
+                'connectionrules/all_to_all.xml')))
+        self.assertEqual(len(self.server.requests), len(fetched))
+        # Connections are reused between requests to the same host
+        self.assertLessEqual(len(self.server.clients), 2)
+
+    def test_read_uses_prefetched(self):
+        url = self.base_url + 'populations/simple.xml'
+        document = read(url, prefetch=True)
+        num_requests = len(self.server.requests)
+        self.assertEqual(num_requests, 4)
+        population = document['HHPopulation']
+        self.assertEqual(population.cell.component_class.name,
+                         'HodgkinHuxleyClass')
+        self.assertEqual(len(self.server.requests), num_requests)
+        # The prefetched documents are held in the (bounded) document cache
+        self.assertIsNotNone(document_cache.get(
+            self.base_url + 'neurons/HodgkinHuxleyClass.xml'))
+
+    def test_disk_cache(self):
+        url = self.base_url + 'neurons/HodgkinHuxley.xml'
+        first = prefetch(url, cache_dir=self.cache_dir)
+        self.server.shutdown()
+        self.server.server_close()
+        # The cached copies are used when the server can't be reached
+        second = prefetch(url, cache_dir=self.cache_dir, timeout=1)
+        self.assertEqual(first, second)
+
+    def test_revalidation(self):
+        url = self.base_url + 'units.xml'
+        fetcher = Fetcher(cache_dir=self.cache_dir)
+        content = fetcher.fetch(url)
+        self.assertEqual(content,
+                         open(os.path.join(xml_dir, 'units.xml')).read())
+        # The second request is conditional on the last modified time so the
+        # cached copy is used
+        self.assertEqual(fetcher.fetch(url), content)
+        fetcher.close()
+        self.assertEqual(self.server.not_modified, ['/units.xml'])
@@ -1,6 +1,18 @@
 import os.path
+import shutil
+import tempfile
 import unittest
+import numpy
 from nineml import read, load
+from nineml.xmlns import NINEML
+from nineml.document import Document
+from nineml.abstraction_layer import DynamicsClass, Parameter
+from lxml import etree
+from nineml.abstraction_layer.units import unitless, um, cm, mV
+from nineml.exceptions import NineMLRuntimeError
+from nineml.user_layer import (
+    PositionList, Structure, Definition, PropertySet, Property)
+from nineml.user_layer.values import spill_arrays
 
 
 class TestPopulation(unittest.TestCase):
@@ -13,3 +25,120 @@ class TestPopulation(unittest.TestCase):
         xml = document1.to_xml()
         document2 = load(xml, read_from=self.test_file)
         self.assertEquals(document1.items(), document2.items())
+
+
+class TestPositionList(unittest.TestCase):
+
+    def test_xml_roundtrip(self):
+        positions = PositionList(numpy.random.uniform(size=(10, 3)))
+        xml = positions.to_xml()
+        self.assertEqual(len(xml.findall(NINEML + 'position')), 10)
+        self.assertEqual(PositionList.from_xml(xml, None), positions)
+
+    def test_spill(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            positions = PositionList(numpy.random.uniform(size=(10, 3)))
+            with spill_arrays(tmp_dir, 'positions', 5):
+                xml = positions.to_xml()
+            self.assertIsNotNone(xml.find(NINEML + 'ExternalArrayValue'))
+            document = Document()
+            document.url = os.path.join(tmp_dir, 'doc.xml')
+            self.assertEqual(PositionList.from_xml(xml, document), positions)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+class TestStructure(unittest.TestCase):
+
+    catalog_file = os.path.join(
+        os.path.dirname(__file__), '..', '..', '..', '..', '..', '..',
+        'catalog', '_old_formats', 'networkstructures', '2Dgrid.xml')
+
+    def structure(self, class_name, **properties):
+        """
+        `properties` -- (value, units) pairs
+        """
+        component_class = DynamicsClass(
+            name=class_name,
+            parameters=[Parameter(n, dimension=u.dimension)
+                        for n, (_, u) in properties.iteritems()],
+            aliases=['{0}_ := {0}'.format(n) for n in properties])
+        document = Document(component_class)
+        return Structure(
+            'structure', Definition(class_name, document),
+            properties=PropertySet(*[Property(n, v, u)
+                                     for n, (v, u) in properties.iteritems()]))
+
+    def test_grid(self):
+        structure = self.structure('Grid2D', dx=(2.0, um), dy=(3.0, um),
+                                   aspectRatioXY=(2.0, unitless))
+        positions = structure.generate_positions(8, chunk_size=3)
+        self.assertEqual(positions.shape, (8, 3))
+        self.assertEqual([tuple(p) for p in positions],
+                         [(x * 2.0, y * 3.0, 0.0)
+                          for y in xrange(2) for x in xrange(4)])
+
+    def test_line(self):
+        # Lengths are converted to um
+        structure = self.structure('Grid1D', dx=(0.5, um), x0=(0.1, cm))
+        positions = structure.generate_positions(5)
+        self.assertEqual(list(positions[:, 0]),
+                         [1000.0, 1000.5, 1001.0, 1001.5, 1002.0])
+        self.assertFalse(positions[:, 1:].any())
+
+    def test_units(self):
+        structure = self.structure('Grid1D', dx=(0.5, mV))
+        self.assertRaises(NineMLRuntimeError, structure.generate_positions,
+                          5)
+        structure = self.structure('Grid1D', dx=(0.5, um),
+                                   spacing=(0.5, um))
+        self.assertRaises(NineMLRuntimeError, structure.generate_positions,
+                          5)
+
+    def test_fill_order(self):
+        sequential = self.structure(
+            'Grid2D', dx=(1.0, um), dy=(1.0, um),
+            fillOrder=(0, unitless)).generate_positions(100)
+        structure = self.structure('Grid2D', dx=(1.0, um), dy=(1.0, um),
+                                   fillOrder=(1, unitless))
+        positions = structure.generate_positions(
+            100, rng=numpy.random.RandomState(1), chunk_size=30)
+        # The nodes are assigned to the same positions in a random order
+        self.assertFalse(numpy.array_equal(positions, sequential))
+        self.assertEqual(sorted(map(tuple, positions)),
+                         sorted(map(tuple, sequential)))
+        self.assertTrue(numpy.array_equal(
+            positions, structure.generate_positions(
+                100, rng=numpy.random.RandomState(1))))
+
+    def test_catalog(self):
+        # All the parameters of the catalog's 2D grid structure are used
+        names = etree.parse(self.catalog_file).xpath(
+            '//*[local-name()="Parameter"]/@name')
+        self.assertEqual(len(names), 6)
+        values = {'fillOrder': (0, unitless), 'aspectRatioXY': (2.0, unitless),
+                  'dx': (0.1, cm), 'dy': (0.2, cm), 'x0': (0.05, cm),
+                  'y0': (0.0, cm)}
+        structure = self.structure('Grid2D',
+                                   **dict((n, values[n]) for n in names))
+        positions = structure.generate_positions(8)
+        self.assertEqual([tuple(p) for p in positions],
+                         [(500.0 + x * 1000.0, y * 2000.0, 0.0)
+                          for y in xrange(2) for x in xrange(4)])
+
+    def test_random(self):
+        structure = self.structure('UniformSphere', radius=(2.0, um),
+                                   x0=(1.0, um))
+        positions = structure.generate_positions(
+            1000, rng=numpy.random.RandomState(1), chunk_size=300)
+        self.assertTrue((numpy.sqrt(((positions - (1.0, 0.0, 0.0)) ** 2)
+                                    .sum(axis=1)) <= 2.0).all())
+        self.assertTrue(numpy.array_equal(
+            positions, structure.generate_positions(
+                1000, rng=numpy.random.RandomState(1), chunk_size=300)))
+        structure = self.structure('Uniform3D', xmin=(-1.0, um),
+                                   xmax=(1.0, um))
+        positions = structure.generate_positions(1000)
+        self.assertTrue((positions[:, 0] >= -1.0).all())
+        self.assertTrue((positions[:, 1:] <= 1.0).all())
@@ -0,0 +1,169 @@
+import os.path
+import shutil
+import tempfile
+import unittest
+import numpy
+from lxml import etree
+from nineml.xmlns import E, NINEML
+from nineml.document import Document
+from nineml.abstraction_layer.units import Dimension, Unit
+from nineml.abstraction_layer import DynamicsClass, Parameter
+from nineml.user_layer.component import (
+    Property, PropertySet, Component, Definition)
+from nineml.user_layer.values import (
+    ArrayValue, ArrayValueRow, ExternalArrayValue, RAW_MIMETYPE,
+    NPY_MIMETYPE, CSV_MIMETYPE, TSV_MIMETYPE)
+
+
+class TestArrayValue(unittest.TestCase):
+
+    def setUp(self):
+        self.mV = Unit('mV', dimension=Dimension('voltage', m=1, l=2, t=-3,
+                                                 i=-1), power=-3)
+
+    def test_xml_roundtrip(self):
+        for values in (numpy.arange(10), numpy.linspace(-1.0, 1.0, 11),
+                       [0.1, 1e-20, -3.5e10]):
+            array = ArrayValue(values)
+            xml = array.to_xml()
+            self.assertEqual(len(xml.findall(NINEML + 'ArrayValueRow')),
+                             len(array))
+            self.assertEqual(ArrayValue.from_xml(xml, None), array)
+
+    def test_from_xml_unordered(self):
+        xml = E('ArrayValue', E('ArrayValueRow', '3', index='1'),
+                E('ArrayValueRow', '-1', index='2'),
+                E('ArrayValueRow', '2', index='0'))
+        array = ArrayValue.from_xml(xml, None)
+        self.assertEqual(array.values.dtype.kind, 'i')
+        self.assertEqual(list(array.values), [2, 3, -1])
+        xml[0].text = '3.5'
+        array = ArrayValue.from_xml(xml, None)
+        self.assertEqual(array.values.dtype, numpy.float64)
+        self.assertEqual(list(array.values), [2.0, 3.5, -1.0])
+
+    def test_from_xml_bad_indices(self):
+        xml = E('ArrayValue', E('ArrayValueRow', '1', index='0'),
+                E('ArrayValueRow', '2', index='2'))
+        self.assertRaises(Exception, ArrayValue.from_xml, xml, None)
+        xml[1].set('index', '0')
+        self.assertRaises(Exception, ArrayValue.from_xml, xml, None)
+
+    def test_rows(self):
+        rows = [ArrayValueRow('0', '1.5'), ArrayValueRow('1', '2')]
+        array = ArrayValue(rows)
+        self.assertEqual(list(array.values), [1.5, 2.0])
+        self.assertEqual(array.rows[1], ArrayValueRow('1', '2.0'))
+
+    def test_read_only(self):
+        values = numpy.arange(5.0)
+        array = ArrayValue(values)
+        values[0] = 10.0  # The writeable array passed in is copied
+        self.assertEqual(array.values[0], 0.0)
+        with self.assertRaises(ValueError):
+            array.values[0] = 1.0
+        # Read-only arrays are shared
+        self.assertIs(ArrayValue(array.values).values, array.values)
+
+    def test_value_array(self):
+        xml = E('Property',
+                ArrayValue(numpy.arange(4.0)).to_xml(),
+                name='v', units='mV')
+        document = Document(self.mV)
+        prop = Property.from_xml(xml, document)
+        self.assertTrue(prop.is_array())
+        self.assertIs(prop.value_array, prop._value.values)
+        self.assertEqual(list(prop.value_array), [0.0, 1.0, 2.0, 3.0])
+        self.assertEqual(Property.from_xml(etree.fromstring(
+            etree.tostring(prop.to_xml())), document), prop)
+
+
+class TestExternalArrayValue(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.values = numpy.linspace(0.0, 1.0, 101)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_raw(self):
+        self.values.astype('<f8').tofile(os.path.join(self.tmp_dir, 'a.bin'))
+        array = ExternalArrayValue('./a.bin', RAW_MIMETYPE, '',
+                                   relative_to=self.tmp_dir)
+        self.assertIsInstance(array.values, numpy.memmap)
+        self.assertTrue(numpy.array_equal(array.values, self.values))
+        numpy.arange(5, dtype='<i4').tofile(os.path.join(self.tmp_dir,
+                                                         'b.bin'))
+        array = ExternalArrayValue('./b.bin', RAW_MIMETYPE + '; dtype=int32',
+                                   '', relative_to=self.tmp_dir)
+        self.assertEqual(list(array.values), range(5))
+        array = ExternalArrayValue(
+            './b.bin', RAW_MIMETYPE + '; charset=binary; dtype=int32', '',
+            relative_to=self.tmp_dir)
+        self.assertEqual(list(array.values), range(5))
+
+    def test_npy(self):
+        numpy.save(os.path.join(self.tmp_dir, 'a.npy'), self.values)
+        array = ExternalArrayValue('./a.npy', NPY_MIMETYPE, '',
+                                   relative_to=self.tmp_dir)
+        self.assertIsInstance(array.values, numpy.memmap)
+        self.assertTrue(numpy.array_equal(array.values, self.values))
+        table = numpy.zeros(4, dtype=[('weight', 'f8'), ('delay', 'f8')])
+        table['delay'] = [0.1, 0.2, 0.3, 0.4]
+        numpy.save(os.path.join(self.tmp_dir, 'b.npy'), table)
+        array = ExternalArrayValue('./b.npy', NPY_MIMETYPE, 'delay',
+                                   relative_to=self.tmp_dir)
+        self.assertEqual(list(array.values), [0.1, 0.2, 0.3, 0.4])
+
+    def test_delimited(self):
+        for mimetype, delimiter in ((CSV_MIMETYPE, ','),
+                                    (TSV_MIMETYPE, '\t')):
+            path = os.path.join(self.tmp_dir, 'table.txt')
+            with open(path, 'w') as f:
+                f.write(delimiter.join(('source', 'weight')) + '\n')
+                for i, v in enumerate(self.values):
+                    f.write('{}{}{!r}\n'.format(i, delimiter, v))
+            array = ExternalArrayValue(path, mimetype, 'weight')
+            self.assertTrue(numpy.array_equal(array.values, self.values))
+            chunks = list(array.iter_chunks(chunk_size=25))
+            self.assertEqual([len(c) for c in chunks], [25, 25, 25, 25, 1])
+            array = ExternalArrayValue(path, mimetype, 'source')
+            self.assertEqual(array.values.dtype.kind, 'i')
+            self.assertEqual(len(array), 101)
+            # Parameters of the mimetype the reader doesn't take are ignored
+            array = ExternalArrayValue(path, mimetype + '; charset=utf-8',
+                                       'weight')
+            self.assertTrue(numpy.array_equal(array.values, self.values))
+
+    def test_chunks(self):
+        numpy.save(os.path.join(self.tmp_dir, 'a.npy'), self.values)
+        array = ExternalArrayValue('./a.npy', NPY_MIMETYPE, '',
+                                   relative_to=self.tmp_dir)
+        self.assertTrue(numpy.array_equal(
+            numpy.concatenate(list(array.iter_chunks(chunk_size=10))),
+            self.values))
+
+    def test_spill_on_write(self):
+        mV = Unit('mV', dimension=Dimension('voltage', m=1, l=2, t=-3,
+                                            i=-1), power=-3)
+        cls = DynamicsClass(name='A', parameters=[
+            Parameter('v', dimension=mV.dimension),
+            Parameter('w', dimension=mV.dimension)], aliases=['x := v + w'])
+        document = Document(cls, mV, mV.dimension)
+        document['a'] = Component('a', Definition('A', document), properties=(
+            PropertySet(Property('v', ArrayValue(self.values), mV),
+                        Property('w', ArrayValue([1.0, 2.0]), mV))))
+        for mimetype in (NPY_MIMETYPE, RAW_MIMETYPE, CSV_MIMETYPE):
+            path = os.path.join(self.tmp_dir, 'doc.xml')
+            document.write(path, spill_threshold=10, spill_mimetype=mimetype)
+            xml = etree.parse(path).getroot()
+            self.assertEqual(
+                len(xml.findall('.//' + NINEML + 'ExternalArrayValue')), 1)
+            self.assertEqual(
+                len(xml.findall('.//' + NINEML + 'ArrayValue')), 1)
+            reread = Document.from_file(path, url=path)['a']
+            self.assertTrue(numpy.array_equal(
+                reread.properties['v'].value_array, self.values))
+            self.assertEqual(list(reread.properties['w'].value_array),
+                             [1.0, 2.0])